@@ -1,11 +1,24 @@
 import os
+import posixpath
+import shutil
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import utilities
 import zipfile
 
+try:
+    import fcntl # reflinks, only available on Unix
+except ImportError:
+    fcntl = None
+
+COPY_BUFFER_SIZE = 1<<20
+FICLONE = 0x40049409 # Linux ioctl request to clone a file
+
 
 def get_remapped_asset_names(project_data, key='costumes'):
-    """Return a dict of asset names with keys as md5 file name (with extension), and values as desired relative project path (with extension)"""
+    """Return a dict of asset names with keys as md5 file name (with extension), and values as desired relative project path (with extension).
+    Paths use forward slashes on every platform."""
 
     # accumulate names
     asset_uses = defaultdict(list)
@@ -22,7 +35,7 @@ def get_remapped_asset_names(project_data, key='costumes'):
             if len(asset_uses[asset['md5ext']]) == 1:
                 # asset is used only 1 time and can be stored in sprite folder
                 file_name = f'{utilities.valid_file_name(asset['name'])}.{asset['dataFormat']}'
-                new_path = os.path.join(key, target['name'], file_name)
+                new_path = posixpath.join(key, target['name'], file_name)
 
                 remapped_asset_names[asset['md5ext']] = new_path
             
@@ -32,7 +45,7 @@ def get_remapped_asset_names(project_data, key='costumes'):
                 else:
                     file_name = asset['md5ext']
                 
-                remapped_asset_names[asset['md5ext']] = os.path.join(key, file_name)
+                remapped_asset_names[asset['md5ext']] = posixpath.join(key, file_name)
 
     return remapped_asset_names
 
@@ -45,14 +58,133 @@ def get_remapped_sound_names(project_data):
 
 
 
-def copy_assets_to_folder(project_archive: zipfile.ZipFile, output_dir, names: dict):
-    for md5ext, path in names.items():
-        path = os.path.join(output_dir, path)
-        os.makedirs(os.path.split(path)[0], exist_ok=True)
-        
+class AssetStore():
+    """A folder of assets named by md5 file name, shared between conversions. 
+    An asset is decompressed into the store once and then linked into each project that uses it."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, md5ext):
+        return os.path.join(self.directory, md5ext)
+
+    def add(self, archive: zipfile.ZipFile, md5ext):
+        """Decompress an asset from the archive into the store if it isn't already there. Returns its path."""
+
+        path = self.get_path(md5ext)
         if not os.path.exists(path):
-            project_archive.extract(md5ext, os.path.split(path)[0])
-            os.rename(os.path.join(os.path.split(path)[0], md5ext), path)
+            # write to a temporary file first, other processes may be using the store
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                with archive.open(md5ext) as source, open(temp_path, 'wb') as destination:
+                    shutil.copyfileobj(source, destination, COPY_BUFFER_SIZE)
+                os.replace(temp_path, path)
+            except:
+                if os.path.exists(temp_path): os.remove(temp_path)
+                raise
+        
+        return path
+
+    def link(self, md5ext, destination):
+        """Place an asset from the store at the destination path, using a reflink, hard link, or copy (in order of preference). 
+        Note that a hard link shares the file with the store, editing it in place edits every project using it."""
+
+        source = self.get_path(md5ext)
+        try:
+            reflink(source, destination)
+        except OSError:
+            try:
+                os.link(source, destination)
+            except OSError:
+                shutil.copyfile(source, destination)
+
+
+class AssetReader():
+    """An asset in a project archive, only decompressed when read. The archive must stay open until then."""
+
+    __slots__ = ('archive', 'md5ext')
+
+    def __init__(self, archive: zipfile.ZipFile, md5ext):
+        self.archive = archive
+        self.md5ext = md5ext
+
+    def open(self):
+        """Open the asset as a binary file-like object."""
+        return self.archive.open(self.md5ext)
+
+    def read(self) -> bytes:
+        with self.open() as f:
+            return f.read()
+
+    def __repr__(self):
+        return f'AssetReader({self.md5ext!r})'
+
+
+def reflink(source, destination):
+    """Make a copy-on-write clone of a file. Raises OSError if the platform or file system doesn't support it."""
+
+    if fcntl is None: raise OSError('reflinks are not supported on this platform')
+
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination)
+            raise
+
+
+
+def copy_assets_to_folder(project_archive: zipfile.ZipFile, output_dir, *names: dict, workers=8, asset_store: AssetStore=None):
+    """Copy assets from the archive into the output folder, given dicts of md5 file names and their desired relative paths (such as costumes and sounds).
+    Each asset is streamed from the archive straight to its path by a pool of threads, each thread with its own handle to the archive. 
+    If an asset store is given, assets are linked from it instead, adding any it is missing.
+    Existing files are not replaced. Returns a dict of the paths written and their md5 file names."""
+
+    copies = {} # destination path: md5 file name. If many assets have the same path, the first is used.
+    for name_map in names:
+        for md5ext, path in name_map.items():
+            path = os.path.join(output_dir, path)
+            if path not in copies and not os.path.exists(path):
+                copies[path] = md5ext
+
+    for directory in {os.path.split(path)[0] for path in copies}:
+        os.makedirs(directory, exist_ok=True)
+
+    thread_data = threading.local()
+    opened_archives = []
+
+    def copy_asset(path, md5ext):
+        archive = getattr(thread_data, 'archive', None)
+        if archive is None:
+            if project_archive.filename is None: 
+                archive = project_archive # not opened from a file, share the handle
+            else:
+                archive = zipfile.ZipFile(project_archive.filename, 'r')
+                opened_archives.append(archive)
+            thread_data.archive = archive
+        
+        if asset_store is not None:
+            asset_store.add(archive, md5ext)
+            asset_store.link(md5ext, path)
+            return
+
+        try:
+            with archive.open(md5ext) as source, open(path, 'wb') as destination:
+                shutil.copyfileobj(source, destination, COPY_BUFFER_SIZE)
+        except:
+            if os.path.exists(path): os.remove(path) # don't leave a partial file
+            raise
+
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            futures = [pool.submit(copy_asset, path, md5ext) for path, md5ext in copies.items()]
+            for future in futures: future.result() # raise any errors
+    finally:
+        for archive in opened_archives: archive.close()
+
+    return copies
 
 
 
@@ -0,0 +1,170 @@
+import argparse
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+from pathlib import Path
+
+import convert_project
+
+try:
+    import resource # memory cap, only available on Unix
+except ImportError:
+    resource = None
+
+
+def find_projects(paths):
+    """Return a list of sb3 file paths. Directories are searched (not recursively) for sb3 files."""
+
+    project_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            project_paths.extend(sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith('.sb3')))
+        else:
+            project_paths.append(path)
+
+    return project_paths
+
+
+def _convert_in_worker(connection, project_path, output_directory, max_memory, verbose, asset_store):
+    """Entry point of a worker process. Sends back (error, seconds), error is None if successful."""
+
+    if max_memory is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+
+    start = time.perf_counter()
+    try:
+        convert_project.convert_project(project_path, output_directory, asset_store=asset_store)
+        connection.send((None, time.perf_counter() - start))
+    except BaseException as e:
+        connection.send((f'{type(e).__name__}: {e}', time.perf_counter() - start))
+
+
+def convert_batch(project_paths, output_directory=None, jobs=None, timeout=None, max_memory=None, verbose=False, asset_store=None):
+    """Convert many projects, each in its own worker process with up to `jobs` running at once.
+    Workers are forked where possible so the modules are already imported.
+    A worker is killed if it takes longer than `timeout` seconds, and `max_memory` (bytes) caps its address space.
+    Projects with the same output folder (the same file name in different folders) are converted one after the other.
+    Assets can be shared between the projects with an `asset_store` folder, see `assets.AssetStore`.
+    Returns a list of dicts, one per project, in the order given."""
+
+    if max_memory is not None and resource is None: raise Exception('A memory cap is not supported on this platform')
+    if jobs is None: jobs = os.cpu_count() or 1
+    if jobs < 1: raise Exception(f'jobs must be at least 1, not {jobs}')
+
+    if output_directory is not None: os.makedirs(output_directory, exist_ok=True)
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+
+    results = [{'path': str(p), 'status': 'pending', 'error': None, 'seconds': None} for p in project_paths]
+    # a project with the same output folder as an earlier one waits for it to finish
+    pending = []
+    last_in_folder = {} # output folder: index
+    next_in_folder = {} # index: index of the next project with the same output folder
+    for i, project_path in enumerate(project_paths):
+        output_dir = os.path.normcase(os.path.abspath(convert_project.get_output_dir(project_path, output_directory)))
+        if output_dir in last_in_folder: next_in_folder[last_in_folder[output_dir]] = i
+        else: pending.append(i)
+        last_in_folder[output_dir] = i
+
+    pending.reverse() # pop from the end in order
+    running = {} # process sentinel: (index, process, connection, start time)
+
+    while pending or running:
+        # start workers
+        while pending and len(running) < jobs:
+            i = pending.pop()
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_convert_in_worker, args=(sender, project_paths[i], output_directory, max_memory, verbose, asset_store), daemon=True)
+            process.start()
+            sender.close()
+            running[process.sentinel] = (i, process, receiver, time.perf_counter())
+
+        # wait for a worker to finish or the earliest timeout
+        wait_time = None
+        if timeout is not None:
+            earliest_start = min(start for _, _, _, start in running.values())
+            wait_time = max(0, earliest_start + timeout - time.perf_counter())
+
+        finished = multiprocessing.connection.wait(list(running.keys()), wait_time)
+
+        for sentinel in list(running.keys()):
+            i, process, receiver, start = running[sentinel]
+            result = results[i]
+
+            if sentinel in finished:
+                process.join()
+                if receiver.poll():
+                    result['error'], result['seconds'] = receiver.recv()
+                    result['status'] = 'ok' if result['error'] is None else 'failed'
+                else:
+                    # killed without reporting, such as by running out of memory
+                    result['status'] = 'failed'
+                    result['error'] = f'Worker exited with code {process.exitcode}'
+                    result['seconds'] = time.perf_counter() - start
+
+            elif timeout is not None and time.perf_counter() - start >= timeout:
+                process.kill()
+                process.join()
+                result['status'] = 'timeout'
+                result['error'] = f'Timed out after {timeout} s'
+                result['seconds'] = time.perf_counter() - start
+
+            else:
+                continue
+
+            receiver.close()
+            del running[sentinel]
+            if i in next_in_folder: pending.append(next_in_folder[i])
+            if verbose: print_result(result)
+
+    return results
+
+
+def print_result(result):
+    line = f"{result['status'].upper():8} {result['seconds']:8.2f} s  {result['path']}"
+    if result['error'] is not None: line += f"  ({result['error']})"
+    print(line)
+
+
+def print_summary(results, total_seconds):
+    """Print the result of each project that didn't succeed and the totals."""
+
+    for result in results:
+        if result['status'] != 'ok': print_result(result)
+
+    succeeded = sum(1 for r in results if r['status'] == 'ok')
+    failed = sum(1 for r in results if r['status'] == 'failed')
+    timed_out = sum(1 for r in results if r['status'] == 'timeout')
+    print(f'{succeeded} succeeded, {failed} failed, {timed_out} timed out of {len(results)} projects in {total_seconds:.2f} s')
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='sb3_to_goboscript_batch',
+        description="Convert many Scratch projects into goboscript using multiple processes. If no output path is given, each project is placed next to its input."
+    )
+
+    parser.add_argument("inputs", type=Path, nargs='+', help="sb3 files or directories containing them")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="directory to place the goboscript projects in")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a project's conversion is stopped")
+    parser.add_argument("--max-memory", type=float, default=None, help="memory cap for each worker in MB")
+    parser.add_argument("--asset-store", type=Path, default=None, help="folder of assets shared between projects, assets are linked from it instead of copied")
+    parser.add_argument("-v", "--verbose", action='store_true', help="show the output of each conversion")
+
+    args = parser.parse_args()
+    if args.jobs is not None and args.jobs < 1: parser.error('--jobs must be at least 1')
+    max_memory = None if args.max_memory is None else int(args.max_memory * 1024 * 1024)
+
+    start = time.perf_counter()
+    results = convert_batch(find_projects(args.inputs), args.output, args.jobs, args.timeout, max_memory, args.verbose, args.asset_store)
+    print_summary(results, time.perf_counter() - start)
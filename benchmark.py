@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import synthetic
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# name: settings for `synthetic.generate_project`, sizes are multiplied by the scale
+CASES = {
+    'scripts': {'sprites': 4, 'scripts': 50, 'stack_length': 40},
+    'long stacks': {'sprites': 1, 'scripts': 4, 'stack_length': 2000, 'nesting_depth': 0},
+    'deep nesting': {'sprites': 1, 'scripts': 4, 'stack_length': 256, 'nesting_depth': 4},
+    'comments': {'sprites': 2, 'scripts': 40, 'stack_length': 40, 'comment_density': 0.5},
+    'many sprites': {'sprites': 100, 'scripts': 4, 'stack_length': 20},
+    'lists': {'sprites': 2, 'scripts': 2, 'lists': 10, 'list_length': 20000},
+    'assets': {'sprites': 20, 'scripts': 1, 'costumes': 50, 'sounds': 20},
+}
+SCALED_SETTINGS = ('sprites', 'scripts', 'stack_length', 'list_length', 'costumes', 'sounds')
+
+# Conversion time per block should stay about the same as a script gets longer
+SCALING_CASE = {'sprites': 0, 'scripts': 1, 'nesting_depth': 0}
+SCALING_LENGTHS = (2000, 4000, 8000, 16000)
+SCALING_TOLERANCE = 1.5 # a longer script may take this much longer per block before it is reported
+
+
+def scale_settings(settings: dict, scale):
+    return {k: max(1, round(v * scale)) if k in SCALED_SETTINGS and v > 0 else v for k, v in settings.items()}
+
+
+def _measure_in_subprocess(project_path, output_directory, convert_kwargs):
+    """Convert a project in a new interpreter so its peak memory is measured alone. Returns (seconds, peak RSS in bytes or None)."""
+
+    code = f'''
+import contextlib, io, json, time
+import convert_project, profiler
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    convert_project.convert_project({str(project_path)!r}, {str(output_directory)!r}, incremental=False, **{convert_kwargs!r})
+print(json.dumps([time.perf_counter() - start, profiler.get_max_rss()]))
+'''
+    result = subprocess.run([sys.executable, '-c', code], cwd=SOURCE_DIR, capture_output=True, text=True)
+    if result.returncode != 0: raise Exception(f'Conversion failed: {result.stderr.strip()}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(project_path, repeat=3, convert_kwargs=None):
+    """Convert a project `repeat` times and return a dict of the results of the fastest, with throughput in blocks and MB of project.json per second."""
+
+    with zipfile.ZipFile(project_path) as archive:
+        project_json = archive.read('project.json')
+    block_count = sum(len(target['blocks']) for target in json.loads(project_json)['targets'])
+
+    best = None
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as output_directory:
+            seconds, max_rss = _measure_in_subprocess(project_path, output_directory, convert_kwargs or {})
+        if best is None or seconds < best[0]: best = (seconds, max_rss)
+
+    seconds, max_rss = best
+    return {
+        'blocks': block_count,
+        'json_mb': len(project_json) / 1e6,
+        'seconds': seconds,
+        'blocks_per_second': block_count / seconds,
+        'mb_per_second': len(project_json) / 1e6 / seconds,
+        'peak_rss_mb': None if max_rss is None else max_rss / 1e6,
+    }
+
+
+def run_suite(case_names=None, scale=1.0, repeat=3, convert_kwargs=None, verbose=True):
+    """Generate and convert the synthetic projects in `CASES`. Returns a dict of case names and results, see `run_benchmark`."""
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in (case_names or CASES):
+            project_path = os.path.join(temp_dir, f'{name.replace(" ", "_")}.sb3')
+            synthetic.generate_project(project_path, **scale_settings(CASES[name], scale))
+            results[name] = run_benchmark(project_path, repeat, convert_kwargs)
+            if verbose: print_result(name, results[name])
+
+    return results
+
+
+def check_scaling(lengths=SCALING_LENGTHS, repeat=3, convert_kwargs=None, verbose=True):
+    """Convert a single script of increasing length. Returns (is roughly linear, list of (length, result)).
+    Superlinear behaviour (such as quadratic in script length) shows as the time per block growing with the length."""
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for length in lengths:
+            project_path = os.path.join(temp_dir, f'length{length}.sb3')
+            synthetic.generate_project(project_path, stack_length=length, **SCALING_CASE)
+            result = run_benchmark(project_path, repeat, convert_kwargs)
+            results.append((length, result))
+            if verbose: print_result(f'script length {length}', result)
+
+    # compare the largest to the smallest, small projects have a larger fixed cost per block so this is lenient
+    first, last = results[0][1], results[-1][1]
+    is_linear = last['seconds'] / last['blocks'] <= SCALING_TOLERANCE * first['seconds'] / first['blocks']
+    return is_linear, results
+
+
+def print_result(name, result):
+    peak_rss = '?' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.0f}"
+    print(f"{name:24} {result['blocks']:9} blocks {result['seconds']:8.3f} s {result['blocks_per_second']:10.0f} blocks/s {result['mb_per_second']:7.2f} MB/s {peak_rss:>6} MB peak RSS")
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='sb3_to_goboscript_benchmark',
+        description="Benchmark conversion of synthetic projects, reporting blocks per second, MB of project.json per second and peak memory."
+    )
+
+    parser.add_argument("cases", nargs='*', metavar="case", help=f"cases to run (default: all), from: {', '.join(CASES)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the size of each case")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="conversions of each case, the fastest is reported")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="jobs passed to the converter")
+    parser.add_argument("--low-memory", action='store_true', help="convert in low memory mode")
+    parser.add_argument("--scaling", action='store_true', help="also check that time grows linearly with script length")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="save the results as JSON")
+
+    args = parser.parse_args()
+    for name in args.cases:
+        if name not in CASES: parser.error(f'unknown case: {name}')
+    convert_kwargs = {'jobs': args.jobs, 'low_memory': args.low_memory}
+
+    results = {'cases': run_suite(args.cases, args.scale, args.repeat, convert_kwargs)}
+    is_linear = True
+    if args.scaling:
+        is_linear, scaling = check_scaling(repeat=args.repeat, convert_kwargs=convert_kwargs)
+        results['scaling'] = {'is_linear': is_linear, 'results': {length: result for length, result in scaling}}
+        if not is_linear: print('Time per block grows with script length, conversion may be superlinear')
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+
+    sys.exit(0 if is_linear else 1)
@@ -2,6 +2,7 @@
 
 
 class BlockInput():
+    __slots__ = ('block_slot', 'shadow_slot')
 
     def __init__(self, block_slot=None, shadow_slot=None):
         
@@ -76,22 +77,17 @@ class BlockInput():
     def from_list(cls, data):
         """Constructor using Scratch JSON input format such as `[3, "a", [4, ""]]`."""
         
-        self = cls() # create new object
-
-        if data is None: return self # no data (such as a fallback when no input is found), use default.
+        if data is None: return cls() # no data (such as a fallback when no input is found), use default.
         
         if data[0] == 1:
-            self.shadow_slot = data[1]
+            return cls(None, data[1])
         elif data[0] == 2:
-            self.block_slot = data[1]
+            return cls(data[1], None)
         elif data[0] == 3:
-            self.block_slot = data[1]
-            self.shadow_slot = data[2]
+            return cls(data[1], data[2])
         
         else: raise Exception(f'unknown enum: {data[0]}')
 
-        return self
-
 
 if __name__ == '__main__':
     print(BlockInput().to_list())
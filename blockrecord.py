@@ -0,0 +1,70 @@
+import sys
+from blockinput import BlockInput
+from utilities import paused_gc
+
+EMPTY = {} # shared by blocks without inputs or fields, never modified
+
+
+class Block():
+    """Compact record of a block, decoded once from the project JSON.
+    Opcodes and input and field names are interned. Inputs are `BlockInput` objects and fields are their values only
+    (such as `"my variable"` instead of `["my variable", "id"]`)."""
+
+    __slots__ = ('opcode', 'next', 'parent', 'inputs', 'fields', 'shadow', 'top_level', 'mutation')
+
+    def __init__(self, opcode, next=None, parent=None, inputs=None, fields=None, shadow=False, top_level=False, mutation=None):
+        self.opcode = opcode
+        self.next = next
+        self.parent = parent
+        self.inputs = EMPTY if inputs is None else inputs
+        self.fields = EMPTY if fields is None else fields
+        self.shadow = shadow
+        self.top_level = top_level
+        self.mutation = mutation
+
+    def __repr__(self):
+        return f"Block({self.opcode})"
+
+    @classmethod
+    def from_dict(cls, data):
+        """Constructor using the Scratch JSON block format."""
+
+        self = cls.__new__(cls)
+        self.opcode = sys.intern(data['opcode'])
+        self.next = data['next']
+        self.parent = data.get('parent')
+        self.shadow = data.get('shadow', False)
+        self.top_level = data.get('topLevel', False)
+        self.mutation = data.get('mutation')
+
+        inputs = data['inputs']
+        if inputs:
+            self.inputs = {sys.intern(name): BlockInput.from_list(value) for name, value in inputs.items()}
+        else:
+            self.inputs = EMPTY
+
+        fields = data['fields']
+        if fields:
+            self.fields = {sys.intern(name): (value[0] if isinstance(value, list) else value) for name, value in fields.items()}
+        else:
+            self.fields = EMPTY
+
+        return self
+
+
+def convert_blocks(blocks: dict) -> dict:
+    """Convert the blocks of a target into records in place, so each JSON block can be freed as soon as it's converted.
+    Blocks already converted are kept. Variable and list reporters stored in list form are removed as goboscript doesn't use them."""
+
+    with paused_gc(): # records don't form reference cycles
+        list_form_ids = []
+        for block_id, block in blocks.items():
+            if isinstance(block, dict):
+                blocks[block_id] = Block.from_dict(block)
+            elif not isinstance(block, Block):
+                list_form_ids.append(block_id)
+
+        for block_id in list_form_ids:
+            del blocks[block_id]
+
+    return blocks
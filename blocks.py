@@ -1,797 +1,1438 @@
 
 import json
-import sys
+import time
+from typing import NamedTuple
 from blockinput import BlockInput
-import utilities
+from blockrecord import Block
+from targetindex import TargetIndex
+from codecache import CodeCache, Recording, INDENT_START, INDENT_MARK
 
 MATH_OPS = {'abs':'abs', 'floor':'floor', 'ceiling':'ceil', 'sqrt':'sqrt', 'sin':'sin', 'cos':'cos', 'tan':'tan', 'asin':'asin', 'acos':'acos', 'atan':'atan', 'ln':'ln', 'log':'log','e ^':'antiln', '10 ^':'antilog'}
 
 # only hats can be used at the start of a script in goboscript
 HATS = {'event_whenflagclicked','event_whenkeypressed','event_whenthisspriteclicked','event_whenstageclicked','event_whenbackdropswitchesto','event_whengreaterthan','event_whenbroadcastreceived','control_start_as_clone','procedures_definition'}
 
-sys.setrecursionlimit(2000) # I think there's something wrong if you need a single script with more than 2000 blocks
+HANDLERS = {} # opcode: block handler, see `handler`
 
 
-def recursive_block_search(target, current_block_id, shared_project_data) -> str:
-    """Search a tree of blocks and return a string of indented goboscript code"""
+# Block handlers are generators. They yield strings of code which are appended to the output in order, 
+# or one of the requests below which the walker in `convert_script` carries out using its own stack instead of recursion.
 
-    attached_comments = {}
-    for comment in target['comments'].values():
-        if comment.get('blockId', None) is not None:
-            try:
-                attached_comments[comment['blockId']] = bytes(comment['text'], "utf-8").decode("unicode_escape")
-            except:
-                pass
+class Capture(NamedTuple):
+    """Request the code of a block as a string (sent back to the handler), such as a reporter in an input."""
+    block_id: str
+    indent_level: int
 
-    is_commented_out = False
-    if target['blocks'][current_block_id] is not None and target['blocks'][current_block_id]['opcode'] not in HATS:
-        is_commented_out = True
+class Walk(NamedTuple):
+    """Request the code of a block (and the blocks after it) to be appended directly to the output."""
+    block_id: str
+    indent_level: int
+    prefix: str = '' # only added if the block produces code
+    strip: bool = False # strip whitespace from both ends of the block's code
 
-    np = shared_project_data['name_pool']
+class Next(NamedTuple):
+    """Continue the output with the next block in the stack. This must be the last thing a handler yields."""
+    block_id: str
+    indent_level: int
+    prefix: str = '' # only added if the rest of the stack produces code
 
-    def valid_name(name, usage):
-        return utilities.validate_name(name)
-        #return np.get_valid_name(name, target['name'], usage)
 
-    def block_search(current_block_id: str, indent_level=0) -> str:
-        if current_block_id is None or current_block_id == "": 
-            return ""
+def handler(*opcodes):
+    """Decorator registering a block handler for opcodes. The handler is called with a `BlockContext`.
+    Handlers can be added or replaced from outside this module, such as for extension opcodes."""
 
-        indent = '    ' * max(0, indent_level) # make the string of characters
-        if is_commented_out: indent = '# ' + indent # if commented out, prepend #
+    def register(function):
+        for opcode in opcodes: HANDLERS[opcode] = function
+        return function
+    
+    return register
+
+
+def strip_fragments(fragments: list, start: int, marks='') -> int:
+    """Strip whitespace (and any of `marks`) from both ends of the code made of `fragments[start:]` in place. Returns the number of characters removed."""
 
-        block = target['blocks'][current_block_id]
+    removed = 0
+    for i in range(start, len(fragments)):
+        stripped = fragments[i].lstrip()
+        if marks: stripped = stripped.lstrip(marks).lstrip()
+        removed += len(fragments[i]) - len(stripped)
+        fragments[i] = stripped
+        if stripped: break
+    
+    for i in range(len(fragments)-1, start-1, -1):
+        stripped = fragments[i].rstrip()
+        if marks: stripped = stripped.rstrip(marks).rstrip()
+        removed += len(fragments[i]) - len(stripped)
+        fragments[i] = stripped
+        if stripped: break
+
+    return removed
+
+
+def strip_brackets_conditional(text: str, enable=True) -> str:
+    if enable and text.startswith('(') and text.endswith(')'):
+        text = text[1:-1]
+    return text
+
+
+class ScriptContext():
+    """What the blocks of a script being converted share."""
+
+    def __init__(self, target, target_index: TargetIndex, shared_project_data, is_commented_out=False, code_cache: CodeCache=None):
+        self.target = target
+        self.blocks = target_index.blocks
+        self.attached_comments = target_index.comments
+        self.symbols = shared_project_data['symbols']
+        self.verbose = shared_project_data.get('verbose', True) # print warnings
+        self.analysis = shared_project_data.get('analysis') # counts of unhandled opcodes and warnings, see `convert_project.analyse_archive`
+        self.is_commented_out = is_commented_out
+
+        # code of stacks shared between scripts, see `codecache.CodeCache`
+        self.code_cache = code_cache
+        self.indent_unit = '    ' if self.code_cache is None else INDENT_MARK
+        self.recordings: list[Recording] = [] # of the stacks being converted, innermost last
+
+    def warn(self, message):
+        if self.recordings: self.recordings[-1].warnings.append(message)
+        if self.analysis is not None: self.analysis['warnings'][message] = self.analysis['warnings'].get(message, 0) + 1
+        if self.verbose: print(message)
+
+
+class BlockContext():
+    """A block being converted, passed to its handler along with helpers for reading its inputs and fields.
+    Helpers that read inputs are generators and must be used with `yield from`."""
+
+    __slots__ = ('script', 'block', 'opcode', 'inputs', 'fields', 'next', 'indent_level', 'indent')
+
+    def __init__(self, script: ScriptContext, block: Block, indent_level=0):
+        self.script = script
+        self.block = block
+        self.opcode = block.opcode
+        self.inputs = block.inputs
+        self.fields = block.fields
+        self.next = block.next
+        self.indent_level = indent_level
+        self.indent = script.indent_unit * max(0, indent_level) # make the string of characters
+        if script.code_cache is not None: self.indent = INDENT_START + self.indent
+        if script.is_commented_out: self.indent = '# ' + self.indent # if commented out, prepend #
+
+    @property
+    def blocks(self):
+        return self.script.blocks
+
+    def valid_name(self, name, usage):
+        valid_name = self.script.symbols.get(name, usage, self.script.target['name'])
+        if self.script.recordings: self.script.recordings[-1].names[(name, usage)] = valid_name
+        return valid_name
+
+    def slot_value(self, slot_contents: list) -> tuple:
+        """Get a readable value from a slot."""
         
-        opcode = block['opcode']
-        inputs = block['inputs']
-        fields = block['fields']
-        next = block['next']
+        if 3 < slot_contents[0] <= 8:
+            return (json.dumps(slot_contents[1]), 'number')
+        if slot_contents[0] == 9:
+            return (json.dumps(slot_contents[1]), 'color')
+        if slot_contents[0] == 10:
+            return (json.dumps(slot_contents[1]), 'text')
+        if slot_contents[0] == 11: # broadcasts are [11, name, id]
+            return (json.dumps(slot_contents[1]), 'broadcast_name') # slot_contents[2]
+        if slot_contents[0] == 12: 
+            return (self.valid_name(slot_contents[1], 'var'), 'var_name')
+        if slot_contents[0] == 13:
+            return (self.valid_name(slot_contents[1], 'list'), 'list_name')
+        raise Exception(f'unknown enum {slot_contents[0]}')
+
+    def parse_input(self, bi: BlockInput):
+        """Helper to handle block inputs. Returns a string with the general type of input it was."""
+
+        if isinstance(bi.block_slot, str):
+            return ((yield Capture(bi.block_slot, 0)), 'block') # is block
         
+        if bi.block_slot is not None:
+            return self.slot_value(bi.block_slot)
+
+        if isinstance(bi.shadow_slot, str):
+            return ((yield Capture(bi.shadow_slot, 0)), 'block') # is shadow block
         
-        def parse_input(input_value) -> tuple:
-            """Helper to handle block inputs. Returns a string with the general type of input it was."""
-            
-            def _get_slot_value(slot_contents: list) -> tuple:
-                """Get a readable value from a slot."""
-                
-                if 3 < slot_contents[0] <= 8:
-                    return (json.dumps(slot_contents[1]), 'number')
-                if slot_contents[0] == 9:
-                    return (json.dumps(slot_contents[1]), 'color')
-                if slot_contents[0] == 10:
-                    return (json.dumps(slot_contents[1]), 'text')
-                if slot_contents[0] == 11: # broadcasts are [11, name, id]
-                    return (json.dumps(slot_contents[1]), 'broadcast_name') # slot_contents[2]
-                if slot_contents[0] == 12: 
-                    return (valid_name(slot_contents[1], 'var'), 'var_name')
-                if slot_contents[0] == 13:
-                    return (valid_name(slot_contents[1], 'list'), 'list_name')
-                raise Exception(f'unknown enum {slot_contents[0]}')
-
-            bi = BlockInput.from_list(input_value)
-
-            if isinstance(bi.block_slot, str):
-                return (block_search(bi.block_slot, indent_level=0), 'block') # is block
-            
-            if bi.block_slot is not None:
-                return _get_slot_value(bi.block_slot)
+        if bi.shadow_slot is not None:
+            return self.slot_value(bi.shadow_slot)
 
-            if isinstance(bi.shadow_slot, str):
-                return (block_search(bi.shadow_slot, indent_level=0), 'block') # is shadow block
-            
-            if bi.shadow_slot is not None:
-                return _get_slot_value(bi.shadow_slot)
+        return ("", None) # completely empty
 
-            return ("", None) # completely empty
+    def next_block(self, include_semicolon=True):
+        """Helper that assumes the current block ends with semicolon and new line, and next block is at `next` and at the same indent"""
+        if include_semicolon: yield ';'
+        
+        separator = '\n'
+        attached_comments = self.script.attached_comments
+        if self.next in attached_comments:
+            comment_lines = [f"{self.indent}# {s}" for s in attached_comments[self.next].split('\n')]
+            separator += '\n'.join(comment_lines) + '\n'
+
+        yield Next(self.next, self.indent_level, separator)
+
+    def hat_body(self):
+        """Helper for the script below a hat block, placed in braces"""
+        yield " {\n"
+        yield Walk(self.next, self.indent_level+1)
+        yield "\n}"
+
+    def input(self, input_name, strip_brackets=True):
+        """Helper that assumes the input is a key in the input dict"""
+        if input_name not in self.inputs: return ""
+        
+        return strip_brackets_conditional((yield from self.parse_input(self.inputs[input_name]))[0], strip_brackets)
 
+    def input_num(self, input_name, strip_brackets=True):
+        """Helper that assumes the input is a key in the input dict with a possible numeric value"""
+        if input_name not in self.inputs: return ""
 
-        def next_block(include_semicolon=True):
-            """Helper that assumes the current block ends with semicolon and new line, and next block is at `next` and at the same indent"""
-            next_block_data = block_search(next, indent_level)
-            
-            string_output = ''
-            if include_semicolon: string_output += ';'
-            
-            if next_block_data == '': 
-                return string_output
-            
-            if next in attached_comments:
-                comment_lines = [f"{indent}# {s}" for s in attached_comments[next].split('\n')]
-                string_output += '\n' + '\n'.join(comment_lines)
+        text, input_type = yield from self.parse_input(self.inputs[input_name])
+        if input_type == 'number':
+            # try to convert string into number by removing the quotes
 
-            string_output += '\n' + next_block_data
-            return string_output
+            try:
+                if text.startswith('"') and text.endswith('"'):
+                    stripped: str = text[1:-1]
+                    if stripped.startswith("."): stripped = "0" + stripped # goboscript doesn't allow numbers to start with dot
+                    _ = float(stripped)
+                    return stripped # is a valid number
+            except:
+                pass
+            return text # don't strip quotes, not a valid number
 
+        return strip_brackets_conditional(text, strip_brackets)
 
-        def strip_brackets_conditional(text: str, enable=True) -> str:
-            if enable and text.startswith('(') and text.endswith(')'):
-                text = text[1:-1]
-            return text
+    def input_with_bool(self, input_name):
+        """Helper that assumes the input is solely a boolean reporter block (such as the boolean condition of an if block)"""
+        if input_name not in self.inputs: return "false"
 
+        bi = self.inputs[input_name]
+        if isinstance(bi.block_slot, str):
+            return (yield Capture(bi.block_slot, self.indent_level+1))
         
-        def input(input_name, strip_brackets=True) -> str:
-            """Helper that assumes the input is a key in the input dict"""
-            if input_name not in inputs: return ""
-            
-            return strip_brackets_conditional(parse_input(inputs[input_name])[0], strip_brackets)
+        return "false"
+    
+    def input_with_stack(self, input_name):
+        """Helper that assumes the input is solely a stack block (such as nested in a C shaped block)"""
+        if input_name not in self.inputs: return
 
+        bi = self.inputs[input_name]
+        if isinstance(bi.block_slot, str):
+            yield Walk(bi.block_slot, self.indent_level+1)
 
-        def input_num(input_name, strip_brackets=True) -> str:
-            """Helper that assumes the input is a key in the input dict with a possible numeric value"""
-            if input_name not in inputs: return ""
+    def field(self, field_name, fallback=""):
+        """Helper to get the value of a field, fallback if nonexistent"""
+        if field_name not in self.fields: return fallback
+        return json.dumps(self.fields[field_name])
 
-            text, input_type = parse_input(inputs[input_name])
-            if input_type == 'number':
-                # try to convert string into number by removing the quotes
+    def warn(self, message):
+        self.script.warn(message)
 
-                try:
-                    if text.startswith('"') and text.endswith('"'):
-                        stripped: str = text[1:-1]
-                        if stripped.startswith("."): stripped = "0" + stripped # goboscript doesn't allow numbers to start with dot
-                        _ = float(stripped)
-                        return stripped # is a valid number
-                except:
-                    pass
-                return text # don't strip quotes, not a valid number
+    def not_implemented(self):
+        self.warn(f'{self.opcode} is not implemented in goboscript')
 
-            return strip_brackets_conditional(text, strip_brackets)
 
+def unhandled(ctx: BlockContext):
+    """Handler for opcodes without one registered."""
+    analysis = ctx.script.analysis
+    if analysis is not None: analysis['unhandled'][ctx.opcode] = analysis['unhandled'].get(ctx.opcode, 0) + 1
+    if ctx.next in ctx.blocks:
+        yield f"{ctx.indent}# unhandled {ctx.opcode}\n"
+        yield Next(ctx.next, ctx.indent_level)
+    else:
+        yield f"# unhandled {ctx.opcode}"
 
-        def input_with_bool(input_name) -> str:
-            """Helper that assumes the input is solely a boolean reporter block (such as the boolean condition of an if block)"""
-            if input_name not in inputs: return "false"
 
-            bi = BlockInput.from_list(inputs[input_name])
-            if isinstance(bi.block_slot, str):
-                return block_search(bi.block_slot, indent_level+1)
-            
-            return "false"
-        
-        def input_with_stack(input_name) -> str:
-            """Helper that assumes the input is solely a stack block (such as nested in a C shaped block)"""
-            if input_name not in inputs: return ""
+def timed(block_handler, opcode, opcode_times: dict):
+    """Wrap a running handler to add the time spent in it to `opcode_times[opcode]`. 
+    Time spent converting the blocks it requests is counted under their own opcodes."""
 
-            bi = BlockInput.from_list(inputs[input_name])
-            if isinstance(bi.block_slot, str):
-                return block_search(bi.block_slot, indent_level+1)
-            
-            return ""
-            
+    value = None
+    while True:
+        start = time.perf_counter()
+        try:
+            item = block_handler.send(value)
+        except StopIteration:
+            opcode_times[opcode] = opcode_times.get(opcode, 0) + time.perf_counter() - start
+            return
+        opcode_times[opcode] = opcode_times.get(opcode, 0) + time.perf_counter() - start
+        value = yield item
 
 
-        def field(field_name, fallback=""):
-            """Helper to get the value of a field, fallback if nonexistent"""
-            if field_name not in fields: return fallback
-            f = fields[field_name]
-            if isinstance(f, list): f = f[0] # broadcasts stored as a list
-            return json.dumps(f)
+# LOOKS
 
-        def not_implemented():
-            print(f'{opcode} is not implemented in goboscript')
+@handler('looks_say')
+def looks_say(ctx: BlockContext):
+    yield f"{ctx.indent}say {(yield from ctx.input('MESSAGE'))}"
+    yield from ctx.next_block()
 
 
-        match opcode:
-            
-            # LOOKS
+@handler('looks_sayforsecs')
+def looks_sayforsecs(ctx: BlockContext):
+    yield f"{ctx.indent}say {(yield from ctx.input('MESSAGE'))}, {(yield from ctx.input_num('SECS'))}"
+    yield from ctx.next_block()
 
-            case 'looks_say':
-                return f"{indent}say {input('MESSAGE')}" + next_block()
-            
-            case 'looks_sayforsecs':
-                return f"{indent}say {input('MESSAGE')}, {input_num('SECS')}" + next_block()
 
-            case 'looks_think':
-                return f"{indent}think {input('MESSAGE')}" + next_block()
-            
-            case 'looks_thinkforsecs':
-                return f"{indent}think {input('MESSAGE')}, {input_num('SECS')}" + next_block()
+@handler('looks_think')
+def looks_think(ctx: BlockContext):
+    yield f"{ctx.indent}think {(yield from ctx.input('MESSAGE'))}"
+    yield from ctx.next_block()
 
-            case 'looks_show':
-                return f"{indent}show" + next_block()
 
-            case 'looks_hide':
-                return f"{indent}hide" + next_block()
-            
-            case 'looks_switchcostumeto':
-                return f"{indent}switch_costume {input('COSTUME')}" + next_block()
-            
-            case 'looks_costume':
-                return field('COSTUME')
-            
-            case 'looks_switchbackdropto':
-                return f"{indent}switch_backdrop {input('BACKDROP')}" + next_block()
-            
-            case 'looks_backdrops':
-                return field('BACKDROP')
+@handler('looks_thinkforsecs')
+def looks_thinkforsecs(ctx: BlockContext):
+    yield f"{ctx.indent}think {(yield from ctx.input('MESSAGE'))}, {(yield from ctx.input_num('SECS'))}"
+    yield from ctx.next_block()
 
-            case 'looks_nextcostume':
-                return f"{indent}next_costume" + next_block()
 
-            case 'looks_nextbackdrop':
-                return f"{indent}next_backdrop" + next_block()
+@handler('looks_show')
+def looks_show(ctx: BlockContext):
+    yield f"{ctx.indent}show"
+    yield from ctx.next_block()
 
-            case 'looks_cleargraphiceffects':
-                return f"{indent}clear_graphic_effects" + next_block()
 
-            case 'looks_seteffectto':
-                return f"{indent}set_{fields['EFFECT'][0].lower()}_effect {input('VALUE')}" + next_block()
+@handler('looks_hide')
+def looks_hide(ctx: BlockContext):
+    yield f"{ctx.indent}hide"
+    yield from ctx.next_block()
 
-            case 'looks_seteffectto':
-                return f"{indent}change_{fields['EFFECT'][0].lower()}_effect {input_num('CHANGE')}" + next_block()
-            
-            case 'looks_setsizeto':
-                return f"{indent}set_size {input('SIZE')}" + next_block()
 
-            case 'looks_changesizeby':
-                return f"{indent}change_size {input_num('CHANGE')}" + next_block()
+@handler('looks_switchcostumeto')
+def looks_switchcostumeto(ctx: BlockContext):
+    yield f"{ctx.indent}switch_costume {(yield from ctx.input('COSTUME'))}"
+    yield from ctx.next_block()
 
-            case 'looks_gotofrontback':
-                return f"{indent}goto_{fields['FRONT_BACK'][0].lower()}" + next_block()
-            
-            case 'looks_goforwardbackwardlayers':
-                return f"{indent}go_{fields['FORWARD_BACKWARD'][0].lower()} {input_num('NUM')}" + next_block()
 
-            case 'looks_costumenumbername':
-                return f"costume_{fields['NUMBER_NAME'][0].lower()}()"
+@handler('looks_costume')
+def looks_costume(ctx: BlockContext):
+    yield ctx.field('COSTUME')
 
-            case 'looks_backdropnumbername':
-                return f"backdrop{fields['NUMBER_NAME'][0].lower()}()"
 
-            case 'looks_size':
-                return "size()"
+@handler('looks_switchbackdropto')
+def looks_switchbackdropto(ctx: BlockContext):
+    yield f"{ctx.indent}switch_backdrop {(yield from ctx.input('BACKDROP'))}"
+    yield from ctx.next_block()
 
 
+@handler('looks_backdrops')
+def looks_backdrops(ctx: BlockContext):
+    yield ctx.field('BACKDROP')
 
-            # SOUNDS
 
-            case 'sound_playuntildone':
-                return f"{indent}play_sound_until_done {input('SOUND_MENU')}" + next_block()
+@handler('looks_nextcostume')
+def looks_nextcostume(ctx: BlockContext):
+    yield f"{ctx.indent}next_costume"
+    yield from ctx.next_block()
 
-            case 'sound_play':
-                return f"{indent}start_sound {input('SOUND_MENU')}" + next_block()
 
-            case 'sound_sounds_menu':
-                return field('SOUND_MENU')
-            
-            case 'sound_stopallsounds':
-                return f"{indent}stop_all_sounds" + next_block()
-            
-            case 'sound_changeeffectby':
-                return f"{indent}change_{fields['EFFECT'][0].lower()}_effect {input_num('VALUE')}" + next_block()
+@handler('looks_nextbackdrop')
+def looks_nextbackdrop(ctx: BlockContext):
+    yield f"{ctx.indent}next_backdrop"
+    yield from ctx.next_block()
 
-            case 'sound_seteffectto':
-                return f"{indent}set_{fields['EFFECT'][0].lower()}_effect {input_num('VALUE')}" + next_block()
 
-            case 'sound_cleareffects':
-                return f"{indent}clear_sound_effects" + next_block()
+@handler('looks_cleargraphiceffects')
+def looks_cleargraphiceffects(ctx: BlockContext):
+    yield f"{ctx.indent}clear_graphic_effects"
+    yield from ctx.next_block()
 
-            case 'sound_changevolumeby':
-                return f"{indent}change_volume {input_num('VOLUME')}" + next_block()
 
-            case 'sound_setvolumeto':
-                return f"{indent}set_volume {input_num('VOLUME')}" + next_block()
+@handler('looks_seteffectto')
+def looks_seteffectto(ctx: BlockContext):
+    yield f"{ctx.indent}set_{ctx.fields['EFFECT'].lower()}_effect {(yield from ctx.input('VALUE'))}"
+    yield from ctx.next_block()
 
-            case 'sound_volume':
-                return "volume()"
 
+@handler('looks_changeeffectby')
+def looks_changeeffectby(ctx: BlockContext):
+    yield f"{ctx.indent}change_{ctx.fields['EFFECT'].lower()}_effect {(yield from ctx.input_num('CHANGE'))}"
+    yield from ctx.next_block()
 
 
-            # EVENTS
-            
-            case 'event_whenflagclicked':
-                return f"onflag {{\n{block_search(next, indent_level+1)}\n}}"
-            
-            case 'event_whenkeypressed':
-                return f"onkey {field('KEY_OPTION', "")} {{\n{block_search(next, indent_level+1)}\n}}"
+@handler('looks_setsizeto')
+def looks_setsizeto(ctx: BlockContext):
+    yield f"{ctx.indent}set_size {(yield from ctx.input('SIZE'))}"
+    yield from ctx.next_block()
 
-            case 'event_whenthisspriteclicked' | 'event_whenstageclicked':
-                return f"onclick {{\n{block_search(next, indent_level+1)}\n}}"
-            
-            case 'event_whenbackdropswitchesto':
-                return f"onbackdrop {field('BACKDROP', "")} {{\n{block_search(next, indent_level+1)}\n}}"
-            
-            case 'event_whengreaterthan':
-                if fields['WHENGREATERTHANMENU'][0] == 'LOUDNESS': 
-                    return f"onloudness {input_num('VALUE', False)} {{\n{block_search(next, indent_level+1)}\n}}"
-                elif fields['WHENGREATERTHANMENU'][0] == 'TIMER':
-                    return f"ontimer {input_num('VALUE', False)} {{\n{block_search(next, indent_level+1)}\n}}"
-                else:
-                    return "# FAILED {opcode}"
-            
-            case 'event_whenbroadcastreceived':
-                return f"on {field('BROADCAST_OPTION')} {{\n{block_search(next, indent_level+1)}\n}}"
-            
-            case 'event_broadcast':
-                return f"{indent}broadcast {input('BROADCAST_INPUT')}" + next_block()
-            
-            case 'event_broadcastandwait':
-                return f"{indent}broadcast_and_wait {input('BROADCAST_INPUT')}" + next_block()
 
+@handler('looks_changesizeby')
+def looks_changesizeby(ctx: BlockContext):
+    yield f"{ctx.indent}change_size {(yield from ctx.input_num('CHANGE'))}"
+    yield from ctx.next_block()
 
 
-            # MOTION
+@handler('looks_gotofrontback')
+def looks_gotofrontback(ctx: BlockContext):
+    yield f"{ctx.indent}goto_{ctx.fields['FRONT_BACK'].lower()}"
+    yield from ctx.next_block()
 
-            case 'motion_movesteps':
-                return f"{indent}move {input_num('STEPS')}" + next_block()
 
-            case 'motion_gotoxy':
-                return f"{indent}goto {input_num('X')}, {input_num('Y')}" + next_block()
-            
-            case 'motion_goto':
-                _target = input('TO')
-                if _target == '"_mouse_"': return f"{indent}goto_mouse_pointer" + next_block()
-                if _target == '"_random_"': return f"{indent}goto_random_position" + next_block()
-                return f"{indent}goto {_target}" + next_block()
-            
-            case 'motion_goto_menu':
-                return field('TO')
+@handler('looks_goforwardbackwardlayers')
+def looks_goforwardbackwardlayers(ctx: BlockContext):
+    yield f"{ctx.indent}go_{ctx.fields['FORWARD_BACKWARD'].lower()} {(yield from ctx.input_num('NUM'))}"
+    yield from ctx.next_block()
 
-            case 'motion_turnright':
-                return f"{indent}turn_right {input_num('DEGREES')}" + next_block()
 
-            case 'motion_turnleft':
-                return f"{indent}turn_left {input_num('DEGREES')}" + next_block()
+@handler('looks_costumenumbername')
+def looks_costumenumbername(ctx: BlockContext):
+    yield f"costume_{ctx.fields['NUMBER_NAME'].lower()}()"
 
-            case 'motion_pointindirection':
-                return f"{indent}point_in_direction {input_num('DIRECTION')}" + next_block()
 
-            case 'motion_pointtowards':
-                _target = input('TOWARDS')
-                if _target == '"_mouse_"': return f"{indent}point_towards_mouse_pointer" + next_block()
-                if _target == '"_random_"': return f"{indent}point_towards_random_direction" + next_block()
-                return f"{indent}point_towards {_target}" + next_block()
+@handler('looks_backdropnumbername')
+def looks_backdropnumbername(ctx: BlockContext):
+    yield f"backdrop{ctx.fields['NUMBER_NAME'].lower()}()"
 
-            case 'motion_pointtowards_menu':
-                return field('TOWARDS')
-            
-            case 'motion_glidesecstoxy':
-                return f"{indent}glide {input_num('X')}, {input_num('Y')}, {input_num('SECS')}" + next_block()
-
-            case 'motion_glideto':
-                _target = input('TO')
-                if _target == '"_mouse_"': return f"{indent}glide_to_mouse_pointer({input_num('SECS')})" + next_block()
-                if _target == '"_random_"': return f"{indent}glide_to_random_position({input_num('SECS')})" + next_block()
-                return f"{indent}glide {_target}, {input_num('SECS')}" + next_block()
-                
-            case 'motion_glideto_menu':
-                return field('TO')
-            
-            case 'motion_ifonedgebounce':
-                return f"{indent}if_on_edge_bounce" + next_block()
 
-            case 'motion_setrotationstyle':
-                _style = {'left-right':'left_right', 'don\'t rotate':'do_not_rotate', 'all around':'all_around'}[fields['STYLE'][0]]
-                return f"set_rotation_style_{_style}"
+@handler('looks_size')
+def looks_size(ctx: BlockContext):
+    yield "size()"
 
-            case 'motion_changexby':
-                return f"{indent}change_x {input_num('DX')}" + next_block()
 
-            case 'motion_setx':
-                return f"{indent}set_x {input_num('X')}" + next_block()
-            
-            case 'motion_changeyby':
-                return f"{indent}change_y {input_num('DY')}" + next_block()
 
-            case 'motion_sety':
-                return f"{indent}set_y {input_num('Y')}" + next_block()
+# SOUNDS
 
-            case 'motion_xposition':
-                return "x_position()"
+@handler('sound_playuntildone')
+def sound_playuntildone(ctx: BlockContext):
+    yield f"{ctx.indent}play_sound_until_done {(yield from ctx.input('SOUND_MENU'))}"
+    yield from ctx.next_block()
 
-            case 'motion_yposition':
-                return "y_position()"
 
-            case 'motion_direction':
-                return "direction()"
+@handler('sound_play')
+def sound_play(ctx: BlockContext):
+    yield f"{ctx.indent}start_sound {(yield from ctx.input('SOUND_MENU'))}"
+    yield from ctx.next_block()
 
 
+@handler('sound_sounds_menu')
+def sound_sounds_menu(ctx: BlockContext):
+    yield ctx.field('SOUND_MENU')
 
-            # CONTROL
 
-            case 'control_repeat':
-                return f"{indent}repeat {input_num('TIMES', False)} {{\n{input_with_stack('SUBSTACK')}\n{indent}}}" + next_block(False)
+@handler('sound_stopallsounds')
+def sound_stopallsounds(ctx: BlockContext):
+    yield f"{ctx.indent}stop_all_sounds"
+    yield from ctx.next_block()
 
-            case 'control_repeat_until':
-                return f"{indent}until {input_with_bool('CONDITION')} {{\n{input_with_stack('SUBSTACK')}\n{indent}}}" + next_block(False)
 
-            case 'control_while':
-                return f"{indent}until not {input_with_bool('CONDITION')} {{\n{input_with_stack('SUBSTACK')}\n{indent}}}" + next_block(False)
+@handler('sound_changeeffectby')
+def sound_changeeffectby(ctx: BlockContext):
+    yield f"{ctx.indent}change_{ctx.fields['EFFECT'].lower()}_effect {(yield from ctx.input_num('VALUE'))}"
+    yield from ctx.next_block()
 
-            case 'control_for_each':
-                _var_name = valid_name(fields['VARIABLE'][0], 'var')
-                return f"{indent}{_var_name} = 1;\n{indent}repeat {input_num('VALUE', False)} {{\n{input_with_stack('SUBSTACK')}\n{indent}    {_var_name}++;\n{indent}}}" + next_block(False)
 
-            case 'control_forever':
-                return f"{indent}forever {{\n{input_with_stack('SUBSTACK')}\n{indent}}}"
+@handler('sound_seteffectto')
+def sound_seteffectto(ctx: BlockContext):
+    yield f"{ctx.indent}set_{ctx.fields['EFFECT'].lower()}_effect {(yield from ctx.input_num('VALUE'))}"
+    yield from ctx.next_block()
 
-            case 'control_wait':
-                return f"{indent}wait {input_num('DURATION')}" + next_block()
 
-            case 'control_wait_until':
-                #return f"{indent}wait_until {input_with_bool('CONDITION')}" + next_block() # TODO, goboscript won't compile this
-                return f"{indent}until {input_with_bool('CONDITION')} {{}} # wait_until" + next_block(False)
+@handler('sound_cleareffects')
+def sound_cleareffects(ctx: BlockContext):
+    yield f"{ctx.indent}clear_sound_effects"
+    yield from ctx.next_block()
 
-            case 'control_if':
-                return f"{indent}if {input_with_bool('CONDITION')} {{\n{input_with_stack('SUBSTACK')}\n{indent}}}" + next_block(False)
 
-            case 'control_if_else':
-                # Adapted from method input_with_stack to handle elif:
-                if 'SUBSTACK2' in inputs:
-                    bi = BlockInput.from_list(inputs['SUBSTACK2'])
-                    if isinstance(bi.block_slot, str):
-                        _opcode = target['blocks'][bi.block_slot]['opcode']
-                        if _opcode == 'control_if' or _opcode == 'control_if_else':
-                            _substack = block_search(bi.block_slot, indent_level).strip()
-                            return f"{indent}if {input_with_bool('CONDITION')} {{\n{input_with_stack('SUBSTACK')}\n{indent}}} el{_substack}" + next_block(False)
+@handler('sound_changevolumeby')
+def sound_changevolumeby(ctx: BlockContext):
+    yield f"{ctx.indent}change_volume {(yield from ctx.input_num('VOLUME'))}"
+    yield from ctx.next_block()
 
-                return f"{indent}if {input_with_bool('CONDITION')} {{\n{input_with_stack('SUBSTACK')}\n{indent}}} else {{\n{input_with_stack('SUBSTACK2')}\n{indent}}}" + next_block(False)
 
-            case 'control_stop':
-                _stop_option = fields['STOP_OPTION'][0]
-                if _stop_option == 'this script':
-                    return f"{indent}stop_this_script;"
-                
-                elif _stop_option == 'other scripts in sprite':
-                    return f"{indent}stop_other_scripts" + next_block()
-                
-                return f"{indent}stop_all;"
+@handler('sound_setvolumeto')
+def sound_setvolumeto(ctx: BlockContext):
+    yield f"{ctx.indent}set_volume {(yield from ctx.input_num('VOLUME'))}"
+    yield from ctx.next_block()
 
-            case 'control_create_clone_of':
-                return f"{indent}clone {input('CLONE_OPTION')}" + next_block()
-                
-            case 'control_create_clone_of_menu':
-                return f"{field('CLONE_OPTION')}"
-            
-            case 'control_delete_this_clone':
-                return f"{indent}delete_this_clone;"
 
-            case 'control_start_as_clone':
-                return f"onclone {{\n{block_search(next, indent_level+1)}\n}}"
-            
-            case 'control_get_counter':
-                return "control_counter"
-
-            case 'control_incr_counter':
-                return "control_counter++" + next_block()
-               
-            case 'control_clear_counter':
-                return "control_counter = 0" + next_block()
-            
-            case 'control_all_at_once':
-                return f"{indent}# control_all_at_once:\n{input_with_stack('SUBSTACK')}" + next_block(False)
-            
+@handler('sound_volume')
+def sound_volume(ctx: BlockContext):
+    yield "volume()"
 
 
-            # SENSING
 
-            case 'sensing_touchingobject':
-                _target = input('TOUCHINGOBJECTMENU')
-                if _target == '"_mouse_"': return "touching_mouse_pointer()"
-                elif _target == '"_edge_"': return "touching_edge()"
-                return f"touching({input('TOUCHINGOBJECTMENU')})"
+# EVENTS
 
-            case 'sensing_touchingobjectmenu':
-                return field('TOUCHINGOBJECTMENU')
-            
-            case 'sensing_touchingcolor':
-                return f"touching_color({input('COLOR')})"
-            
-            case 'sensing_coloristouchingcolor':
-                return f"color_is_touching_color({input('COLOR')}, {input('COLOR2')})"
-            
-            case 'sensing_distanceto':
-                _target = input('DISTANCETOMENU')
-                if _target == '"_mouse_"': return "distance_to_mouse_pointer()"
-                return f"distance_to({target})"
+@handler('event_whenflagclicked')
+def event_whenflagclicked(ctx: BlockContext):
+    yield "onflag"
+    yield from ctx.hat_body()
 
-            case 'sensing_distancetomenu':
-                return field('DISTANCETOMENU')
-            
-            case 'sensing_askandwait':
-                return f"{indent}ask {input('QUESTION')}" + next_block()
-            
-            case 'sensing_answer':
-                return "answer()"
 
-            case 'sensing_keypressed':
-                return f"key_pressed({input('KEY_OPTION')})"
-            
-            case 'sensing_keyoptions':
-                return field('KEY_OPTION')
-            
-            case 'sensing_mousedown':
-                return "mouse_down()"
-            
-            case 'sensing_mousex':
-                return "mouse_x()"
-            
-            case 'sensing_mousey':
-                return "mouse_y()"
-            
-            case 'sensing_setdragmode':
-                if fields['DRAG_MODE'][0] == 'draggable':
-                    return f"{indent}set_drag_mode_draggable" + next_block()
-                return f"{indent}set_drag_mode_not_draggable" + next_block()
+@handler('event_whenkeypressed')
+def event_whenkeypressed(ctx: BlockContext):
+    yield f"onkey {ctx.field('KEY_OPTION', "")}"
+    yield from ctx.hat_body()
 
-            case 'sensing_loudness':
-                return "loudness()"
-            
-            case 'sensing_timer':
-                return "timer()"
-            
-            case 'sensing_resettimer':
-                return f"{indent}reset_timer" + next_block()
 
-            case 'sensing_of':
-                return f"({input('OBJECT', False)}.{field('PROPERTY')})"
+@handler('event_whenthisspriteclicked', 'event_whenstageclicked')
+def event_whenthisspriteclicked(ctx: BlockContext):
+    yield "onclick"
+    yield from ctx.hat_body()
 
-            case 'sensing_of_object_menu':
-                return field('OBJECT')
-            
-            case 'sensing_current':
-                _current_menu = fields['CURRENTMENU'][0]
-                _current_str = {'YEAR':'year', 'MONTH':'month', 'DATE':'date', 'DAYOFWEEK':'day_of_week', 'HOUR':'hour', 'MINUTE':'minute', 'SECOND':'second'}[_current_menu]
-                return f"current_{_current_str}()"
 
-            case 'sensing_dayssince2000':
-                return "days_since_2000()"
-            
-            case 'sensing_username':
-                return "username()"
+@handler('event_whenbackdropswitchesto')
+def event_whenbackdropswitchesto(ctx: BlockContext):
+    yield f"onbackdrop {ctx.field('BACKDROP', "")}"
+    yield from ctx.hat_body()
 
-            case 'sensing_online':
-                return "online()"
 
+@handler('event_whengreaterthan')
+def event_whengreaterthan(ctx: BlockContext):
+    if ctx.fields['WHENGREATERTHANMENU'] == 'LOUDNESS': 
+        yield f"onloudness {(yield from ctx.input_num('VALUE', False))}"
+        yield from ctx.hat_body()
+    elif ctx.fields['WHENGREATERTHANMENU'] == 'TIMER':
+        yield f"ontimer {(yield from ctx.input_num('VALUE', False))}"
+        yield from ctx.hat_body()
+    else:
+        yield f"# FAILED {ctx.opcode}"
 
 
-            # OPERATORS
+@handler('event_whenbroadcastreceived')
+def event_whenbroadcastreceived(ctx: BlockContext):
+    yield f"on {ctx.field('BROADCAST_OPTION')}"
+    yield from ctx.hat_body()
 
-            case 'operator_add':
-                return f"({input_num('NUM1', False)}+{input_num('NUM2', False)})"
 
-            case 'operator_subtract':
-                _arg2 = input_num('NUM2', False)
-                if _arg2.startswith("-"): _arg2 = f"({_arg2})" # wrap with brackets
-                
-                return f"({input_num('NUM1', False)}-{_arg2})"
+@handler('event_broadcast')
+def event_broadcast(ctx: BlockContext):
+    yield f"{ctx.indent}broadcast {(yield from ctx.input('BROADCAST_INPUT'))}"
+    yield from ctx.next_block()
 
-            case 'operator_multiply':
-                return f"({input_num('NUM1', False)}*{input_num('NUM2', False)})"
 
-            case 'operator_divide':
-                return f"({input_num('NUM1', False)}/{input_num('NUM2', False)})"
-            
+@handler('event_broadcastandwait')
+def event_broadcastandwait(ctx: BlockContext):
+    yield f"{ctx.indent}broadcast_and_wait {(yield from ctx.input('BROADCAST_INPUT'))}"
+    yield from ctx.next_block()
 
-            case 'operator_mod':
-                return f"({input_num('NUM1', False)}%{input_num('NUM2', False)})"
 
-            case 'operator_round':
-                return f"round({input_num('NUM')})"
 
+# MOTION
 
-            case 'operator_lt':
-                return f"({input('OPERAND1', False)} < {input('OPERAND2', False)})"
+@handler('motion_movesteps')
+def motion_movesteps(ctx: BlockContext):
+    yield f"{ctx.indent}move {(yield from ctx.input_num('STEPS'))}"
+    yield from ctx.next_block()
 
-            case 'operator_gt':
-                return f"({input('OPERAND1', False)} > {input('OPERAND2', False)})"
 
-            case 'operator_equals':
-                return f"({input('OPERAND1', False)} == {input('OPERAND2', False)})"
-            
-            case 'operator_and':
-                return f"({input_with_bool('OPERAND1')} and {input_with_bool('OPERAND2')})"
-            
-            case 'operator_or':
-                return f"({input_with_bool('OPERAND1')} or {input_with_bool('OPERAND2')})"
+@handler('motion_gotoxy')
+def motion_gotoxy(ctx: BlockContext):
+    yield f"{ctx.indent}goto {(yield from ctx.input_num('X'))}, {(yield from ctx.input_num('Y'))}"
+    yield from ctx.next_block()
 
-            case 'operator_not':
-                return f"(not {input_with_bool('OPERAND')})"
 
+@handler('motion_goto')
+def motion_goto(ctx: BlockContext):
+    _target = yield from ctx.input('TO')
+    if _target == '"_mouse_"': yield f"{ctx.indent}goto_mouse_pointer"
+    elif _target == '"_random_"': yield f"{ctx.indent}goto_random_position"
+    else: yield f"{ctx.indent}goto {_target}"
+    yield from ctx.next_block()
 
-            case 'operator_join':
-                return f"({input('STRING1', False)} & {input('STRING2', False)})"
-            
-            case 'operator_letter_of':
-                return f"{input('STRING', False)}[{input_num('LETTER')}]"
-            
-            case 'operator_length':
-                return f"length({input('STRING')})"
-            
-            case 'operator_contains':
-                return f"contains({input('STRING1')}, {input('STRING2')})"
-                #return f"({input('STRING2')} in {input('STRING1')})" # reversed inputs
-            
-            case 'operator_mathop':
-                _op = fields['OPERATOR'][0]
-                return f"{MATH_OPS[_op]}({input_num('NUM')})"
 
-            case 'operator_random':
-                # pick random might need strings for floating point number picking
-                # future improvement would be to check if that's needed
-                return f"random({input('FROM')}, {input('TO')})"
+@handler('motion_goto_menu')
+def motion_goto_menu(ctx: BlockContext):
+    yield ctx.field('TO')
 
 
+@handler('motion_turnright')
+def motion_turnright(ctx: BlockContext):
+    yield f"{ctx.indent}turn_right {(yield from ctx.input_num('DEGREES'))}"
+    yield from ctx.next_block()
 
-            # DATA
 
-            case 'data_setvariableto':
-                return f"{indent}{valid_name(fields['VARIABLE'][0], 'var')} = {input('VALUE')}" + next_block()
+@handler('motion_turnleft')
+def motion_turnleft(ctx: BlockContext):
+    yield f"{ctx.indent}turn_left {(yield from ctx.input_num('DEGREES'))}"
+    yield from ctx.next_block()
 
-            case 'data_changevariableby':
-                _name = valid_name(fields['VARIABLE'][0], 'var')
-                _val = input_num('VALUE')
-                if _val == "1": return f"{indent}{_name}++" + next_block() # increment
-                return f"{indent}{_name} += {_val}" + next_block()
 
-            case 'data_showvariable':
-                return f"{indent}show {valid_name(fields['VARIABLE'][0], 'var')}" + next_block()
+@handler('motion_pointindirection')
+def motion_pointindirection(ctx: BlockContext):
+    yield f"{ctx.indent}point_in_direction {(yield from ctx.input_num('DIRECTION'))}"
+    yield from ctx.next_block()
 
-            case 'data_hidevariable':
-                return f"{indent}hide {valid_name(fields['VARIABLE'][0], 'var')}" + next_block()
 
-            case 'data_addtolist':
-                return f"{indent}add {input('ITEM')} to {valid_name(fields['LIST'][0], 'list')}" + next_block()
+@handler('motion_pointtowards')
+def motion_pointtowards(ctx: BlockContext):
+    _target = yield from ctx.input('TOWARDS')
+    if _target == '"_mouse_"': yield f"{ctx.indent}point_towards_mouse_pointer"
+    elif _target == '"_random_"': yield f"{ctx.indent}point_towards_random_direction"
+    else: yield f"{ctx.indent}point_towards {_target}"
+    yield from ctx.next_block()
 
-            case 'data_deleteoflist':
-                return f"{indent}delete {valid_name(fields['LIST'][0], 'list')}[{input_num('INDEX')}]" + next_block()
 
-            case 'data_deletealloflist':
-                return f"{indent}delete {valid_name(fields['LIST'][0], 'list')}" + next_block()
+@handler('motion_pointtowards_menu')
+def motion_pointtowards_menu(ctx: BlockContext):
+    yield ctx.field('TOWARDS')
 
-            case 'data_insertatlist':
-                return f"{indent}insert {input('ITEM')} {valid_name(fields['LIST'][0], 'list')}[{input_num('INDEX')}]" + next_block()
 
-            case 'data_replaceitemoflist':
-                return f"{indent}{valid_name(fields['LIST'][0], 'list')}[{input_num('INDEX')}] = {input('ITEM')}" + next_block()
+@handler('motion_glidesecstoxy')
+def motion_glidesecstoxy(ctx: BlockContext):
+    yield f"{ctx.indent}glide {(yield from ctx.input_num('X'))}, {(yield from ctx.input_num('Y'))}, {(yield from ctx.input_num('SECS'))}"
+    yield from ctx.next_block()
 
-            case 'data_itemoflist':
-                return f"{valid_name(fields['LIST'][0], 'list')}[{input_num('INDEX')}]"
 
-            case 'data_itemnumoflist': # (item # of [item] in list)
-                return f"({input('ITEM')} in {valid_name(fields['LIST'][0], 'list')})" 
-            
-            case 'data_lengthoflist':
-                return f"(length {valid_name(fields['LIST'][0], 'list')})"
+@handler('motion_glideto')
+def motion_glideto(ctx: BlockContext):
+    _target = yield from ctx.input('TO')
+    if _target == '"_mouse_"': yield f"{ctx.indent}glide_to_mouse_pointer({(yield from ctx.input_num('SECS'))})"
+    elif _target == '"_random_"': yield f"{ctx.indent}glide_to_random_position({(yield from ctx.input_num('SECS'))})"
+    else: yield f"{ctx.indent}glide {_target}, {(yield from ctx.input_num('SECS'))}"
+    yield from ctx.next_block()
 
-            case 'data_listcontainsitem': # <list contains [item]?>
-                return f"contains({valid_name(fields['LIST'][0], 'list')}, {input('ITEM')})"
-                #return f"({input('ITEM')} in {valid_name(fields['LIST'][0])} > 0)" 
 
-            case 'data_showlist':
-                return f"{indent}show {valid_name(fields['LIST'][0], 'list')}" + next_block()
+@handler('motion_glideto_menu')
+def motion_glideto_menu(ctx: BlockContext):
+    yield ctx.field('TO')
 
-            case 'data_hidelist':
-                return f"{indent}hide {valid_name(fields['LIST'][0], 'list')}" + next_block()
 
+@handler('motion_ifonedgebounce')
+def motion_ifonedgebounce(ctx: BlockContext):
+    yield f"{ctx.indent}if_on_edge_bounce"
+    yield from ctx.next_block()
 
 
-            # CUSTOM BLOCKS
+@handler('motion_setrotationstyle')
+def motion_setrotationstyle(ctx: BlockContext):
+    _style = {'left-right':'left_right', 'don\'t rotate':'do_not_rotate', 'all around':'all_around'}[ctx.fields['STYLE']]
+    yield f"set_rotation_style_{_style}"
 
-            case 'procedures_definition':
-                _code = f"proc {input('custom_block')} {{\n{block_search(next, indent_level+1)}\n}}"
-                if _code.startswith("proc ____s comment {"): return "# proc ____s comment {}"
-                return _code
 
-            case 'procedures_prototype':
-                # note that the proccode is sufficient for identifying a custom block, the argument names do not matter 
-                
-                _arg_names = json.loads(block['mutation']['argumentnames'])
-                _validated_arg_names = [valid_name(a, 'arg') for a in _arg_names]
+@handler('motion_changexby')
+def motion_changexby(ctx: BlockContext):
+    yield f"{ctx.indent}change_x {(yield from ctx.input_num('DX'))}"
+    yield from ctx.next_block()
 
-                if len(_validated_arg_names) > 0:
-                    _validated_arg_names = ' ' + ', '.join(_validated_arg_names)
-                else:
-                    _validated_arg_names = ''
-
-                return f"{valid_name(block['mutation']['proccode'], 'custom')}{_validated_arg_names}"
-
-            case 'procedures_call':
-                args = ''
-                if len(block['inputs']) > 0:
-                    args = f" {', '.join([input(k) for k in block['inputs'].keys()])}"
-                
-                proccode = block['mutation']['proccode']
-
-                # comments
-                if proccode == "// %s":
-                    # remove quotes
-                    args = args.strip()
-                    if args.startswith('"') and args.endswith('"'): args = args[1:-1]
-                    return f"{indent}# {args}" + next_block(False)
-                
-                # debug blocks
-                if proccode == "\u200B\u200Blog\u200B\u200B %s":
-                    return f"{indent}log{args}" + next_block()
-                if proccode == "\u200B\u200Bwarn\u200B\u200B %s":
-                    return f"{indent}warn{args}" + next_block()
-                if proccode == "\u200B\u200Berror\u200B\u200B %s":
-                    return f"{indent}error{args}" + next_block()
-                if proccode == "\u200B\u200Bbreakpoint\u200B\u200B":
-                    return f"{indent}breakpoint{args}" + next_block()
-                
-                return f"{indent}{valid_name(proccode, 'custom')}{args}" + next_block()
-
-            case 'argument_reporter_string_number':
-                return f"${valid_name(fields['VALUE'][0], 'arg')}"
-        
-            case 'argument_reporter_boolean':
-                # mod blocks
-                if fields['VALUE'][0] == "is compiled?":
-                    return "$tw_is_compiled"
-                if fields['VALUE'][0] == "is TurboWarp?":
-                    return "$tw_is_turbowarp"
-                if fields['VALUE'][0] == "is forkphorus?":
-                    return "$tw_is_forkphorus"
-                
-                return f"${valid_name(fields['VALUE'][0], 'arg')}"
 
+@handler('motion_setx')
+def motion_setx(ctx: BlockContext):
+    yield f"{ctx.indent}set_x {(yield from ctx.input_num('X'))}"
+    yield from ctx.next_block()
 
 
-            # PEN
+@handler('motion_changeyby')
+def motion_changeyby(ctx: BlockContext):
+    yield f"{ctx.indent}change_y {(yield from ctx.input_num('DY'))}"
+    yield from ctx.next_block()
 
-            case 'pen_clear':
-                return f"{indent}erase_all" + next_block()
 
-            case 'pen_stamp':
-                return f"{indent}stamp" + next_block()
-            
-            case 'pen_penDown':
-                return f"{indent}pen_down" + next_block()
-            
-            case 'pen_penUp':
-                return f"{indent}pen_up" + next_block()
-            
-            case 'pen_setPenColorToColor':
-                return f"{indent}set_pen_color {input('COLOR')}" + next_block()
-            
-            case 'pen_changePenColorParamBy':
-                _cp = input('COLOR_PARAM').strip('"')
-                if _cp not in ['hue', 'saturation', 'brightness', 'transparency']:
-                    print('pen_changePenColorParamBy does not support block insertion in goboscript')
-                    return "# pen_changePenColorParamBy"
-                
-                return f"{indent}change_pen_{_cp} {input_num('VALUE')}" + next_block()
-            
-            case 'pen_setPenColorParamTo':
-                _cp = input('COLOR_PARAM').strip('"')
-                if _cp not in ['hue', 'saturation', 'brightness', 'transparency']:
-                    print('pen_setPenColorParamTo does not support block insertion in goboscript')
-                    return "# pen_setPenColorParamTo"
-                
-                return f"{indent}set_pen_{_cp} {input_num('VALUE')}" + next_block()
-
-            case "pen_menu_colorParam":
-                _cp = field('colorParam')
-                if _cp == '"color"':
-                    return '"hue"'
-                return _cp
-
-            case 'pen_changePenSizeBy':
-                return f"{indent}change_pen_size {input_num('SIZE')}" + next_block()
-
-            case 'pen_setPenSizeTo':
-                return f"{indent}set_pen_size {input_num('SIZE')}" + next_block()
-
-            case 'pen_setPenShadeToNumber':
-                not_implemented()
-                return f"{indent}set_pen_shade {input_num('SHADE')}" + next_block()
-            
-            case 'pen_changePenShadeBy':
-                not_implemented()
-                return f"{indent}change_pen_shade {input_num('SHADE')}" + next_block()
+@handler('motion_sety')
+def motion_sety(ctx: BlockContext):
+    yield f"{ctx.indent}set_y {(yield from ctx.input_num('Y'))}"
+    yield from ctx.next_block()
+
+
+@handler('motion_xposition')
+def motion_xposition(ctx: BlockContext):
+    yield "x_position()"
+
+
+@handler('motion_yposition')
+def motion_yposition(ctx: BlockContext):
+    yield "y_position()"
+
+
+@handler('motion_direction')
+def motion_direction(ctx: BlockContext):
+    yield "direction()"
+
+
+
+# CONTROL
+
+@handler('control_repeat')
+def control_repeat(ctx: BlockContext):
+    yield f"{ctx.indent}repeat {(yield from ctx.input_num('TIMES', False))} {{\n"
+    yield from ctx.input_with_stack('SUBSTACK')
+    yield f"\n{ctx.indent}}}"
+    yield from ctx.next_block(False)
+
+
+@handler('control_repeat_until')
+def control_repeat_until(ctx: BlockContext):
+    yield f"{ctx.indent}until {(yield from ctx.input_with_bool('CONDITION'))} {{\n"
+    yield from ctx.input_with_stack('SUBSTACK')
+    yield f"\n{ctx.indent}}}"
+    yield from ctx.next_block(False)
+
+
+@handler('control_while')
+def control_while(ctx: BlockContext):
+    yield f"{ctx.indent}until not {(yield from ctx.input_with_bool('CONDITION'))} {{\n"
+    yield from ctx.input_with_stack('SUBSTACK')
+    yield f"\n{ctx.indent}}}"
+    yield from ctx.next_block(False)
+
+
+@handler('control_for_each')
+def control_for_each(ctx: BlockContext):
+    _var_name = ctx.valid_name(ctx.fields['VARIABLE'], 'var')
+    yield f"{ctx.indent}{_var_name} = 1;\n{ctx.indent}repeat {(yield from ctx.input_num('VALUE', False))} {{\n"
+    yield from ctx.input_with_stack('SUBSTACK')
+    yield f"\n{ctx.indent}    {_var_name}++;\n{ctx.indent}}}"
+    yield from ctx.next_block(False)
+
+
+@handler('control_forever')
+def control_forever(ctx: BlockContext):
+    yield f"{ctx.indent}forever {{\n"
+    yield from ctx.input_with_stack('SUBSTACK')
+    yield f"\n{ctx.indent}}}"
+
+
+@handler('control_wait')
+def control_wait(ctx: BlockContext):
+    yield f"{ctx.indent}wait {(yield from ctx.input_num('DURATION'))}"
+    yield from ctx.next_block()
+
+
+@handler('control_wait_until')
+def control_wait_until(ctx: BlockContext):
+    #return f"{ctx.indent}wait_until {ctx.input_with_bool('CONDITION')}" + ctx.next_block() # TODO, goboscript won't compile this
+    yield f"{ctx.indent}until {(yield from ctx.input_with_bool('CONDITION'))} {{}} # wait_until"
+    yield from ctx.next_block(False)
+
+
+@handler('control_if')
+def control_if(ctx: BlockContext):
+    yield f"{ctx.indent}if {(yield from ctx.input_with_bool('CONDITION'))} {{\n"
+    yield from ctx.input_with_stack('SUBSTACK')
+    yield f"\n{ctx.indent}}}"
+    yield from ctx.next_block(False)
+
+
+@handler('control_if_else')
+def control_if_else(ctx: BlockContext):
+    yield f"{ctx.indent}if {(yield from ctx.input_with_bool('CONDITION'))} {{\n"
+    yield from ctx.input_with_stack('SUBSTACK')
+
+    # Adapted from method input_with_stack to handle elif:
+    if 'SUBSTACK2' in ctx.inputs:
+        bi = ctx.inputs['SUBSTACK2']
+        if isinstance(bi.block_slot, str):
+            _opcode = ctx.blocks[bi.block_slot].opcode
+            if _opcode == 'control_if' or _opcode == 'control_if_else':
+                yield f"\n{ctx.indent}}} el"
+                yield Walk(bi.block_slot, ctx.indent_level, strip=True)
+                yield from ctx.next_block(False)
+                return
+
+    yield f"\n{ctx.indent}}} else {{\n"
+    yield from ctx.input_with_stack('SUBSTACK2')
+    yield f"\n{ctx.indent}}}"
+    yield from ctx.next_block(False)
+
+
+@handler('control_stop')
+def control_stop(ctx: BlockContext):
+    _stop_option = ctx.fields['STOP_OPTION']
+    if _stop_option == 'this script':
+        yield f"{ctx.indent}stop_this_script;"
+
+    elif _stop_option == 'other scripts in sprite':
+        yield f"{ctx.indent}stop_other_scripts"
+        yield from ctx.next_block()
+
+    else:
+        yield f"{ctx.indent}stop_all;"
+
+
+@handler('control_create_clone_of')
+def control_create_clone_of(ctx: BlockContext):
+    yield f"{ctx.indent}clone {(yield from ctx.input('CLONE_OPTION'))}"
+    yield from ctx.next_block()
+
+
+@handler('control_create_clone_of_menu')
+def control_create_clone_of_menu(ctx: BlockContext):
+    yield f"{ctx.field('CLONE_OPTION')}"
+
+
+@handler('control_delete_this_clone')
+def control_delete_this_clone(ctx: BlockContext):
+    yield f"{ctx.indent}delete_this_clone;"
+
+
+@handler('control_start_as_clone')
+def control_start_as_clone(ctx: BlockContext):
+    yield "onclone"
+    yield from ctx.hat_body()
+
+
+@handler('control_get_counter')
+def control_get_counter(ctx: BlockContext):
+    yield "control_counter"
+
+
+@handler('control_incr_counter')
+def control_incr_counter(ctx: BlockContext):
+    yield "control_counter++"
+    yield from ctx.next_block()
+
+
+@handler('control_clear_counter')
+def control_clear_counter(ctx: BlockContext):
+    yield "control_counter = 0"
+    yield from ctx.next_block()
+
+
+@handler('control_all_at_once')
+def control_all_at_once(ctx: BlockContext):
+    yield f"{ctx.indent}# control_all_at_once:\n"
+    yield from ctx.input_with_stack('SUBSTACK')
+    yield from ctx.next_block(False)
+
+
+
+# SENSING
+
+@handler('sensing_touchingobject')
+def sensing_touchingobject(ctx: BlockContext):
+    _target = yield from ctx.input('TOUCHINGOBJECTMENU')
+    if _target == '"_mouse_"': yield "touching_mouse_pointer()"
+    elif _target == '"_edge_"': yield "touching_edge()"
+    else: yield f"touching({_target})"
+
+
+@handler('sensing_touchingobjectmenu')
+def sensing_touchingobjectmenu(ctx: BlockContext):
+    yield ctx.field('TOUCHINGOBJECTMENU')
+
+
+@handler('sensing_touchingcolor')
+def sensing_touchingcolor(ctx: BlockContext):
+    yield f"touching_color({(yield from ctx.input('COLOR'))})"
+
+
+@handler('sensing_coloristouchingcolor')
+def sensing_coloristouchingcolor(ctx: BlockContext):
+    yield f"color_is_touching_color({(yield from ctx.input('COLOR'))}, {(yield from ctx.input('COLOR2'))})"
+
+
+@handler('sensing_distanceto')
+def sensing_distanceto(ctx: BlockContext):
+    _target = yield from ctx.input('DISTANCETOMENU')
+    if _target == '"_mouse_"': yield "distance_to_mouse_pointer()"
+    else: yield f"distance_to({_target})"
+
+
+@handler('sensing_distancetomenu')
+def sensing_distancetomenu(ctx: BlockContext):
+    yield ctx.field('DISTANCETOMENU')
+
+
+@handler('sensing_askandwait')
+def sensing_askandwait(ctx: BlockContext):
+    yield f"{ctx.indent}ask {(yield from ctx.input('QUESTION'))}"
+    yield from ctx.next_block()
+
+
+@handler('sensing_answer')
+def sensing_answer(ctx: BlockContext):
+    yield "answer()"
+
+
+@handler('sensing_keypressed')
+def sensing_keypressed(ctx: BlockContext):
+    yield f"key_pressed({(yield from ctx.input('KEY_OPTION'))})"
+
+
+@handler('sensing_keyoptions')
+def sensing_keyoptions(ctx: BlockContext):
+    yield ctx.field('KEY_OPTION')
+
+
+@handler('sensing_mousedown')
+def sensing_mousedown(ctx: BlockContext):
+    yield "mouse_down()"
 
 
+@handler('sensing_mousex')
+def sensing_mousex(ctx: BlockContext):
+    yield "mouse_x()"
 
-            # MISC
 
-            case _:
-                if next in target['blocks']:
-                    return f"{indent}# unhandled {opcode}\n{block_search(next, indent_level)}"
-                return f"# unhandled {opcode}"
+@handler('sensing_mousey')
+def sensing_mousey(ctx: BlockContext):
+    yield "mouse_y()"
 
-    #print(current_block_id)
-    result = block_search(current_block_id, indent_level=0)
-    if is_commented_out and result[0] != '#':
+
+@handler('sensing_setdragmode')
+def sensing_setdragmode(ctx: BlockContext):
+    if ctx.fields['DRAG_MODE'] == 'draggable':
+        yield f"{ctx.indent}set_drag_mode_draggable"
+    else:
+        yield f"{ctx.indent}set_drag_mode_not_draggable"
+    yield from ctx.next_block()
+
+
+@handler('sensing_loudness')
+def sensing_loudness(ctx: BlockContext):
+    yield "loudness()"
+
+
+@handler('sensing_timer')
+def sensing_timer(ctx: BlockContext):
+    yield "timer()"
+
+
+@handler('sensing_resettimer')
+def sensing_resettimer(ctx: BlockContext):
+    yield f"{ctx.indent}reset_timer"
+    yield from ctx.next_block()
+
+
+@handler('sensing_of')
+def sensing_of(ctx: BlockContext):
+    yield f"({(yield from ctx.input('OBJECT', False))}.{ctx.field('PROPERTY')})"
+
+
+@handler('sensing_of_object_menu')
+def sensing_of_object_menu(ctx: BlockContext):
+    yield ctx.field('OBJECT')
+
+
+@handler('sensing_current')
+def sensing_current(ctx: BlockContext):
+    _current_menu = ctx.fields['CURRENTMENU']
+    _current_str = {'YEAR':'year', 'MONTH':'month', 'DATE':'date', 'DAYOFWEEK':'day_of_week', 'HOUR':'hour', 'MINUTE':'minute', 'SECOND':'second'}[_current_menu]
+    yield f"current_{_current_str}()"
+
+
+@handler('sensing_dayssince2000')
+def sensing_dayssince2000(ctx: BlockContext):
+    yield "days_since_2000()"
+
+
+@handler('sensing_username')
+def sensing_username(ctx: BlockContext):
+    yield "username()"
+
+
+@handler('sensing_online')
+def sensing_online(ctx: BlockContext):
+    yield "online()"
+
+
+
+# OPERATORS
+
+@handler('operator_add')
+def operator_add(ctx: BlockContext):
+    yield f"({(yield from ctx.input_num('NUM1', False))}+{(yield from ctx.input_num('NUM2', False))})"
+
+
+@handler('operator_subtract')
+def operator_subtract(ctx: BlockContext):
+    _arg2 = yield from ctx.input_num('NUM2', False)
+    if _arg2.startswith("-"): _arg2 = f"({_arg2})" # wrap with brackets
+
+    yield f"({(yield from ctx.input_num('NUM1', False))}-{_arg2})"
+
+
+@handler('operator_multiply')
+def operator_multiply(ctx: BlockContext):
+    yield f"({(yield from ctx.input_num('NUM1', False))}*{(yield from ctx.input_num('NUM2', False))})"
+
+
+@handler('operator_divide')
+def operator_divide(ctx: BlockContext):
+    yield f"({(yield from ctx.input_num('NUM1', False))}/{(yield from ctx.input_num('NUM2', False))})"
+
+
+@handler('operator_mod')
+def operator_mod(ctx: BlockContext):
+    yield f"({(yield from ctx.input_num('NUM1', False))}%{(yield from ctx.input_num('NUM2', False))})"
+
+
+@handler('operator_round')
+def operator_round(ctx: BlockContext):
+    yield f"round({(yield from ctx.input_num('NUM'))})"
+
+
+@handler('operator_lt')
+def operator_lt(ctx: BlockContext):
+    yield f"({(yield from ctx.input('OPERAND1', False))} < {(yield from ctx.input('OPERAND2', False))})"
+
+
+@handler('operator_gt')
+def operator_gt(ctx: BlockContext):
+    yield f"({(yield from ctx.input('OPERAND1', False))} > {(yield from ctx.input('OPERAND2', False))})"
+
+
+@handler('operator_equals')
+def operator_equals(ctx: BlockContext):
+    yield f"({(yield from ctx.input('OPERAND1', False))} == {(yield from ctx.input('OPERAND2', False))})"
+
+
+@handler('operator_and')
+def operator_and(ctx: BlockContext):
+    yield f"({(yield from ctx.input_with_bool('OPERAND1'))} and {(yield from ctx.input_with_bool('OPERAND2'))})"
+
+
+@handler('operator_or')
+def operator_or(ctx: BlockContext):
+    yield f"({(yield from ctx.input_with_bool('OPERAND1'))} or {(yield from ctx.input_with_bool('OPERAND2'))})"
+
+
+@handler('operator_not')
+def operator_not(ctx: BlockContext):
+    yield f"(not {(yield from ctx.input_with_bool('OPERAND'))})"
+
+
+@handler('operator_join')
+def operator_join(ctx: BlockContext):
+    yield f"({(yield from ctx.input('STRING1', False))} & {(yield from ctx.input('STRING2', False))})"
+
+
+@handler('operator_letter_of')
+def operator_letter_of(ctx: BlockContext):
+    yield f"{(yield from ctx.input('STRING', False))}[{(yield from ctx.input_num('LETTER'))}]"
+
+
+@handler('operator_length')
+def operator_length(ctx: BlockContext):
+    yield f"length({(yield from ctx.input('STRING'))})"
+
+
+@handler('operator_contains')
+def operator_contains(ctx: BlockContext):
+    yield f"contains({(yield from ctx.input('STRING1'))}, {(yield from ctx.input('STRING2'))})"
+    #return f"({ctx.input('STRING2')} in {ctx.input('STRING1')})" # reversed ctx.inputs
+
+
+@handler('operator_mathop')
+def operator_mathop(ctx: BlockContext):
+    _op = ctx.fields['OPERATOR']
+    yield f"{MATH_OPS[_op]}({(yield from ctx.input_num('NUM'))})"
+
+
+@handler('operator_random')
+def operator_random(ctx: BlockContext):
+    # pick random might need strings for floating point number picking
+    # future improvement would be to check if that's needed
+    yield f"random({(yield from ctx.input('FROM'))}, {(yield from ctx.input('TO'))})"
+
+
+
+# DATA
+
+@handler('data_setvariableto')
+def data_setvariableto(ctx: BlockContext):
+    yield f"{ctx.indent}{ctx.valid_name(ctx.fields['VARIABLE'], 'var')} = {(yield from ctx.input('VALUE'))}"
+    yield from ctx.next_block()
+
+
+@handler('data_changevariableby')
+def data_changevariableby(ctx: BlockContext):
+    _name = ctx.valid_name(ctx.fields['VARIABLE'], 'var')
+    _val = yield from ctx.input_num('VALUE')
+    if _val == "1": yield f"{ctx.indent}{_name}++" # increment
+    else: yield f"{ctx.indent}{_name} += {_val}"
+    yield from ctx.next_block()
+
+
+@handler('data_showvariable')
+def data_showvariable(ctx: BlockContext):
+    yield f"{ctx.indent}show {ctx.valid_name(ctx.fields['VARIABLE'], 'var')}"
+    yield from ctx.next_block()
+
+
+@handler('data_hidevariable')
+def data_hidevariable(ctx: BlockContext):
+    yield f"{ctx.indent}hide {ctx.valid_name(ctx.fields['VARIABLE'], 'var')}"
+    yield from ctx.next_block()
+
+
+@handler('data_addtolist')
+def data_addtolist(ctx: BlockContext):
+    yield f"{ctx.indent}add {(yield from ctx.input('ITEM'))} to {ctx.valid_name(ctx.fields['LIST'], 'list')}"
+    yield from ctx.next_block()
+
+
+@handler('data_deleteoflist')
+def data_deleteoflist(ctx: BlockContext):
+    yield f"{ctx.indent}delete {ctx.valid_name(ctx.fields['LIST'], 'list')}[{(yield from ctx.input_num('INDEX'))}]"
+    yield from ctx.next_block()
+
+
+@handler('data_deletealloflist')
+def data_deletealloflist(ctx: BlockContext):
+    yield f"{ctx.indent}delete {ctx.valid_name(ctx.fields['LIST'], 'list')}"
+    yield from ctx.next_block()
+
+
+@handler('data_insertatlist')
+def data_insertatlist(ctx: BlockContext):
+    yield f"{ctx.indent}insert {(yield from ctx.input('ITEM'))} {ctx.valid_name(ctx.fields['LIST'], 'list')}[{(yield from ctx.input_num('INDEX'))}]"
+    yield from ctx.next_block()
+
+
+@handler('data_replaceitemoflist')
+def data_replaceitemoflist(ctx: BlockContext):
+    yield f"{ctx.indent}{ctx.valid_name(ctx.fields['LIST'], 'list')}[{(yield from ctx.input_num('INDEX'))}] = {(yield from ctx.input('ITEM'))}"
+    yield from ctx.next_block()
+
+
+@handler('data_itemoflist')
+def data_itemoflist(ctx: BlockContext):
+    yield f"{ctx.valid_name(ctx.fields['LIST'], 'list')}[{(yield from ctx.input_num('INDEX'))}]"
+
+
+@handler('data_itemnumoflist') # (item # of [item] in list)
+def data_itemnumoflist(ctx: BlockContext):
+    yield f"({(yield from ctx.input('ITEM'))} in {ctx.valid_name(ctx.fields['LIST'], 'list')})" 
+
+
+@handler('data_lengthoflist')
+def data_lengthoflist(ctx: BlockContext):
+    yield f"(length {ctx.valid_name(ctx.fields['LIST'], 'list')})"
+
+
+@handler('data_listcontainsitem') # <list contains [item]?>
+def data_listcontainsitem(ctx: BlockContext):
+    yield f"contains({ctx.valid_name(ctx.fields['LIST'], 'list')}, {(yield from ctx.input('ITEM'))})"
+    #return f"({ctx.input('ITEM')} in {ctx.valid_name(ctx.fields['LIST'])} > 0)" 
+
+
+@handler('data_showlist')
+def data_showlist(ctx: BlockContext):
+    yield f"{ctx.indent}show {ctx.valid_name(ctx.fields['LIST'], 'list')}"
+    yield from ctx.next_block()
+
+
+@handler('data_hidelist')
+def data_hidelist(ctx: BlockContext):
+    yield f"{ctx.indent}hide {ctx.valid_name(ctx.fields['LIST'], 'list')}"
+    yield from ctx.next_block()
+
+
+
+# CUSTOM BLOCKS
+
+def is_warp(mutation) -> bool:
+    """True if a custom block runs without screen refresh. `warp` is a string in project.json, but may be a bool."""
+    if mutation is None: return False
+    warp = mutation.get('warp', False)
+    if isinstance(warp, str): return warp.lower() == 'true'
+    return bool(warp)
+
+
+@handler('procedures_definition')
+def procedures_definition(ctx: BlockContext):
+    bi = ctx.inputs.get('custom_block')
+    prototype_block = None
+    if bi is not None:
+        prototype_block = ctx.blocks.get(bi.block_slot if isinstance(bi.block_slot, str) else bi.shadow_slot)
+
+    # the proccode is compared as the prototype's code has a valid name
+    if prototype_block is not None and (prototype_block.mutation or {}).get('proccode') == "____s comment": 
+        yield "# proc ____s comment {}"
+        return
+
+    _prototype = yield from ctx.input('custom_block')
+
+    # procs run without screen refresh by default in goboscript, so only those that don't are marked
+    if prototype_block is not None and not is_warp(prototype_block.mutation):
+        yield f"nowarp proc {_prototype}"
+    else:
+        yield f"proc {_prototype}"
+    yield from ctx.hat_body()
+
+
+@handler('procedures_prototype')
+def procedures_prototype(ctx: BlockContext):
+    # note that the proccode is sufficient for identifying a custom block, the argument names do not matter 
+
+    _arg_names = json.loads(ctx.block.mutation['argumentnames'])
+    _validated_arg_names = [ctx.valid_name(a, 'arg') for a in _arg_names]
+
+    if len(_validated_arg_names) > 0:
+        _validated_arg_names = ' ' + ', '.join(_validated_arg_names)
+    else:
+        _validated_arg_names = ''
+
+    yield f"{ctx.valid_name(ctx.block.mutation['proccode'], 'custom')}{_validated_arg_names}"
+
+
+@handler('procedures_call')
+def procedures_call(ctx: BlockContext):
+    args = ''
+    if len(ctx.inputs) > 0:
+        _args = []
+        for k in ctx.inputs.keys():
+            _args.append((yield from ctx.input(k)))
+        args = f" {', '.join(_args)}"
+
+    proccode = ctx.block.mutation['proccode']
+
+    # comments
+    if proccode == "// %s":
+        # remove quotes
+        args = args.strip()
+        if args.startswith('"') and args.endswith('"'): args = args[1:-1]
+        yield f"{ctx.indent}# {args}"
+        yield from ctx.next_block(False)
+        return
+
+    # debug blocks
+    if proccode == "\u200B\u200Blog\u200B\u200B %s":
+        yield f"{ctx.indent}log{args}"
+    elif proccode == "\u200B\u200Bwarn\u200B\u200B %s":
+        yield f"{ctx.indent}warn{args}"
+    elif proccode == "\u200B\u200Berror\u200B\u200B %s":
+        yield f"{ctx.indent}error{args}"
+    elif proccode == "\u200B\u200Bbreakpoint\u200B\u200B":
+        yield f"{ctx.indent}breakpoint{args}"
+    else:
+        yield f"{ctx.indent}{ctx.valid_name(proccode, 'custom')}{args}"
+    yield from ctx.next_block()
+
+
+@handler('argument_reporter_string_number')
+def argument_reporter_string_number(ctx: BlockContext):
+    yield f"${ctx.valid_name(ctx.fields['VALUE'], 'arg')}"
+
+
+@handler('argument_reporter_boolean')
+def argument_reporter_boolean(ctx: BlockContext):
+    # mod blocks
+    if ctx.fields['VALUE'] == "is compiled?":
+        yield "$tw_is_compiled"
+    elif ctx.fields['VALUE'] == "is TurboWarp?":
+        yield "$tw_is_turbowarp"
+    elif ctx.fields['VALUE'] == "is forkphorus?":
+        yield "$tw_is_forkphorus"
+    else:
+        yield f"${ctx.valid_name(ctx.fields['VALUE'], 'arg')}"
+
+
+
+# PEN
+
+@handler('pen_clear')
+def pen_clear(ctx: BlockContext):
+    yield f"{ctx.indent}erase_all"
+    yield from ctx.next_block()
+
+
+@handler('pen_stamp')
+def pen_stamp(ctx: BlockContext):
+    yield f"{ctx.indent}stamp"
+    yield from ctx.next_block()
+
+
+@handler('pen_penDown')
+def pen_penDown(ctx: BlockContext):
+    yield f"{ctx.indent}pen_down"
+    yield from ctx.next_block()
+
+
+@handler('pen_penUp')
+def pen_penUp(ctx: BlockContext):
+    yield f"{ctx.indent}pen_up"
+    yield from ctx.next_block()
+
+
+@handler('pen_setPenColorToColor')
+def pen_setPenColorToColor(ctx: BlockContext):
+    yield f"{ctx.indent}set_pen_color {(yield from ctx.input('COLOR'))}"
+    yield from ctx.next_block()
+
+
+@handler('pen_changePenColorParamBy')
+def pen_changePenColorParamBy(ctx: BlockContext):
+    _cp = (yield from ctx.input('COLOR_PARAM')).strip('"')
+    if _cp not in ['hue', 'saturation', 'brightness', 'transparency']:
+        ctx.warn('pen_changePenColorParamBy does not support block insertion in goboscript')
+        yield "# pen_changePenColorParamBy"
+        return
+
+    yield f"{ctx.indent}change_pen_{_cp} {(yield from ctx.input_num('VALUE'))}"
+    yield from ctx.next_block()
+
+
+@handler('pen_setPenColorParamTo')
+def pen_setPenColorParamTo(ctx: BlockContext):
+    _cp = (yield from ctx.input('COLOR_PARAM')).strip('"')
+    if _cp not in ['hue', 'saturation', 'brightness', 'transparency']:
+        ctx.warn('pen_setPenColorParamTo does not support block insertion in goboscript')
+        yield "# pen_setPenColorParamTo"
+        return
+
+    yield f"{ctx.indent}set_pen_{_cp} {(yield from ctx.input_num('VALUE'))}"
+    yield from ctx.next_block()
+
+
+@handler('pen_menu_colorParam')
+def pen_menu_colorParam(ctx: BlockContext):
+    _cp = ctx.field('colorParam')
+    if _cp == '"color"':
+        yield '"hue"'
+    else:
+        yield _cp
+
+
+@handler('pen_changePenSizeBy')
+def pen_changePenSizeBy(ctx: BlockContext):
+    yield f"{ctx.indent}change_pen_size {(yield from ctx.input_num('SIZE'))}"
+    yield from ctx.next_block()
+
+
+@handler('pen_setPenSizeTo')
+def pen_setPenSizeTo(ctx: BlockContext):
+    yield f"{ctx.indent}set_pen_size {(yield from ctx.input_num('SIZE'))}"
+    yield from ctx.next_block()
+
+
+@handler('pen_setPenShadeToNumber')
+def pen_setPenShadeToNumber(ctx: BlockContext):
+    ctx.not_implemented()
+    yield f"{ctx.indent}set_pen_shade {(yield from ctx.input_num('SHADE'))}"
+    yield from ctx.next_block()
+
+
+@handler('pen_changePenShadeBy')
+def pen_changePenShadeBy(ctx: BlockContext):
+    ctx.not_implemented()
+    yield f"{ctx.indent}change_pen_shade {(yield from ctx.input_num('SHADE'))}"
+    yield from ctx.next_block()
+
+
+
+# MISC
+
+
+def convert_script(target, current_block_id, shared_project_data, target_index: TargetIndex=None, opcode_times: dict=None) -> str:
+    """Walk a tree of blocks and return a string of indented goboscript code. 
+    Pass the target's index when converting many scripts of the same target so it is only built once.
+    Pass a dict as `opcode_times` to add the seconds spent in the handler of each opcode to it.
+    If `shared_project_data` has a `codecache.CodeCache` as 'code_cache', the code of stacks converted before (in this or other scripts) is reused."""
+
+    if target_index is None: target_index = TargetIndex(target)
+    blocks = target_index.blocks
+
+    is_commented_out = False
+    if blocks.get(current_block_id) is not None and blocks[current_block_id].opcode not in HATS:
+        is_commented_out = True
+
+    code_cache: CodeCache = shared_project_data.get('code_cache')
+    if code_cache is not None:
+        structure = code_cache.get_structure(target_index, current_block_id)
+        if structure is None: code_cache = None # converted without the cache
+
+    script = ScriptContext(target, target_index, shared_project_data, is_commented_out, code_cache)
+
+    def block_search(block_id: str, indent_level=0):
+        ctx = BlockContext(script, blocks[block_id], indent_level)
+        block_handler = HANDLERS.get(ctx.opcode, unhandled)(ctx)
+        if opcode_times is not None: return timed(block_handler, ctx.opcode, opcode_times)
+        return block_handler
+
+    def start_recording(key, indent_level):
+        """Start recording what the code of a stack depends on so it can be cached once done. Returns (key, recording) or None if not caching."""
+        if code_cache is None: return None
+        recording = Recording(indent_level)
+        script.recordings.append(recording)
+        return (key, recording)
+
+    # The walker. Each frame is a running handler and what to do with its code once it finishes. 
+    # The blocks of a stack replace each other in the same frame so long stacks don't build up frames.
+    output = [] # fragments of code, joined at the end
+    size = 0 # total length of the fragments, used to tell if a block produced any code
+
+    def end_walk(request: Walk, start, start_size):
+        nonlocal size
+        if size == start_size:
+            # no code was produced, remove the prefix
+            size -= len(output[start-1])
+            output[start-1] = ''
+        
+        elif request.strip:
+            size -= strip_fragments(output, start, INDENT_START + INDENT_MARK if code_cache is not None else '')
+
+    key = None if code_cache is None else structure.key(current_block_id)
+    cached = None if code_cache is None else code_cache.lookup(script, key, 0)
+    if cached is None:
+        frames = [[block_search(current_block_id, indent_level=0), None, 0, 0, [], start_recording(key, 0)]]
+    else:
+        frames = []
+        output.append(cached)
+    
+    value = None
+    while frames:
+        frame = frames[-1]
+        block_handler, request, start, start_size, prefixes, memo = frame
+        try:
+            item = block_handler.send(value)
+        except StopIteration:
+            frames.pop()
+            value = None
+
+            # remove the prefixes of next blocks that produced no code
+            for index, size_after_prefix in reversed(prefixes):
+                if size != size_after_prefix: break
+                size -= len(output[index])
+                output[index] = ''
+
+            if memo is not None:
+                code = ''.join(output[start:])
+                output[start:] = [code] # so outer stacks join fewer fragments
+                script.recordings.pop()
+                code_cache.store(script, memo[0], memo[1], code)
+                if script.recordings: script.recordings[-1].add(memo[1])
+            
+            if isinstance(request, Capture):
+                value = ''.join(output[start:])
+                del output[start:]
+                size -= len(value)
+
+                # indentation of a reporter's code is from level 0, not relative to the stack it's in
+                if script.recordings and request.indent_level == 0 and INDENT_START in value: script.recordings[-1].shiftable = False
+            
+            elif isinstance(request, Walk):
+                end_walk(request, start, start_size)
+            continue
+        
+        value = None
+        if isinstance(item, str):
+            output.append(item)
+            size += len(item)
+
+        elif isinstance(item, Capture):
+            if item.block_id is None or item.block_id == "":
+                value = ""
+            else:
+                frames.append([block_search(item.block_id, item.indent_level), item, len(output), size, [], None])
+
+        elif isinstance(item, Walk):
+            if item.block_id is not None and item.block_id != "":
+                output.append(item.prefix)
+                size += len(item.prefix)
+
+                key = None if code_cache is None else structure.key(item.block_id)
+                cached = None if code_cache is None else code_cache.lookup(script, key, item.indent_level)
+                if cached is None:
+                    frames.append([block_search(item.block_id, item.indent_level), item, len(output), size, [], start_recording(key, item.indent_level)])
+                else:
+                    output.append(cached)
+                    size += len(cached)
+                    end_walk(item, len(output)-1, size-len(cached))
+        
+        elif isinstance(item, Next):
+            if item.block_id is not None and item.block_id != "":
+                if prefixes and size != prefixes[-1][1]: 
+                    prefixes.clear() # code came after these prefixes so they stay
+                output.append(item.prefix)
+                size += len(item.prefix)
+                prefixes.append((len(output)-1, size))
+                frame[0] = block_search(item.block_id, item.indent_level)
+    
+    result = ''.join(output)
+    if code_cache is not None: result = result.replace(INDENT_START, '').replace(INDENT_MARK, '    ')
+    if is_commented_out and not result.startswith('#'):
         result = '# ' + result
     
     return result
@@ -801,4 +1442,4 @@ def recursive_block_search(target, current_block_id, shared_project_data) -> str
 if __name__ == '__main__':
     pass
     
-    #print(valid_name('1test hello'))
\ No newline at end of file
+    #print(valid_name('1test hello'))
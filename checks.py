@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import convert_project
+from manifest import MANIFEST_FILE_NAME
+from utilities import validate_name
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_output_digests(directory):
+    """Return a dict of each file's relative path (with forward slashes) and its sha256 digest. The manifest is skipped as it holds modification times."""
+
+    digests = {}
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            if file_name == MANIFEST_FILE_NAME: continue
+            path = os.path.join(root, file_name)
+            with open(path, 'rb') as f:
+                digests[os.path.relpath(path, directory).replace(os.sep, '/')] = hashlib.file_digest(f, 'sha256').hexdigest()
+
+    return dict(sorted(digests.items()))
+
+
+def get_tree_digest(digests: dict):
+    """Combine the file digests of an output into one."""
+
+    tree_hash = hashlib.sha256()
+    for path, digest in digests.items():
+        tree_hash.update(f'{path}\0{digest}\n'.encode())
+    return tree_hash.hexdigest()
+
+
+def _convert_in_subprocess(project_path, output_directory, hash_seed):
+    # the child runs in the source folder, so paths relative to the caller are made absolute
+    project_path = os.path.abspath(project_path)
+    output_directory = os.path.abspath(output_directory)
+    code = f'import convert_project; convert_project.convert_project({str(project_path)!r}, {str(output_directory)!r}, incremental=False, deterministic=True)'
+    env = {**os.environ, 'PYTHONHASHSEED': str(hash_seed)}
+    result = subprocess.run([sys.executable, '-c', code], cwd=SOURCE_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0: raise Exception(f'Conversion failed: {result.stderr.strip()}')
+
+
+def check_reproducible(project_path, runs=2):
+    """Convert a project `runs` times in deterministic mode, each in a new interpreter with a different hash seed, and compare the outputs.
+    Returns (is reproducible, list of tree digests, list of paths that differ)."""
+
+    tree_digests = []
+    different_paths = set()
+    first_digests = None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for run in range(runs):
+            output_directory = os.path.join(temp_dir, str(run))
+            os.makedirs(output_directory)
+            _convert_in_subprocess(project_path, output_directory, run + 1)
+
+            digests = get_output_digests(output_directory)
+            tree_digests.append(get_tree_digest(digests))
+
+            if first_digests is None:
+                first_digests = digests
+            else:
+                different_paths.update(p for p in first_digests.keys() | digests.keys() if first_digests.get(p) != digests.get(p))
+
+    return len(set(tree_digests)) == 1, tree_digests, sorted(different_paths)
+
+
+def print_reproducible(project_path, runs=2):
+    is_reproducible, tree_digests, different_paths = check_reproducible(project_path, runs)
+    for digest in tree_digests: print(digest)
+
+    if is_reproducible:
+        print(f'Reproducible over {runs} runs: {project_path}')
+    else:
+        print(f'NOT reproducible over {runs} runs: {project_path}')
+        for path in different_paths: print(f'  {path}')
+
+    return is_reproducible
+
+
+def parse_warp(value) -> bool:
+    """Read the `warp` of a custom block's mutation: the string 'true' or 'false' in project.json, or a bool. 
+    Kept apart from `blocks.is_warp` so the check doesn't share a mistake with the converter."""
+
+    if isinstance(value, bool): return value
+    return str(value).strip().lower() == 'true'
+
+
+def get_project_warps(project_data) -> dict:
+    """Return a dict of each goboscript file name and a dict of its procedure names and whether they run without screen refresh, 
+    as a sorted list as a name can be defined more than once. Found from project.json, with targets given their goboscript names (see `convert_project.validate_target_names`)."""
+
+    warps = {}
+    for target in project_data['targets']:
+        target_warps = {}
+        target_blocks = target['blocks']
+        for block in target_blocks.values():
+            if not isinstance(block, dict) or block['opcode'] != 'procedures_definition': continue
+
+            slots = block.get('inputs', {}).get('custom_block', [])[1:]
+            prototype = next((target_blocks[slot] for slot in slots if isinstance(slot, str) and isinstance(target_blocks.get(slot), dict)), None)
+            if prototype is None or prototype['mutation']['proccode'] == '____s comment': continue # kept as a comment
+            target_warps.setdefault(validate_name(prototype['mutation']['proccode']), []).append(parse_warp(prototype['mutation'].get('warp')))
+
+        warps[target['name'] + '.gs'] = {name: sorted(values) for name, values in target_warps.items()} # a later target with the same file name replaces the earlier
+
+    return warps
+
+
+def get_output_warps(files: dict) -> dict:
+    """Return the procedures of each goboscript file of an output as in `get_project_warps`, given a dict of paths and contents such as from `convert_project.convert_project_in_memory`."""
+
+    warps = {}
+    for path, text in files.items():
+        if not path.endswith('.gs'): continue
+        target_warps = {}
+        for nowarp, name in re.findall(r'^(nowarp )?proc (\S+)', text, re.MULTILINE):
+            target_warps.setdefault(name, []).append(not nowarp)
+        warps[path] = {name: sorted(values) for name, values in target_warps.items()}
+
+    return warps
+
+
+def check_warp(project_path):
+    """Convert a project and check every custom block kept its run without screen refresh setting.
+    Returns (is the same, list of (file name, procedure name, warps in project, warps in output) that differ)."""
+
+    with open(project_path, 'rb') as f:
+        project_bytes = f.read()
+
+    with zipfile.ZipFile(io.BytesIO(project_bytes)) as project_archive:
+        project_data = json.loads(project_archive.read('project.json'))
+    convert_project.validate_target_names(project_data)
+    project_warps = get_project_warps(project_data)
+    output_warps = get_output_warps(convert_project.convert_project_in_memory(project_bytes))
+
+    differences = []
+    for file_name in sorted(project_warps.keys() | output_warps.keys()):
+        expected = project_warps.get(file_name, {})
+        found = output_warps.get(file_name, {})
+        for name in sorted(expected.keys() | found.keys()):
+            if expected.get(name) != found.get(name): differences.append((file_name, name, expected.get(name, []), found.get(name, [])))
+
+    return len(differences) == 0, differences
+
+
+def print_warp(project_path):
+    is_same, differences = check_warp(project_path)
+
+    if is_same:
+        print(f'Warp kept on every custom block: {project_path}')
+    else:
+        print(f'Warp NOT kept on every custom block: {project_path}')
+        for file_name, name, expected, found in differences: print(f'  {file_name} {name}: {expected} in project, {found} in output')
+
+    return is_same
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='sb3_to_goboscript_checks',
+        description="Check that converting a Scratch project gives the same output every time, or with --warp that custom blocks keep their run without screen refresh setting."
+    )
+
+    parser.add_argument("input", type=Path, help="sb3 file")
+    parser.add_argument("-n", "--runs", type=int, default=2, help="number of conversions to compare")
+    parser.add_argument("--warp", action='store_true', help="check the warp (run without screen refresh) of every custom block is kept instead")
+
+    args = parser.parse_args()
+    if args.warp: sys.exit(0 if print_warp(args.input) else 1)
+    sys.exit(0 if print_reproducible(args.input, args.runs) else 1)
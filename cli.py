@@ -1,5 +1,10 @@
 import argparse
+import json
+import sys
 import convert_project
+import checks
+import watch
+from profiler import Profiler
 from pathlib import Path
 
 parser = argparse.ArgumentParser(
@@ -9,9 +14,69 @@ parser = argparse.ArgumentParser(
 
 parser.add_argument("input", type=Path, help="sb3 file")
 parser.add_argument("-o", "--output", type=Path, default=None, help="goboscript project output path")
+parser.add_argument("-j", "--jobs", type=int, default=1, help="number of processes used to generate the code of sprites")
+parser.add_argument("--asset-store", type=Path, default=None, help="folder of assets shared between conversions, assets are linked from it instead of copied")
+parser.add_argument("--optimise-assets", action='store_true', help="minify SVGs and losslessly recompress PNGs copied into the output folder, using svgo/scour and oxipng/optipng if installed")
+parser.add_argument("--optimise-cache", type=Path, default=None, metavar="FOLDER", help="folder caching optimised assets by md5 (default: in the temporary directory)")
+parser.add_argument("--list-files", type=int, default=None, metavar="N", help="store lists with more than N items in separate files")
+parser.add_argument("--low-memory", action='store_true', help="parse the project 1 sprite at a time, keeping list data on disk. For very large projects")
+parser.add_argument("--memoize", action='store_true', help="convert copies of the same script or stack once, reusing their code. Faster for projects with many copies")
+parser.add_argument("--deterministic", action='store_true', help="write the same bytes on every platform, using \\n for new lines")
+parser.add_argument("--analyse", action='store_true', help="walk the blocks without writing anything and print a JSON report of unhandled opcodes, warnings, name collisions, scripts without hats and assets")
+parser.add_argument("--check-reproducible", action='store_true', help="convert twice into temporary folders and check the outputs are identical, instead of converting")
+parser.add_argument("--full", action='store_true', help="regenerate every file, even those unchanged since the last conversion")
+parser.add_argument("--zip", action='store_true', help="write the goboscript project into a zip file instead of a folder")
+parser.add_argument("--watch", action='store_true', help="keep running, converting again whenever the input changes. Only changed scripts and new assets are written")
+parser.add_argument("--interval", type=float, default=0.5, help="seconds between checks of the input when watching (default: 0.5)")
+parser.add_argument("--profile", type=Path, default=None, metavar="REPORT", help="write a JSON report of the time and memory used by each phase, sprite and opcode. Sprites are converted 1 at a time")
 
 args = parser.parse_args()
 input_path = args.input
 output_path = args.output
 
-convert_project.convert_project(input_path, output_path)
+
+def reject_options(context, *dests):
+    """Exit with an error if any of the options (by their argparse dest) were given in a mode they don't apply to, `context` being like "with --zip"."""
+    for dest in dests:
+        if getattr(args, dest) != parser.get_default(dest):
+            parser.error(f"--{dest.replace('_', '-')} can't be used {context}")
+
+
+if args.analyse:
+    reject_options('with --analyse', 'output', 'jobs', 'asset_store', 'optimise_assets', 'optimise_cache', 'list_files', 'low_memory', 'memoize', 'deterministic', 
+        'check_reproducible', 'full', 'zip', 'watch', 'interval', 'profile')
+if args.check_reproducible:
+    reject_options('with --check-reproducible', 'output', 'jobs', 'asset_store', 'optimise_assets', 'optimise_cache', 'list_files', 'low_memory', 'memoize', 'deterministic', 
+        'full', 'zip', 'watch', 'interval', 'profile')
+if args.watch:
+    reject_options('with --watch', 'jobs', 'optimise_assets', 'optimise_cache', 'low_memory', 'memoize', 'full', 'zip', 'profile')
+else:
+    reject_options('without --watch', 'interval')
+if args.zip:
+    reject_options('with --zip', 'asset_store', 'full', 'optimise_assets', 'optimise_cache')
+if not args.optimise_assets:
+    reject_options('without --optimise-assets', 'optimise_cache')
+
+if args.analyse:
+    print(json.dumps(convert_project.analyse_project(input_path), indent=2))
+    sys.exit(0)
+
+if args.check_reproducible:
+    sys.exit(0 if checks.print_reproducible(input_path) else 1)
+
+if args.watch:
+    watch.watch(input_path, output_path, args.interval, args.deterministic, args.list_files, args.asset_store)
+    sys.exit(0)
+
+profiler = Profiler(enabled=args.profile is not None)
+profiler.start()
+if args.zip:
+    convert_project.convert_project_to_zip(input_path, output_path, args.jobs, args.deterministic, args.list_files, args.low_memory, profiler, memoize=args.memoize)
+else:
+    convert_project.convert_project(input_path, output_path, args.jobs, args.asset_store, not args.full, args.deterministic, args.list_files, args.low_memory, profiler, memoize=args.memoize, 
+        optimise_assets=args.optimise_assets, optimise_cache=args.optimise_cache)
+profiler.stop()
+
+if args.profile is not None:
+    profiler.save(args.profile)
+    print(f'Saved profile to {args.profile}')
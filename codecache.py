@@ -0,0 +1,151 @@
+import json
+from typing import NamedTuple
+from targetindex import TargetIndex
+from utilities import paused_gc
+
+# While caching, indentation is written as INDENT_START followed by an INDENT_MARK for each level, so cached code can be moved to another level
+# by adding or removing marks. They are noncharacters so never in the code itself, and are replaced with spaces once a script is done.
+INDENT_START = '\uFDD1'
+INDENT_MARK = '\uFDD0'
+
+
+class CachedCode(NamedTuple):
+    code: str
+    indent_level: int # of the stack when converted
+    shiftable: bool # if the code can be used at other levels
+    names: dict # (scratch name, usage): goboscript name, of every name the code used
+    warnings: tuple # printed while converting, printed again when reused
+
+
+class Recording():
+    """What the code of a stack being converted depends on, besides its blocks."""
+
+    __slots__ = ('indent_level', 'names', 'warnings', 'shiftable')
+
+    def __init__(self, indent_level):
+        self.indent_level = indent_level
+        self.names = {}
+        self.warnings = []
+        self.shiftable = True
+
+    def add(self, other):
+        """Add what a stack inside this one depends on, either a `Recording` or `CachedCode`."""
+        self.names.update(other.names)
+        self.warnings.extend(other.warnings)
+        if not other.shiftable: self.shiftable = False
+
+
+def shift_indent(code: str, levels: int) -> str:
+    if levels > 0: return code.replace(INDENT_START, INDENT_START + INDENT_MARK * levels)
+    if levels < 0: return code.replace(INDENT_START + INDENT_MARK * -levels, INDENT_START)
+    return code
+
+
+class ScriptStructure():
+    """The structure of a script's blocks flattened into a list, without their ids. A block is listed with the blocks in its inputs and after it following, 
+    so the structure of a stack is a slice of the list and stacks with the same slice convert to the same code (given the same names)."""
+
+    __slots__ = ('items', 'ranges')
+
+    def __init__(self, items, ranges):
+        self.items = items
+        self.ranges = ranges # block id: (start, end) of its slice
+
+    def key(self, block_id) -> tuple:
+        start, end = self.ranges[block_id]
+        return tuple(self.items[start:end])
+
+
+class CodeCache():
+    """Code of stacks of blocks, shared by every script of a project so copies of a stack are only converted once.
+    Stacks are keyed by their structure: the opcodes, fields, inputs, mutations and attached comments of their blocks but not their ids,
+    so a script copied to another sprite has the same key. The code is kept with the names it used and is only reused if they are the same in the script using it,
+    as a variable may have a different goboscript name in another sprite.
+    `lookups` and `hits` count how often code was asked for and reused."""
+
+    def __init__(self):
+        self.entries = {} # (structure, is commented out): CachedCode
+        self.lookups = 0
+        self.hits = 0
+
+    def get_structure(self, target_index: TargetIndex, top_block_id) -> ScriptStructure:
+        """Return the structure of a script, or None if it can't be cached: if its blocks don't form a tree (such as a block in 2 inputs) or comments contain the indent marks."""
+
+        blocks = target_index.blocks
+        comments = target_index.comments
+        if any(INDENT_START in text or INDENT_MARK in text for text in comments.values()): return None
+
+        items = []
+        starts = {}
+        ranges = {}
+        stack = [top_block_id]
+        with paused_gc(): # many small objects without reference cycles
+            while stack:
+                block_id = stack.pop()
+                if block_id.__class__ is tuple: # all of the block's items are listed
+                    ranges[block_id[0]] = (starts[block_id[0]], len(items))
+                    continue
+                if block_id in starts: return None # listed already, so shared or in a loop
+
+                block = blocks[block_id]
+                starts[block_id] = len(items)
+                stack.append((block_id,))
+
+                # Items are flat so keys are quick to hash. Blocks listed after are marked with 0, and values in slots follow their type number (4 to 13), 
+                # so what each item is can always be told from those before it.
+                next_id = block.next
+                if next_id is not None and next_id in blocks:
+                    stack.append(next_id)
+                    items.append(0)
+                else:
+                    items.append(next_id) # ids of missing blocks are kept
+                
+                items.append(block.opcode)
+                items.append(None if block.mutation is None else json.dumps(block.mutation))
+                items.append(comments.get(next_id)) # the comment of the next block is written by this one
+                items.append(len(block.fields))
+                for name, value in block.fields.items():
+                    items.append(name)
+                    items.append(value)
+                items.append(len(block.inputs))
+                for name, bi in block.inputs.items():
+                    items.append(name)
+                    for slot in (bi.block_slot, bi.shadow_slot):
+                        if slot.__class__ is list:
+                            items.extend(slot[:2]) # the rest is ids and positions
+                        elif slot is not None and slot in blocks:
+                            stack.append(slot)
+                            items.append(0)
+                        else:
+                            items.append(slot)
+
+        return ScriptStructure(items, ranges)
+
+    def lookup(self, script, key: tuple, indent_level):
+        """Return the code of a stack at `indent_level` if a stack of the same structure was converted before with the same names, else None.
+        What the code depends on is added to the script's current recording, and its warnings are printed again."""
+
+        self.lookups += 1
+        try:
+            entry = self.entries.get((key, script.is_commented_out))
+        except TypeError: # unexpected values in a field
+            return None
+        if entry is None: return None
+        if entry.indent_level != indent_level and not entry.shiftable: return None
+
+        target_name = script.target['name']
+        for (name, usage), valid_name in entry.names.items():
+            if script.symbols.get(name, usage, target_name) != valid_name: return None
+
+        self.hits += 1
+        if script.verbose:
+            for message in entry.warnings: print(message)
+        if script.recordings: script.recordings[-1].add(entry)
+
+        return shift_indent(entry.code, indent_level - entry.indent_level)
+
+    def store(self, script, key: tuple, recording: Recording, code):
+        try:
+            self.entries[(key, script.is_commented_out)] = CachedCode(code, recording.indent_level, recording.shiftable, recording.names, tuple(recording.warnings))
+        except TypeError:
+            pass
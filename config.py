@@ -1,4 +1,3 @@
-import os
 import json
 
 
@@ -31,14 +30,14 @@ def get_layers(project_data):
 
 
 
-def create_config_file(project_data, output_directory):
-    """Create a goboscript.toml file."""
+def get_config_text(project_data):
+    """Return the text of a goboscript.toml file, or None if the project has no TurboWarp config."""
     
     for target in project_data['targets']:
         if target['isStage']: 
             config = find_comment_json(target)
             
-            if config is None: return # no config found
+            if config is None: return None # no config found
 
             file = ''
 
@@ -67,12 +66,9 @@ def create_config_file(project_data, output_directory):
 
             file += f"layers = {json.dumps(get_layers(project_data))}"
 
-            with open(os.path.join(output_directory, 'goboscript.toml'), 'w', encoding='utf-8') as f:
-                f.write(file)
-
-            break
-
+            return file
 
+    return None
 
 
 if __name__ == '__main__':
@@ -1,50 +1,160 @@
 import zipfile
 import json
+import io
 import os
+import itertools
+import time
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 import blocks
+from targetindex import TargetIndex
+from blockrecord import convert_blocks
 import utilities as utils
 import assets
 import config
+import listfiles
+import projectstream
+from spill import SpilledList, SpilledText
+from manifest import Manifest, get_target_hashes, get_names_hashes
+from symboltable import SymbolTable
+from codecache import CodeCache
+from optimise import AssetOptimiser, DEFAULT_CACHE_DIR
+from writer import LineBuffer
+from sink import DirectorySink, MemorySink, ZipSink
+from profiler import Profiler
 
 
 def replace_slashes(path:str):
     return path.replace('\\', '/')
 
 
-def convert_project(project_path, output_directory=None):
-    """Create a goboscript project. Copies assets and blocks into a valid file structure for goboscript. 
-    Output is placed in a folder in the same path as the source sb3 file unless otherwise specified."""
+def format_variable_value(value):
+    if isinstance(value, str): return f'"{value}"'
+    if isinstance(value, bool): return ("true" if value else "false")
+    return value
 
-    if not os.path.isfile(project_path): raise Exception(f'Input not a file path: "{project_path}"')
 
-    project_archive = zipfile.ZipFile(project_path, 'r')
-    project_data = json.loads(project_archive.read('project.json'))
-    print(f'Loaded project {project_path}')
+def resolve_declarations(project_data, symbols: SymbolTable, list_file_threshold=None):
+    """Get the names and values of every target's lists and variables, in project order. 
+    Names are resolved up front (see `SymbolTable`) so targets can then be converted independently of each other.
+    Lists with more than `list_file_threshold` items are to be stored in files, see `listfiles.get_list_files`."""
 
+    declarations = []
+    for target in project_data['targets']:
+        lists = []
+        for var in target['lists'].values():
+            lists.append((symbols.get(var[0], 'list', target['name']), var[1]))
+
+        variables = []
+        for var in target['variables'].values():
+            var[1] = format_variable_value(var[1])
+            variables.append((symbols.get(var[0], 'var', target['name']), var[1]))
+        
+        list_files = listfiles.get_list_files(target, lists, list_file_threshold)
+        declarations.append({'lists': lists, 'variables': variables, 'list_files': list_files})
     
-    # Create project folder
-    base_dir, file_name = os.path.split(project_path)
-    project_name = os.path.splitext(file_name)[0]
+    return declarations
 
-    if output_directory is None:
-        output_dir = os.path.join(base_dir, project_name)
-    else:
-        if not os.path.isdir(output_directory): raise Exception(f'Output not a directory: "{output_directory}"')
-        output_dir = os.path.join(output_directory, project_name)
+
+def fill_declarations(target_declarations, target, list_file_threshold=None):
+    """Return the declarations of a target with the values of the full target, for declarations resolved from its metadata only."""
+
+    lists = [(name, var[1]) for (name, _), var in zip(target_declarations['lists'], target['lists'].values())]
+    variables = [(name, format_variable_value(var[1])) for (name, _), var in zip(target_declarations['variables'], target['variables'].values())]
+    list_files = listfiles.get_list_files(target, lists, list_file_threshold)
+    return {'lists': lists, 'variables': variables, 'list_files': list_files}
+
+
+def write_target_code(goboscript_code, target, declarations, remapped_costume_names, remapped_sound_names, shared_project_data, opcode_times=None):
+    """Write the goboscript code of a target line by line to `goboscript_code`, an object with a `write_line` method.
+    `opcode_times` is as in `blocks.convert_script`."""
+
+    write_target_header(goboscript_code, target, declarations, remapped_costume_names, remapped_sound_names)
+
+    # Enumerate over scripts of a target and replace with their translation
+    target_index = TargetIndex(target)
+    for block_id in target_index.top_level:
+        #goboscript_code.write_line(f'# script {block_id} ({block.get('x',0)},{block.get('y',0)})')
+        goboscript_code.write_line(blocks.convert_script(target, block_id, shared_project_data, target_index, opcode_times))
+        goboscript_code.write_line('') # spacing for next
+
+
+def write_target_header(goboscript_code, target, declarations, remapped_costume_names, remapped_sound_names):
+    """Write the code of a target that comes before its scripts: costumes, sounds, lists and variables."""
+
+    goboscript_code.write_line('# Converted from sb3 file\n')
+
+
+    # Hide sprite
+    if (not target.get('visible', True)) and not target['isStage']:
+        goboscript_code.write_line('hide;\n')
+
+
+    # TODO prevent names being potential file paths
+
+    # Costume declaration
+    costumes = []
+    for costume in target['costumes']:
+        md5ext = remapped_costume_names[costume['md5ext']]
+        costumes.append(f'"{replace_slashes(md5ext)}" as {json.dumps(str(costume['name']))}')
     
-    os.makedirs(output_dir, exist_ok=True)
+    if len(costumes) > 0: goboscript_code.write_line('costumes ' + ', '.join(costumes) + ';\n')
 
+
+    # Sound declaration
+    sounds = []
+    for asset in target['sounds']:
+        md5ext = remapped_sound_names[asset['md5ext']]
+        sounds.append(f'"{replace_slashes(md5ext)}" as {json.dumps(str(asset['name']))}')
     
-    #######
+    if len(sounds) > 0: goboscript_code.write_line('sounds ' + ', '.join(sounds) + ';\n')
+
+
+    # List declaration
+    for name, value in declarations['lists']:
+        if name in declarations['list_files']:
+            goboscript_code.write_line(f"list {name} = file ```{declarations['list_files'][name]}```;")
+        elif isinstance(value, SpilledList):
+            goboscript_code.write_line_parts(itertools.chain(['list ', name, ' = '], value.iter_json_array(), [';']))
+        else:
+            goboscript_code.write_line(f"list {name} = {json.dumps(value)};")
+    
+    if len(declarations['lists']) > 0: goboscript_code.write_line('') # extra spacing
+
+
+    # Var declaration
+    for name, value in declarations['variables']:
+        if isinstance(value, SpilledText):
+            goboscript_code.write_line_parts(itertools.chain(['var ', name, ' = '], value.iter_chunks(), [';']))
+        else:
+            goboscript_code.write_line(f"var {name} = {value};")
+
+    if len(declarations['variables']) > 0: goboscript_code.write_line('') # extra spacing
+
+
+def generate_target_code(*args) -> list:
+    """Return the lines of a target's goboscript code, arguments are as in `write_target_code`. Used by worker processes."""
     
-    np = utils.NamePool()
+    goboscript_code = LineBuffer()
+    write_target_code(goboscript_code, *args)
+    return goboscript_code.lines
+
+
+def write_list_data(sink, target_declarations):
+    """Write the lists of a target that are stored in files."""
 
-    # add global vars and lists to name pool
+    list_files = target_declarations['list_files']
+    for name, value in target_declarations['lists']:
+        if name in list_files:
+            sink.write_list_file(list_files[name], value)
 
-    shared_project_data = {'name_pool':np}
 
-    # validate sprite names
+def validate_target_names(project_data):
+    """Give each target the name of its goboscript file (without extension), keeping its name in Scratch as `original_name`."""
+
     for target in project_data['targets']:
         target['original_name'] = target['name'] # note that the name may change affecting blocks
         if target['isStage']: 
@@ -53,82 +163,299 @@ def convert_project(project_path, output_directory=None):
         target['name'] = utils.valid_file_name(target['name'])
 
 
+def get_output_dir(project_path, output_directory=None):
+    """The folder a project is converted into, named after the project and placed in `output_directory` or else next to the project."""
 
-    remapped_costume_names = assets.get_remapped_costume_names(project_data)
-    assets.copy_assets_to_folder(project_archive, output_dir, remapped_costume_names)
+    base_dir, file_name = os.path.split(project_path)
+    project_name = os.path.splitext(file_name)[0]
 
-    remapped_sound_names = assets.get_remapped_sound_names(project_data)
-    assets.copy_assets_to_folder(project_archive, output_dir, remapped_sound_names)
+    if output_directory is None:
+        return os.path.join(base_dir, project_name)
+    
+    if not os.path.isdir(output_directory): raise Exception(f'Output not a directory: "{output_directory}"')
+    return os.path.join(output_directory, project_name)
 
-    # Scripts
-    for i, target in enumerate(project_data['targets']):
-        goboscript_code = []
-        goboscript_code.append('# Converted from sb3 file\n')
 
+def convert_project(project_path, output_directory=None, jobs=1, asset_store=None, incremental=True, deterministic=False, list_file_threshold=None, low_memory=False, profiler: Profiler=None, verbose=True, memoize=False, optimise_assets=False, optimise_cache=None):
+    """Create a goboscript project. Copies assets and blocks into a valid file structure for goboscript. 
+    Output is placed in a folder in the same path as the source sb3 file unless otherwise specified.
+    With more than 1 job, the code of each sprite is generated in a pool of processes and written by a pool of threads.
+    `asset_store` is an optional folder of assets shared between conversions, see `assets.AssetStore`.
+    A manifest of what each file was generated from is kept in the output folder. When `incremental`, files whose inputs haven't changed since the last conversion are left as they are.
+    Lists with more than `list_file_threshold` items are written to files in a lists folder instead of inline, if their items allow it.
+    When `deterministic`, new lines are written as `\\n` on every platform so the output is byte for byte the same anywhere, see `checks.check_reproducible`.
+    When `low_memory`, project.json is parsed incrementally: first without blocks and values, then 1 target at a time with list items and long variable values kept on disk. 
+    Each target is released once written, and `jobs` is ignored.
+    A `profiler.Profiler` records the time and memory of each phase and target. Targets are then converted 1 at a time so they can be measured.
+    When `memoize`, the code of stacks of blocks is cached by their structure so copies of a script or stack (such as in other sprites) are converted once, 
+    see `codecache.CodeCache`. The output is the same either way, and how often code was reused is printed if `verbose`.
+    With more than 1 job, each process has its own cache for the sprites it converts.
+    When `optimise_assets`, assets copied into the folder are optimised (without visible changes) in a pool of processes, with results cached in `optimise_cache` 
+    (a folder in the temporary directory by default), see `optimise.AssetOptimiser`.
+    Progress is printed if `verbose`."""
+
+    if not os.path.isfile(project_path): raise Exception(f'Input not a file path: "{project_path}"')
 
-        # Hide sprite
-        if (not target.get('visible', True)) and not target['isStage']:
-            goboscript_code.append('hide;\n')
+    # Create project folder
+    output_dir = get_output_dir(project_path, output_directory)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(output_dir, {'deterministic': deterministic, 'list_file_threshold': list_file_threshold})
+    if not incremental: manifest.targets = {}
+    if asset_store is not None: asset_store = assets.AssetStore(asset_store)
+    optimiser = AssetOptimiser(optimise_cache or DEFAULT_CACHE_DIR) if optimise_assets else None
 
+    with zipfile.ZipFile(project_path, 'r') as project_archive:
+        convert_archive(project_archive, DirectorySink(output_dir, asset_store, optimiser), manifest, jobs, deterministic, list_file_threshold, low_memory, profiler, verbose, memoize)
+    
+    if optimiser is not None and optimiser.report['assets'] > 0 and verbose: optimiser.print_report()
+    if verbose: print(f'Saved project to {output_dir}')
 
-        # TODO prevent names being potential file paths
 
-        # Costume declaration
-        costumes = []
-        for costume in target['costumes']:
-            md5ext = remapped_costume_names[costume['md5ext']]
-            costumes.append(f'"{replace_slashes(md5ext)}" as {json.dumps(str(costume['name']))}')
-        
-        if len(costumes) > 0: goboscript_code.append('costumes ' + ', '.join(costumes) + ';\n')
+def convert_project_to_zip(project_path, output_directory=None, jobs=1, deterministic=False, list_file_threshold=None, low_memory=False, profiler: Profiler=None, verbose=True, memoize=False):
+    """Create a goboscript project as a single zip file instead of a folder, named and placed like the folder made by `convert_project`.
+    Every file is converted again as there is no manifest, other arguments are as in `convert_project`. See `sink.ZipSink` for how files are stored."""
 
+    if not os.path.isfile(project_path): raise Exception(f'Input not a file path: "{project_path}"')
+    zip_path = get_output_dir(project_path, output_directory) + '.zip'
 
-        # Sound declaration
-        sounds = []
-        for asset in target['sounds']:
-            md5ext = remapped_sound_names[asset['md5ext']]
-            sounds.append(f'"{replace_slashes(md5ext)}" as {json.dumps(str(asset['name']))}')
-        
-        if len(sounds) > 0: goboscript_code.append('sounds ' + ', '.join(sounds) + ';\n')
+    with zipfile.ZipFile(project_path, 'r') as project_archive, ZipSink(zip_path, deterministic) as zip_sink:
+        convert_archive(project_archive, zip_sink, None, jobs, deterministic, list_file_threshold, low_memory, profiler, verbose, memoize)
 
+    if verbose: print(f'Saved project to {zip_path}')
 
-        # List declaration
-        for var in target['lists'].values():
-            goboscript_code.append(f"list {np.get_valid_name(var[0], target=target['name'])} = {json.dumps(var[1])};")
-        
-        if len(target['lists']) > 0: goboscript_code.append('') # extra spacing
 
+def convert_project_in_memory(project, jobs=1, list_file_threshold=None, low_memory=False, profiler: Profiler=None, verbose=False, memoize=False) -> dict:
+    """Convert a project without using the file system for the input or output (besides temporary files in `low_memory` mode).
+    `project` is the bytes of an sb3 file or a binary file-like object of one, other arguments are as in `convert_project`.
+    Returns a dict of relative paths (using forward slashes) and their contents, see `sink.MemorySink`. 
+    Assets are only read from `project` when used, so a file-like object must stay open until then."""
 
-        # Var declaration
-        for var in target['variables'].values():
-            if isinstance(var[1], str): var[1] = f'"{var[1]}"'
-            elif isinstance(var[1], bool): var[1] = ("true" if var[1] else "false")
-            goboscript_code.append(f"var {np.get_valid_name(var[0], target=target['name'])} = {var[1]};")
+    if isinstance(project, (bytes, bytearray, memoryview)): project = io.BytesIO(project)
+    project_archive = zipfile.ZipFile(project, 'r')
 
-        if len(target['variables']) > 0: goboscript_code.append('') # extra spacing
+    memory_sink = MemorySink()
+    convert_archive(project_archive, memory_sink, None, jobs, True, list_file_threshold, low_memory, profiler, verbose, memoize)
+    return memory_sink.files
 
 
-        # Enumerate over blocks of a target, if applicable replace with their translation
-        for block_id, block in target['blocks'].items():
-            
-            if isinstance(block, list): continue # variable or list reporter, not used by goboscript
+def analyse_project(project_path) -> dict:
+    """Find what converting a project would give without writing anything, see `analyse_archive`."""
 
-            if not block['topLevel']: continue # this block is not first in any script, skip
+    if not os.path.isfile(project_path): raise Exception(f'Input not a file path: "{project_path}"')
 
-            # get block and search recursively
-            #goboscript_code.append(f'# script {block_id} ({block.get('x',0)},{block.get('y',0)})')
-            goboscript_code.append(blocks.recursive_block_search(target, block_id, shared_project_data))
-            goboscript_code.append('') # spacing for next
+    with zipfile.ZipFile(project_path, 'r') as project_archive:
+        return {'project': str(project_path), **analyse_archive(project_archive)}
 
 
-        # Save goboscript file
-        goboscript_file_name = os.path.join(output_dir, target['name'] +".gs")
-        with open(goboscript_file_name, 'w', encoding='utf-8') as f:
-            f.write('\n'.join([str(l) for l in goboscript_code])) # save flattened data
+def analyse_archive(project_archive: zipfile.ZipFile) -> dict:
+    """Parse an opened sb3 file and walk the blocks of every script as converting would, but only to report on them. Assets are counted, not read.
+    Returns a dict of counts of targets, scripts and blocks, opcodes without a handler and warnings (each with how many times they came up),
+    scripts commented out for having no hat, names that collided (see `SymbolTable.get_collisions`, and targets sharing a file name), assets, and scripts that failed to convert."""
 
+    start = time.perf_counter()
+    project_data = json.loads(project_archive.read('project.json'))
+    validate_target_names(project_data)
+
+    remapped_costume_names = assets.get_remapped_costume_names(project_data)
+    remapped_sound_names = assets.get_remapped_sound_names(project_data)
+    archive_names = set(project_archive.namelist())
+    md5exts = set(remapped_costume_names) | set(remapped_sound_names)
+
+    symbols = SymbolTable()
+    symbols.add_project(project_data)
+    analysis = {'unhandled': {}, 'warnings': {}}
+    shared_project_data = {'symbols': symbols, 'verbose': False, 'analysis': analysis}
+
+    report = {'targets': len(project_data['targets']), 'scripts': 0, 'blocks': 0, 'unhandled': {}, 'warnings': {}, 'commented_out': [], 'collisions': symbols.get_collisions(),
+        'assets': {'costumes': sum(len(t['costumes']) for t in project_data['targets']), 'sounds': sum(len(t['sounds']) for t in project_data['targets']),
+            'files': len(md5exts), 'missing': sorted(md5ext for md5ext in md5exts if md5ext not in archive_names)},
+        'errors': [], 'seconds': None}
+
+    # a later target with the same file name replaces the earlier, so only the last is walked and the others are listed as collisions
+    targets = {}
+    for target in project_data['targets']:
+        targets.setdefault(target['name'], []).append(target)
+    for name, same_name_targets in targets.items():
+        if len(same_name_targets) < 2: continue
+        for target in same_name_targets:
+            report['collisions'].append({'target': name, 'usage': 'target', 'scratch_name': target['original_name'], 'goboscript_name': name})
+
+    for same_name_targets in targets.values():
+        target = same_name_targets[-1]
+        target_index = TargetIndex(target)
+        report['scripts'] += len(target_index.top_level)
+        report['blocks'] += len(target_index.blocks)
+
+        for block_id in target_index.top_level:
+            opcode = target_index.blocks[block_id].opcode
+            if opcode not in blocks.HATS: report['commented_out'].append({'target': target['name'], 'block_id': block_id, 'opcode': opcode})
+            try:
+                blocks.convert_script(target, block_id, shared_project_data, target_index)
+            except Exception as e:
+                report['errors'].append({'target': target['name'], 'block_id': block_id, 'error': f'{type(e).__name__}: {e}'})
+
+    report['unhandled'] = dict(sorted(analysis['unhandled'].items()))
+    report['warnings'] = dict(sorted(analysis['warnings'].items()))
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def convert_archive(project_archive: zipfile.ZipFile, sink, manifest: Manifest=None, jobs=1, deterministic=False, list_file_threshold=None, low_memory=False, profiler: Profiler=None, verbose=True, memoize=False):
+    """Convert an opened sb3 file, writing each file of the goboscript project to `sink`, see `sink.DirectorySink` and `sink.MemorySink`.
+    If a `manifest` of the previous conversion to the same place is given, unchanged targets are skipped and it is updated. Other arguments are as in `convert_project`."""
+
+    if profiler is None: profiler = Profiler(enabled=False)
+    if profiler.enabled: jobs = 1
+
+    with profiler.phase('read'):
+        if low_memory:
+            project_data = projectstream.read_metadata(project_archive)
+        else:
+            project_json = project_archive.read('project.json')
+    
+    if not low_memory:
+        with profiler.phase('parse'):
+            project_data = json.loads(project_json)
+            del project_json
+    if verbose: print(f'Loaded project {project_archive.filename or ""}')
+
+    
+    #######
 
-    config.create_config_file(project_data, output_dir)
+    validate_target_names(project_data)
+
+    with profiler.phase('assets'):
+        remapped_costume_names = assets.get_remapped_costume_names(project_data)
+        remapped_sound_names = assets.get_remapped_sound_names(project_data)
+        if manifest is not None: manifest.update_assets(remapped_costume_names, remapped_sound_names)
+        sink.add_assets(project_archive, remapped_costume_names, remapped_sound_names)
+
+    # Names of every variable, list, procedure and argument
+    with profiler.phase('symbols'):
+        symbols = SymbolTable()
+        symbols.add_project(project_data)
+        shared_project_data = {'symbols': symbols, 'verbose': verbose, 'code_cache': CodeCache() if memoize else None}
+
+    with profiler.phase('declarations'):
+        declarations = resolve_declarations(project_data, symbols, list_file_threshold)
+    newline = '\n' if deterministic else None
+
+    with profiler.phase('targets'):
+        if low_memory:
+            changed_targets, target_hashes = write_targets_low_memory(project_archive, project_data, declarations, sink, manifest, 
+                remapped_costume_names, remapped_sound_names, shared_project_data, list_file_threshold, newline, profiler)
+        else:
+            changed_targets, target_hashes = write_targets(project_data, declarations, sink, manifest, jobs, 
+                remapped_costume_names, remapped_sound_names, shared_project_data, newline, profiler)
     
-    print(f'Saved project to {output_dir}')
+    code_cache = shared_project_data['code_cache']
+    if code_cache is not None and code_cache.lookups > 0 and verbose: 
+        print(f'Reused the code of {code_cache.hits} of {code_cache.lookups} stacks ({code_cache.hits / code_cache.lookups:.0%})')
+
+    unchanged_count = len(target_hashes) - len(changed_targets)
+    if unchanged_count > 0 and verbose: print(f'{unchanged_count} of {len(target_hashes)} targets unchanged')
+
+    if manifest is not None:
+        with profiler.phase('save manifest'):
+            for file_name, list_files in changed_targets.items():
+                manifest.record(file_name, target_hashes[file_name], list_files)
+            manifest.targets = {file_name: manifest.targets[file_name] for file_name in target_hashes} # forget removed targets
+            manifest.save()
+
+    with profiler.phase('config'):
+        config_text = config.get_config_text(project_data)
+        if config_text is not None: sink.write_text('goboscript.toml', config_text, newline)
+
+
+def is_target_unchanged(manifest: Manifest, file_name, target_hashes):
+    # the paths of the list files are part of the hashes, so those recorded are the ones the target needs
+    return manifest is not None and manifest.is_unchanged(file_name, target_hashes)
+
+
+def write_targets(project_data, declarations, sink, manifest: Manifest, jobs, remapped_costume_names, remapped_sound_names, shared_project_data, newline, profiler: Profiler):
+    """Write the code of every target that has changed. 
+    Returns (dict of changed file names and the paths of their list files, dict of file names and their hashes)."""
+
+    # Find the targets that need generating, a later target with the same file name replaces the earlier
+    changed_targets = {}
+    for target, target_declarations in zip(project_data['targets'], declarations):
+        changed_targets[target['name'] +".gs"] = (target, target_declarations)
+    
+    target_hashes = {}
+    with profiler.phase('hash targets'):
+        names_hashes = get_names_hashes(shared_project_data['symbols'], [target['name'] for target, _ in changed_targets.values()])
+        for file_name, (target, target_declarations) in list(changed_targets.items()):
+            target_hashes[file_name] = get_target_hashes(target, target_declarations, remapped_costume_names, remapped_sound_names, names_hashes[target['name']])
+            if is_target_unchanged(manifest, file_name, target_hashes[file_name]): 
+                del changed_targets[file_name]
+
+    with profiler.phase('convert blocks'):
+        for target, _ in changed_targets.values():
+            convert_blocks(target['blocks']) # the JSON blocks are no longer needed once hashed
+
+    # List data
+    with profiler.phase('list data'):
+        for file_name, (target, target_declarations) in changed_targets.items():
+            write_list_data(sink, target_declarations)
+
+    # Scripts
+    if jobs <= 1:
+        for file_name, (target, target_declarations) in changed_targets.items():
+            # Code is streamed into the file script by script
+            with profiler.target(file_name, target['blocks']), sink.open_lines(file_name, newline) as goboscript_code:
+                write_target_code(goboscript_code, target, target_declarations, remapped_costume_names, remapped_sound_names, shared_project_data, profiler.opcode_times)
+    
+    else:
+        mp_context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(jobs, mp_context) as process_pool, ThreadPoolExecutor(jobs) as thread_pool:
+            file_names = {}
+            for file_name, (target, target_declarations) in changed_targets.items():
+                future = process_pool.submit(generate_target_code, target, target_declarations, remapped_costume_names, remapped_sound_names, shared_project_data)
+                file_names[future] = file_name
+            
+            write_futures = [thread_pool.submit(sink.write_lines, file_names[f], f.result(), newline) for f in as_completed(file_names)]
+            for future in write_futures: future.result() # raise any errors
+
+    return {file_name: list(target_declarations['list_files'].values()) for file_name, (_, target_declarations) in changed_targets.items()}, target_hashes
+
+
+def write_targets_low_memory(project_archive, project_data, declarations, sink, manifest: Manifest, remapped_costume_names, remapped_sound_names, shared_project_data, list_file_threshold, newline, profiler: Profiler):
+    """Write the code of every target that has changed, reading the targets from the archive 1 at a time. 
+    `project_data` and `declarations` are from the metadata of the project. Returns as in `write_targets`."""
+
+    # a later target with the same file name replaces the earlier
+    last_indices = {target['name'] +".gs": i for i, target in enumerate(project_data['targets'])}
+
+    changed_targets = {}
+    target_hashes = {}
+    names_hashes = get_names_hashes(shared_project_data['symbols'], [target['name'] for target in project_data['targets']])
+
+    def write_target(index, target):
+        metadata = project_data['targets'][index]
+        target['original_name'] = metadata['original_name']
+        target['name'] = metadata['name']
+        file_name = target['name'] +".gs"
+        if last_indices[file_name] != index: return
+
+        target_declarations = fill_declarations(declarations[index], target, list_file_threshold)
+        target_hashes[file_name] = get_target_hashes(target, target_declarations, remapped_costume_names, remapped_sound_names, names_hashes[target['name']])
+        if is_target_unchanged(manifest, file_name, target_hashes[file_name]): return
+        shared_project_data['symbols'].add_blocks(target['name'], target['blocks']) # only the metadata was read up front
+        convert_blocks(target['blocks'])
+
+        with profiler.target(file_name, target['blocks']):
+            write_list_data(sink, target_declarations)
+            with sink.open_lines(file_name, newline) as goboscript_code:
+                write_target_code(goboscript_code, target, target_declarations, remapped_costume_names, remapped_sound_names, shared_project_data, profiler.opcode_times)
+        changed_targets[file_name] = list(target_declarations['list_files'].values())
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        for index, target in enumerate(projectstream.iter_targets(project_archive, spill_dir)):
+            write_target(index, target)
+            del target # release the blocks before the next target is read
+            shutil.rmtree(os.path.join(spill_dir, str(index)))
+
+    return changed_targets, target_hashes
 
 
 if __name__ == '__main__':
@@ -0,0 +1,200 @@
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from batch import find_projects
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+COLUMNS = ['project', 'status', 'error', 'seconds', 'cpu_seconds', 'peak_rss_mb', 'targets', 'blocks', 'assets', 'output_bytes', 'unhandled']
+PHASE_PREFIX = 'phase:' # phase columns are named with this and the phase name, in seconds
+
+# a project is reported as slower if both are exceeded
+SLOWER_RATIO = 1.2
+SLOWER_SECONDS = 0.05
+
+
+def _profile_in_subprocess(project_path, output_directory, timeout):
+    """Convert a project in a new interpreter with a profiler that only records times. Returns the profiler report."""
+
+    # the child runs in the source folder, so paths relative to the caller are made absolute
+    project_path = os.path.abspath(project_path)
+    output_directory = os.path.abspath(output_directory)
+    code = f'''
+import contextlib, io, json
+import convert_project
+from profiler import Profiler
+profiler = Profiler(trace_memory=False, time_opcodes=False)
+profiler.start()
+with contextlib.redirect_stdout(io.StringIO()):
+    convert_project.convert_project({str(project_path)!r}, {str(output_directory)!r}, incremental=False, profiler=profiler)
+profiler.stop()
+print(json.dumps(profiler.report()))
+'''
+    result = subprocess.run([sys.executable, '-c', code], cwd=SOURCE_DIR, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0: raise Exception(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f'Exited with code {result.returncode}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_output(directory):
+    """Return (total bytes of the files in an output, number of unhandled blocks in its code)."""
+
+    output_bytes = 0
+    unhandled = 0
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            path = os.path.join(root, file_name)
+            output_bytes += os.path.getsize(path)
+            if file_name.endswith('.gs'):
+                with open(path, 'r', encoding='utf-8') as f:
+                    unhandled += sum(line.count('# unhandled ') for line in f)
+
+    return output_bytes, unhandled
+
+
+def benchmark_project(project_path, timeout=None):
+    """Convert a project and return a CSV row as a dict, see `COLUMNS`. Phase times are added as columns starting with `PHASE_PREFIX`."""
+
+    row = dict.fromkeys(COLUMNS, '')
+    row.update(project=str(project_path), status='ok')
+
+    try:
+        with zipfile.ZipFile(project_path) as archive:
+            row['assets'] = sum(1 for name in archive.namelist() if name != 'project.json')
+    except (OSError, zipfile.BadZipFile) as e:
+        row.update(status='failed', error=f'{type(e).__name__}: {e}')
+        return row
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as output_directory:
+        try:
+            report = _profile_in_subprocess(project_path, output_directory, timeout)
+        except subprocess.TimeoutExpired:
+            row.update(status='timeout', error=f'Timed out after {timeout} s', seconds=time.perf_counter() - start)
+            return row
+        except Exception as e:
+            row.update(status='failed', error=str(e), seconds=time.perf_counter() - start)
+            return row
+
+        row['output_bytes'], row['unhandled'] = measure_output(output_directory)
+
+    row['seconds'] = report['total']['wall_time']
+    row['cpu_seconds'] = report['total']['cpu_time']
+    row['peak_rss_mb'] = '' if report['max_rss'] is None else report['max_rss'] / 1e6
+    row['targets'] = len(report['targets'])
+    row['blocks'] = report['blocks']
+    for phase in report['phases']:
+        name = phase['name'] if 'parent' not in phase else f"{phase['parent']}/{phase['name']}"
+        row[PHASE_PREFIX + name] = phase['wall_time']
+
+    return row
+
+
+def run_corpus(project_paths, timeout=None, verbose=True):
+    """Benchmark each project in turn. Returns a list of rows, see `benchmark_project`."""
+
+    rows = []
+    for project_path in project_paths:
+        row = benchmark_project(project_path, timeout)
+        rows.append(row)
+        if verbose: print_row(row)
+    return rows
+
+
+def print_row(row):
+    seconds = '' if row['seconds'] == '' else f"{row['seconds']:8.2f} s"
+    line = f"{row['status'].upper():8} {seconds:10}  {row['project']}"
+    if row['error']: line += f"  ({row['error']})"
+    print(line)
+
+
+def save_csv(rows, path):
+    """Write rows to a CSV file. Columns are `COLUMNS` then each phase, in order of appearance."""
+
+    fieldnames = list(COLUMNS)
+    for row in rows:
+        fieldnames.extend(k for k in row if k not in fieldnames)
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames, restval='')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: f'{v:.6g}' if isinstance(v, float) else v for k, v in row.items()})
+
+
+def load_csv(path):
+    """Read rows saved by `save_csv`, as a dict of project name and row."""
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return {row['project']: row for row in csv.DictReader(f)}
+
+
+def compare_results(old_rows: dict, new_rows: dict, ratio=SLOWER_RATIO, min_seconds=SLOWER_SECONDS):
+    """Compare 2 sets of results, such as before and after an upgrade.
+    Returns a list of (project, old seconds, new seconds) of the projects that are slower by `ratio` and `min_seconds`,
+    and a list of (project, old status, new status) of those whose status changed."""
+
+    slower = []
+    changed_status = []
+    for project in sorted(old_rows.keys() & new_rows.keys()):
+        old, new = old_rows[project], new_rows[project]
+        if old['status'] != new['status']:
+            changed_status.append((project, old['status'], new['status']))
+            continue
+        if old['status'] != 'ok': continue
+
+        old_seconds, new_seconds = float(old['seconds']), float(new['seconds'])
+        if new_seconds > old_seconds * ratio and new_seconds - old_seconds > min_seconds:
+            slower.append((project, old_seconds, new_seconds))
+
+    slower.sort(key=lambda x: x[2] / x[1], reverse=True)
+    return slower, changed_status
+
+
+def print_comparison(old_rows, new_rows, ratio=SLOWER_RATIO, min_seconds=SLOWER_SECONDS):
+    """Print the result of `compare_results` and the total time of the projects in both. Returns True if none are slower or changed status."""
+
+    slower, changed_status = compare_results(old_rows, new_rows, ratio, min_seconds)
+
+    for project, old_seconds, new_seconds in slower:
+        print(f'SLOWER   {old_seconds:8.2f} s -> {new_seconds:8.2f} s ({new_seconds / old_seconds:.2f}x)  {project}')
+    for project, old_status, new_status in changed_status:
+        print(f'STATUS   {old_status} -> {new_status}  {project}')
+
+    both_ok = [p for p in old_rows.keys() & new_rows.keys() if old_rows[p]['status'] == 'ok' and new_rows[p]['status'] == 'ok']
+    old_total = sum(float(old_rows[p]['seconds']) for p in both_ok)
+    new_total = sum(float(new_rows[p]['seconds']) for p in both_ok)
+    print(f'{len(slower)} slower, {len(changed_status)} changed status of {len(both_ok)} projects. Total {old_total:.2f} s -> {new_total:.2f} s')
+
+    return len(slower) == 0 and len(changed_status) == 0
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='sb3_to_goboscript_corpus',
+        description="Benchmark conversion of a folder of real Scratch projects, writing a CSV row per project. Or compare 2 CSV files of results."
+    )
+
+    parser.add_argument("inputs", type=Path, nargs='*', help="sb3 files or directories containing them")
+    parser.add_argument("-o", "--output", type=Path, default=Path('corpus.csv'), help="CSV file to write (default: corpus.csv)")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a project's conversion is stopped")
+    parser.add_argument("--compare", type=Path, nargs=2, metavar=("OLD", "NEW"), default=None, help="compare 2 CSV files instead of benchmarking")
+    parser.add_argument("--ratio", type=float, default=SLOWER_RATIO, help="how many times slower a project must be to be reported when comparing")
+
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        sys.exit(0 if print_comparison(load_csv(args.compare[0]), load_csv(args.compare[1]), args.ratio) else 1)
+
+    if not args.inputs: parser.error('no inputs given')
+    rows = run_corpus(find_projects(args.inputs), args.timeout)
+    save_csv(rows, args.output)
+    print(f'Saved results of {len(rows)} projects to {args.output}')
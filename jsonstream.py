@@ -0,0 +1,147 @@
+import json
+import re
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DELIMITERS = ' \t\n\r,:]}' # characters that can follow a value
+STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+SIMPLE_ITEMS = re.compile(r'(?:[ \t\n\r]*(?:"[^"\\]*(?:\\.[^"\\]*)*"|[^"\[\]{},: \t\n\r]+)[ \t\n\r]*,)*', re.DOTALL) # strings and literals, each followed by a comma
+FLAT = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL) # anything up to the next bracket, including whole strings
+
+
+class JsonStream():
+    """Pull parser reading JSON from a text file a chunk at a time, so a large document doesn't need to be in memory at once.
+    Containers are walked with `iter_object` and `iter_array`. The value of each key or item must then be consumed with
+    `read_value`, `skip_value`, or another iterator before the next one is requested."""
+
+    def __init__(self, file, chunk_size=1<<20):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, min_size=0):
+        """Read more of the file into the buffer, dropping what has been parsed. Returns False at the end of the file."""
+
+        if self.eof: return False
+
+        chunk = self.file.read(max(self.chunk_size, min_size))
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        if not chunk: self.eof = True
+        return bool(chunk)
+
+    def peek(self):
+        """Skip whitespace and return the next character, or an empty string at the end."""
+
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer): return self.buffer[self.pos]
+            if not self._fill(): return ''
+
+    def _expect(self, char):
+        if self.peek() != char: raise Exception(f'Expected {char} in JSON, found {self.peek()!r}')
+        self.pos += 1
+
+    def read_value(self):
+        """Parse and return the next value."""
+
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a number at the end of the buffer may continue in the next chunk
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof: raise
+
+            self._fill(len(self.buffer) - self.pos) # at least double what is buffered so long values aren't parsed many times
+
+    def skip_value(self):
+        """Move past the next value without building it."""
+
+        char = self.peek()
+        if char == '"':
+            while (match := STRING.match(self.buffer, self.pos)) is None:
+                if not self._fill(len(self.buffer) - self.pos): raise Exception('Unterminated string in JSON')
+            self.pos = match.end()
+            return
+
+        if char not in ('{', '['):
+            self.read_value()
+            return
+
+        depth = 0
+        while True:
+            self.pos = FLAT.match(self.buffer, self.pos).end()
+            char = self.buffer[self.pos] if self.pos < len(self.buffer) else '"'
+
+            if char == '"': # a string continues past the buffer
+                if not self._fill(len(self.buffer) - self.pos): raise Exception('Unexpected end of JSON')
+                continue
+
+            self.pos += 1
+            depth += 1 if char in ('{', '[') else -1
+            if depth == 0: return
+
+    def iter_object(self):
+        """Iterate over the keys of an object."""
+
+        self._expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+
+        while True:
+            key = self.read_value()
+            self._expect(':')
+            yield key
+
+            char = self.peek()
+            self.pos += 1
+            if char == '}': return
+            if char != ',': raise Exception(f'Expected , or }} in JSON, found {char!r}')
+
+    def iter_array(self):
+        """Iterate over the indices of an array."""
+
+        self._expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+
+        index = 0
+        while True:
+            yield index
+            index += 1
+
+            char = self.peek()
+            self.pos += 1
+            if char == ']': return
+            if char != ',': raise Exception(f'Expected , or ] in JSON, found {char!r}')
+
+    def iter_array_batches(self):
+        """Iterate over the items of an array in lists of parsed items. 
+        Runs of strings and literals are parsed at once, which is much faster than `iter_array` for long arrays."""
+
+        self._expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+
+        while True:
+            end = SIMPLE_ITEMS.match(self.buffer, self.pos).end()
+            if end > self.pos:
+                yield json.loads(f'[{self.buffer[self.pos:end - 1]}]')
+                self.pos = end
+
+            # an item that isn't simple, is the last, or continues past the buffer
+            yield [self.read_value()]
+
+            char = self.peek()
+            self.pos += 1
+            if char == ']': return
+            if char != ',': raise Exception(f'Expected , or ] in JSON, found {char!r}')
@@ -0,0 +1,53 @@
+import itertools
+import json
+import posixpath
+
+from writer import LineWriter
+from spill import SpilledList
+
+CHUNK_SIZE = 4096 # items joined per write
+
+
+def item_text(item):
+    """A list item as it would be read from a line of a goboscript list file."""
+    return item if isinstance(item, str) else json.dumps(item)
+
+
+def can_store_in_file(items):
+    """Items are stored 1 per line, so they can't contain new lines. A trailing empty item can't be stored either as it would be dropped."""
+
+    if isinstance(items, SpilledList):
+        return not items.has_new_line and items.last_item_text != ''
+
+    for item in items:
+        if isinstance(item, str) and ('\n' in item or '\r' in item): return False
+
+    return len(items) == 0 or item_text(items[-1]) != ''
+
+
+def get_list_files(target, lists, threshold):
+    """Return a dict of the lists to be stored in files, with keys as goboscript list name and values as the relative file path.
+    `lists` is a list of (name, items) and only those with more than `threshold` items are stored in files."""
+
+    if threshold is None: return {}
+
+    list_files = {}
+    for name, items in lists:
+        if len(items) > threshold and can_store_in_file(items):
+            list_files[name] = posixpath.join('lists', target['name'], f'{name}.txt')
+
+    return list_files
+
+
+def write_list_file(path, items):
+    """Write the items of a list into a file, 1 per line. New lines are always \\n as a \\r would become part of an item."""
+
+    with LineWriter(path, newline='\n') as f:
+        write_list_items(f, items)
+
+
+def write_list_items(writer, items):
+    """Write the items of a list 1 per line to an object with a `write_line` method, such as a `writer.LineWriter` with `newline='\\n'`."""
+
+    for chunk in itertools.batched(map(item_text, items), CHUNK_SIZE):
+        writer.write_line('\n'.join(chunk))
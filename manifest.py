@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+import spill
+
+MANIFEST_FILE_NAME = '.sb3_to_goboscript.json'
+
+
+@lru_cache(maxsize=None)
+def get_converter_version():
+    """A hash of the converter's source code, so that outputs are regenerated whenever the converter changes.
+    Computed once per process, as the code that is running doesn't change even if the files do."""
+
+    source_hash = hashlib.sha256()
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for file_name in sorted(os.listdir(source_dir)):
+        if file_name.endswith('.py'):
+            with open(os.path.join(source_dir, file_name), 'rb') as f:
+                source_hash.update(f.read())
+
+    return source_hash.hexdigest()[:16]
+
+
+def hash_data(data):
+    """Hash JSON-like data. Values spilled to disk are hashed by their digest."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(',', ':'), default=spill.get_digest).encode()).hexdigest()
+
+
+def get_names_hashes(symbols, target_names) -> dict:
+    """Hash the names of the variables and lists each target can use (those of the stage and its own, see `symboltable.SymbolTable`), 
+    so renaming a sprite's local variable only changes that sprite. Returns a dict of target names and hashes."""
+
+    global_names = []
+    local_names = {} # target name: [scratch name, usage, goboscript name]
+    for (scratch_name, usage, target_name), name in symbols.name_pool.pool.items():
+        if target_name == 'stage':
+            global_names.append([scratch_name, usage, name])
+        else:
+            local_names.setdefault(target_name, []).append([scratch_name, usage, name])
+
+    global_hash = hash_data(sorted(global_names))
+    return {target_name: global_hash if target_name == 'stage' else hash_data([global_hash, sorted(local_names.get(target_name, []))]) for target_name in target_names}
+
+
+def get_target_hashes(target, declarations, remapped_costume_names, remapped_sound_names, names_hash, blocks_hash=None):
+    """Hashes of everything the code of a target is generated from. `names_hash` is the target's from `get_names_hashes`.
+    `blocks_hash` is the `hash_data` of the blocks if already known."""
+
+    return {
+        'blocks': hash_data(target['blocks']) if blocks_hash is None else blocks_hash,
+        'names': names_hash,
+        'variables': hash_data(declarations['variables']),
+        'lists': hash_data([declarations['lists'], declarations['list_files']]),
+        'comments': hash_data(target['comments']),
+        'costumes': hash_data([(c['name'], remapped_costume_names[c['md5ext']]) for c in target['costumes']]),
+        'sounds': hash_data([(s['name'], remapped_sound_names[s['md5ext']]) for s in target['sounds']]),
+        'sprite': hash_data([target['isStage'], target.get('visible', True)]),
+    }
+
+
+class Manifest():
+    """Record of what each file in an output folder was generated from, used to skip regenerating files that haven't changed.
+    Files are also regenerated if they were modified or removed since they were written, or if the conversion `settings` (JSON-like) differ."""
+
+    def __init__(self, output_dir, settings=None):
+        self.output_dir = output_dir
+        self.version = get_converter_version()
+        self.settings = settings
+        self.targets = {} # goboscript file name: {'hashes': dict, 'size': int, 'mtime': int, 'list_files': {relative path: [size, mtime]}}
+        self.assets = {} # relative asset path: md5 file name
+
+        path = os.path.join(output_dir, MANIFEST_FILE_NAME)
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return # unreadable, start again
+
+            # only the target hashes depend on the version and settings, the assets are always what is in the folder
+            if data.get('version') == self.version and data.get('settings') == self.settings:
+                self.targets = data.get('targets', {})
+            self.assets = data.get('assets', {})
+
+
+    def is_unchanged(self, file_name, hashes):
+        """True if the file and its list files exist as they were written from the same hashes."""
+
+        entry = self.targets.get(file_name)
+        if entry is None or entry['hashes'] != hashes: return False
+
+        if self.get_stat(file_name) != [entry['size'], entry['mtime']]: return False
+        return all(self.get_stat(path) == stat for path, stat in entry['list_files'].items())
+
+
+    def record(self, file_name, hashes, list_files=()):
+        """Record that the file and the list files at the relative paths `list_files` have been written from the hashes."""
+
+        size, mtime = self.get_stat(file_name)
+        self.targets[file_name] = {'hashes': hashes, 'size': size, 'mtime': mtime, 'list_files': {path: self.get_stat(path) for path in list_files}}
+
+
+    def get_stat(self, path):
+        """[size, mtime in ns] of a file in the output folder, or None if it doesn't exist."""
+
+        try:
+            stat = os.stat(os.path.join(self.output_dir, path))
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+
+    def update_assets(self, *names: dict):
+        """Record the md5 file name at each relative asset path. Any existing file whose asset changed is removed so it gets copied again."""
+
+        assets = {}
+        for name_map in names:
+            for md5ext, path in name_map.items():
+                assets.setdefault(path, md5ext)
+
+        for path, md5ext in assets.items():
+            previous = self.assets.get(path)
+            if previous is not None and previous != md5ext:
+                full_path = os.path.join(self.output_dir, path)
+                if os.path.exists(full_path): os.remove(full_path)
+
+        self.assets = assets
+
+
+    def save(self):
+        data = {'version': self.version, 'settings': self.settings, 'targets': self.targets, 'assets': self.assets}
+        with open(os.path.join(self.output_dir, MANIFEST_FILE_NAME), 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
@@ -0,0 +1,223 @@
+import multiprocessing
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# Assets are optimised so the project looks and sounds the same. PNGs are compressed losslessly. svgo and scour round numbers in SVGs
+# to 10 significant digits, so SVGs optimised by them aren't identical but differences are far below a pixel. Sounds are left as they are:
+# Scratch only takes WAV and MP3, so compressing a WAV would mean MP3 which is lossy (and would change its file name).
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'sb3_to_goboscript_optimised')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+TOOL_TIMEOUT = 60 # seconds
+
+
+@lru_cache(maxsize=None)
+def find_tool(name):
+    return shutil.which(name)
+
+
+def run_tool(args, data: bytes, extension):
+    """Run a command line optimiser on data, with `{input}` and `{output}` in `args` replaced by temporary file paths. Returns the output or None if it failed."""
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, f'input.{extension}')
+        output_path = os.path.join(directory, f'output.{extension}')
+        with open(input_path, 'wb') as f:
+            f.write(data)
+
+        try:
+            process = subprocess.run([arg.format(input=input_path, output=output_path) for arg in args], capture_output=True, timeout=TOOL_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+
+        if process.returncode != 0 or not os.path.isfile(output_path): return None
+        with open(output_path, 'rb') as f:
+            return f.read() or None
+
+
+def minify_svg(data: bytes) -> bytes:
+    """Remove comments, and whitespace between tags unless the SVG has text where it could matter."""
+
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data
+
+    text = re.sub(r'<!--.*?-->', '', text, flags=re.DOTALL)
+    if '<text' not in text and 'xml:space' not in text:
+        text = re.sub(r'>\s+<', '><', text)
+    return text.strip().encode('utf-8')
+
+
+def recompress_png(data: bytes) -> bytes:
+    """Compress the image data of a PNG again at the highest level, keeping every chunk. Returns the data unchanged if it isn't a valid PNG."""
+
+    if not data.startswith(PNG_SIGNATURE): return data
+
+    chunks = [] # (type, data), the image data is None as it is joined into 1 chunk
+    image_data = []
+    position = len(PNG_SIGNATURE)
+    while position + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[position:position+8])
+        chunk_data = data[position+8:position+8+length]
+        if len(chunk_data) != length: return data # truncated
+        position += length + 12
+
+        if chunk_type == b'IDAT':
+            if not image_data: chunks.append((chunk_type, None))
+            image_data.append(chunk_data)
+        else:
+            chunks.append((chunk_type, chunk_data))
+        if chunk_type == b'IEND': break
+
+    try:
+        raw = zlib.decompress(b''.join(image_data))
+    except zlib.error:
+        return data
+
+    compressed = None
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        attempt = compressor.compress(raw) + compressor.flush()
+        if compressed is None or len(attempt) < len(compressed): compressed = attempt
+
+    output = [PNG_SIGNATURE]
+    for chunk_type, chunk_data in chunks:
+        if chunk_data is None: chunk_data = compressed
+        output.append(struct.pack('>I4s', len(chunk_data), chunk_type) + chunk_data + struct.pack('>I', zlib.crc32(chunk_type + chunk_data)))
+    return b''.join(output)
+
+
+# for each format, command line tools to try in order (with their arguments), and the fallback in Python if none are installed
+OPTIMISERS = {
+    'svg': ([('svgo', ['svgo', '--quiet', '--precision', '10', '-i', '{input}', '-o', '{output}']),
+             ('scour', ['scour', '--quiet', '--set-precision', '10', '-i', '{input}', '-o', '{output}'])], minify_svg),
+    'png': ([('oxipng', ['oxipng', '--quiet', '-o', '2', '--strip', 'safe', '--out', '{output}', '{input}']),
+             ('optipng', ['optipng', '-quiet', '-o2', '-out', '{output}', '{input}'])], recompress_png),
+}
+
+
+def get_optimiser_name(extension):
+    """Name of the optimiser used for a format: the first of its tools that is installed, else its fallback in Python."""
+
+    tools, fallback = OPTIMISERS[extension]
+    for name, _ in tools:
+        if find_tool(name) is not None: return name
+    return fallback.__name__
+
+
+def get_cache_path(cache_dir, md5ext):
+    """Path of the cached result of an asset. Results are kept apart per optimiser, so installing a tool means assets are optimised again with it."""
+    return os.path.join(cache_dir, get_optimiser_name(md5ext.rpartition('.')[2].lower()), md5ext)
+
+
+def optimise_data(data: bytes, extension) -> tuple:
+    """Return (optimised data, name of what optimised it). The data is returned unchanged (with None) if it can't be made smaller."""
+
+    tools, fallback = OPTIMISERS[extension]
+    for name, args in tools:
+        if find_tool(name) is None: continue
+        optimised = run_tool(args, data, extension)
+        if optimised is not None: break
+    else:
+        name = fallback.__name__
+        optimised = fallback(data)
+
+    if len(optimised) < len(data): return optimised, name
+    return data, None
+
+
+def replace_file(path, data: bytes):
+    """Write a file through a temporary file, so a linked file (such as from an asset store) is replaced instead of edited."""
+
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except:
+        if os.path.exists(temp_path): os.remove(temp_path)
+        raise
+
+
+def _optimise_asset(path, md5ext, cache_dir):
+    """Optimise an asset file in place in a worker process, and cache the result. Returns (path, size before, size after, what optimised it)."""
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    optimised, method = optimise_data(data, md5ext.rpartition('.')[2].lower())
+    if cache_dir is not None:
+        cache_path = get_cache_path(cache_dir, md5ext)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        if method is None:
+            replace_file(cache_path + '.unchanged', b'')
+        else:
+            replace_file(cache_path, optimised)
+
+    if method is not None: replace_file(path, optimised)
+    return path, len(data), len(optimised), method
+
+
+class AssetOptimiser():
+    """Optimises assets copied into a project folder in a pool of processes. SVGs are minified and PNGs compressed again losslessly,
+    with svgo or scour and oxipng or optipng if installed, otherwise in Python. svgo and scour round numbers, see the note at the top.
+    Files are only replaced if it made them smaller. Results are cached in `cache_dir` by optimiser and md5 file name, so each asset is only optimised once by each. `report` counts what was done across calls to `optimise`."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, jobs=None):
+        self.cache_dir = cache_dir
+        self.jobs = jobs
+        if cache_dir is not None: os.makedirs(cache_dir, exist_ok=True)
+        self.report = {'assets': 0, 'optimised': 0, 'cached': 0, 'bytes_before': 0, 'bytes_after': 0, 'methods': {}}
+
+    def add_result(self, size_before, size_after, method):
+        self.report['assets'] += 1
+        self.report['bytes_before'] += size_before
+        self.report['bytes_after'] += size_after
+        if method is not None:
+            self.report['optimised'] += 1
+            self.report['methods'][method] = self.report['methods'].get(method, 0) + 1
+
+    def use_cached(self, path, md5ext) -> bool:
+        """Replace an asset file with its cached result if there is one. Returns False if the asset hasn't been optimised before."""
+
+        if self.cache_dir is None: return False
+        cached_path = get_cache_path(self.cache_dir, md5ext)
+        size = os.path.getsize(path)
+
+        if os.path.isfile(cached_path):
+            with open(cached_path, 'rb') as f:
+                replace_file(path, f.read())
+            self.add_result(size, os.path.getsize(path), 'cache')
+        elif os.path.isfile(cached_path + '.unchanged'):
+            self.add_result(size, size, None)
+        else:
+            return False
+
+        self.report['cached'] += 1
+        return True
+
+    def optimise(self, copies: dict):
+        """Optimise assets given a dict of their paths and md5 file names, such as returned by `assets.copy_assets_to_folder`. Formats that can't be optimised are skipped."""
+
+        pending = [(path, md5ext) for path, md5ext in copies.items() if md5ext.rpartition('.')[2].lower() in OPTIMISERS and not self.use_cached(path, md5ext)]
+        if not pending: return
+
+        mp_context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(self.jobs, mp_context) as pool:
+            futures = [pool.submit(_optimise_asset, path, md5ext, self.cache_dir) for path, md5ext in pending]
+            for future in futures:
+                _, size_before, size_after, method = future.result()
+                self.add_result(size_before, size_after, method)
+
+    def print_report(self):
+        saved = self.report['bytes_before'] - self.report['bytes_after']
+        methods = ', '.join(f'{count} by {method}' for method, count in sorted(self.report['methods'].items()))
+        print(f"Optimised {self.report['optimised']} of {self.report['assets']} assets{f' ({methods})' if methods else ''}, saving {saved / 1024:.1f} KB")
@@ -0,0 +1,119 @@
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import resource # not available on Windows
+except ImportError:
+    resource = None
+
+
+class Profiler():
+    """Records where the time and memory of a conversion goes: wall time, CPU time and peak memory of each phase and target,
+    block counts, and time spent in the handler of each opcode. Peak memory is the most allocated by Python at once (including before the phase), 
+    traced with tracemalloc which slows conversion, so compare times between profiled runs only. A disabled profiler records nothing.
+    Without `trace_memory` and `time_opcodes`, only times and block counts are recorded with little overhead."""
+
+    def __init__(self, enabled=True, trace_memory=True, time_opcodes=True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.phases = []
+        self.targets = []
+        self.opcode_counts = Counter()
+        self.opcode_times = {} if enabled and time_opcodes else None # passed to `blocks.convert_script`
+        self.total = None
+        self._open = [] # records being measured, outermost first
+        self._open_phases = []
+
+    def start(self):
+        if not self.enabled: return
+        if self.trace_memory: tracemalloc.start()
+        self._start = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        if not self.enabled: return
+        wall, cpu = self._start
+        self.total = {'wall_time': time.perf_counter() - wall, 'cpu_time': time.process_time() - cpu}
+        if self.trace_memory:
+            self.total['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    @contextmanager
+    def _measure(self, record: dict):
+        if not self.enabled:
+            yield
+            return
+
+        record.update(wall_time=0, cpu_time=0)
+        if self.trace_memory:
+            # the peak is reset for this record, so those around it keep the peak so far
+            peak = tracemalloc.get_traced_memory()[1]
+            for outer in self._open:
+                outer['peak_memory'] = max(outer['peak_memory'], peak)
+            tracemalloc.reset_peak()
+            record['peak_memory'] = 0
+
+        self._open.append(record)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            record['wall_time'] = time.perf_counter() - wall
+            record['cpu_time'] = time.process_time() - cpu
+            if self.trace_memory: record['peak_memory'] = max(record['peak_memory'], tracemalloc.get_traced_memory()[1])
+            self._open.remove(record)
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager measuring a phase of the conversion. Phases may be within others, given as `parent`."""
+        record = {'name': name}
+        if self.enabled:
+            if self._open_phases: record['parent'] = self._open_phases[-1]['name']
+            self.phases.append(record)
+
+        self._open_phases.append(record)
+        try:
+            with self._measure(record):
+                yield
+        finally:
+            self._open_phases.pop()
+
+    def target(self, file_name, blocks: dict):
+        """Context manager measuring the conversion of a target, `blocks` are its block records."""
+        record = {'name': file_name}
+        if self.enabled:
+            record['blocks'] = len(blocks)
+            self.opcode_counts.update(block.opcode for block in blocks.values())
+            self.targets.append(record)
+        return self._measure(record)
+
+    def report(self) -> dict:
+        opcodes = {}
+        for opcode, count in self.opcode_counts.most_common():
+            opcodes[opcode] = {'count': count}
+            if self.opcode_times is not None: opcodes[opcode]['time'] = self.opcode_times.get(opcode, 0)
+
+        return {
+            'python': sys.version.split()[0],
+            'total': self.total,
+            'max_rss': get_max_rss(),
+            'blocks': sum(self.opcode_counts.values()),
+            'phases': self.phases,
+            'targets': self.targets,
+            'opcodes': opcodes,
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=1)
+
+
+def get_max_rss():
+    """Peak resident memory of this process in bytes, or None if unknown."""
+
+    if resource is None: return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024 # kilobytes except on macOS
@@ -0,0 +1,114 @@
+import io
+import os
+
+from jsonstream import JsonStream
+from spill import SpilledList, SpilledText
+
+SPILL_TEXT_THRESHOLD = 1<<16 # variable values longer than this are kept on disk
+
+
+def open_project_json(project_archive):
+    return io.TextIOWrapper(project_archive.open('project.json'), encoding='utf-8-sig')
+
+
+def read_metadata(project_archive):
+    """Read project.json without the blocks of each target or the values of its lists and variables.
+    Returns project data in the same form as the full project, with empty blocks, empty lists and variables of None."""
+
+    targets = []
+    with open_project_json(project_archive) as f:
+        stream = JsonStream(f)
+        for key in stream.iter_object():
+            if key != 'targets':
+                stream.skip_value()
+                continue
+
+            for _ in stream.iter_array():
+                target = {}
+                for target_key in stream.iter_object():
+                    if target_key == 'blocks':
+                        stream.skip_value()
+                        target['blocks'] = {}
+                    elif target_key == 'lists':
+                        target['lists'] = _read_names(stream, [])
+                    elif target_key == 'variables':
+                        target['variables'] = _read_names(stream, None)
+                    else:
+                        target[target_key] = stream.read_value()
+                targets.append(target)
+
+    return {'targets': targets}
+
+
+def _read_names(stream: JsonStream, empty_value):
+    """Read the names of lists or variables, skipping their values."""
+
+    declarations = {}
+    for declaration_id in stream.iter_object():
+        declaration = []
+        for i in stream.iter_array():
+            if i == 0: declaration.append(stream.read_value())
+            else: stream.skip_value()
+        declarations[declaration_id] = [declaration[0], empty_value]
+
+    return declarations
+
+
+def iter_targets(project_archive, spill_dir):
+    """Read the targets of project.json one at a time.
+    List items and long variable values are streamed into files in `spill_dir` as they are read, see `spill.py`."""
+
+    with open_project_json(project_archive) as f:
+        stream = JsonStream(f)
+        for key in stream.iter_object():
+            if key != 'targets':
+                stream.skip_value()
+                continue
+
+            for index in stream.iter_array():
+                target_spill_dir = os.path.join(spill_dir, str(index))
+                os.makedirs(target_spill_dir, exist_ok=True)
+
+                target = {}
+                for target_key in stream.iter_object():
+                    if target_key == 'lists':
+                        target['lists'] = _read_lists(stream, target_spill_dir)
+                    elif target_key == 'variables':
+                        target['variables'] = _read_variables(stream, target_spill_dir)
+                    else:
+                        target[target_key] = stream.read_value()
+
+                yield target
+                del target # don't hold on to it while reading the next
+
+
+def _read_lists(stream: JsonStream, spill_dir):
+    lists = {}
+    for n, list_id in enumerate(stream.iter_object()):
+        declaration = []
+        for i in stream.iter_array():
+            if i == 1 and stream.peek() == '[':
+                items = SpilledList(os.path.join(spill_dir, f'list{n}.jsonl'))
+                try:
+                    for batch in stream.iter_array_batches():
+                        items.extend(batch)
+                finally:
+                    items.close()
+                declaration.append(items)
+            else:
+                declaration.append(stream.read_value())
+        lists[list_id] = declaration
+
+    return lists
+
+
+def _read_variables(stream: JsonStream, spill_dir):
+    variables = {}
+    for n, variable_id in enumerate(stream.iter_object()):
+        declaration = stream.read_value()
+        if isinstance(declaration[1], str) and len(declaration[1]) > SPILL_TEXT_THRESHOLD:
+            # stored as declared, see `convert_project.format_variable_value`
+            declaration[1] = SpilledText(os.path.join(spill_dir, f'variable{n}.txt'), f'"{declaration[1]}"')
+        variables[variable_id] = declaration
+
+    return variables
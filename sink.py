@@ -0,0 +1,163 @@
+import io
+import os
+import shutil
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+
+import assets
+import listfiles
+from optimise import AssetOptimiser
+from writer import LineWriter, LineBuffer, LineStream
+
+# assets in these formats are compressed already, so they are never compressed again in a zip
+STORED_FORMATS = {'png', 'jpg', 'jpeg', 'gif', 'mp3', 'ogg'}
+
+
+class DirectorySink():
+    """Writes the files of a converted project into a folder. Paths given to it are relative, using forward slashes."""
+
+    def __init__(self, directory, asset_store: assets.AssetStore=None, optimiser: AssetOptimiser=None):
+        self.directory = directory
+        self.asset_store = asset_store
+        self.optimiser = optimiser
+
+    def get_path(self, path):
+        return os.path.join(self.directory, path)
+
+    def open_lines(self, path, newline=None):
+        """Return a context manager for writing a text file line by line, see `writer.LineWriter`. `newline` is as in `open`."""
+        return LineWriter(self.get_path(path), newline=newline)
+
+    def write_lines(self, path, lines, newline=None):
+        with self.open_lines(path, newline) as f:
+            for line in lines:
+                f.write_line(line)
+
+    def write_text(self, path, text, newline=None):
+        """Write a text file, unless it already has the same contents so its modification time is kept."""
+
+        full_path = self.get_path(path)
+        if os.path.isfile(full_path):
+            with open(full_path, 'r', encoding='utf-8', newline='') as f:
+                if f.read() == text.replace('\n', newline or os.linesep): return # unchanged, keep the existing file
+
+        with open(full_path, 'w', encoding='utf-8', newline=newline) as f:
+            f.write(text)
+
+    def write_list_file(self, path, items):
+        full_path = self.get_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        listfiles.write_list_file(full_path, items)
+
+    def add_assets(self, project_archive, *names: dict):
+        """Copy assets from the archive, given dicts of md5 file names and their relative paths. Returns the number copied, see `assets.copy_assets_to_folder`.
+        Those copied are then optimised if there is an optimiser."""
+
+        copies = assets.copy_assets_to_folder(project_archive, self.directory, *names, asset_store=self.asset_store)
+        if self.optimiser is not None: self.optimiser.optimise(copies)
+        return len(copies)
+
+
+class MemorySink():
+    """Keeps the files of a converted project in `files`, a dict of relative paths (using forward slashes) and their contents.
+    Text files are strings with \\n new lines, and assets are `assets.AssetReader` objects so they are only decompressed if read."""
+
+    def __init__(self):
+        self.files = {}
+
+    @contextmanager
+    def open_lines(self, path, newline=None):
+        buffer = LineBuffer()
+        yield buffer
+        self.files[path] = '\n'.join(buffer.lines)
+
+    def write_lines(self, path, lines, newline=None):
+        self.files[path] = '\n'.join(map(str, lines))
+
+    def write_text(self, path, text, newline=None):
+        self.files[path] = text
+
+    def write_list_file(self, path, items):
+        self.files[path] = '\n'.join(map(listfiles.item_text, items))
+
+    def add_assets(self, project_archive, *names: dict):
+        added = 0
+        for name_map in names:
+            for md5ext, path in name_map.items():
+                if path not in self.files: # if many assets have the same path, the first is used
+                    self.files[path] = assets.AssetReader(project_archive, md5ext)
+                    added += 1
+        return added
+
+
+class ZipSink():
+    """Writes the files of a converted project into a zip file, streamed so no file needs to be in memory at once. Use as a context manager.
+    The zip is written to a temporary file that replaces `path` once closed without an error, so a crash never leaves a half-written zip.
+    Code is compressed, and assets are too unless they're in a compressed format already (see `add_assets`).
+    When `deterministic`, every file is dated 1980-01-01 so the same project always gives the same zip, 
+    if converted with 1 job as files are otherwise added in the order they finish."""
+
+    def __init__(self, path, deterministic=False):
+        self.path = path
+        self.temp_path = f'{path}.{os.getpid()}.tmp'
+        self.deterministic = deterministic
+        self.archive = None
+        self.paths = set()
+        self.lock = threading.Lock() # only 1 file of a zip can be written at a time
+
+    def __enter__(self):
+        self.archive = zipfile.ZipFile(self.temp_path, 'w', zipfile.ZIP_DEFLATED)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.archive.close()
+
+        if exc_type is None:
+            os.replace(self.temp_path, self.path)
+        else:
+            os.remove(self.temp_path) # keep the previous zip, if any
+
+    def get_info(self, path, compress_type, file_size=None):
+        info = zipfile.ZipInfo(path, (1980, 1, 1, 0, 0, 0) if self.deterministic else time.localtime()[:6])
+        info.compress_type = compress_type
+        info.external_attr = 0o644 << 16 # permissions of files when extracted
+        if file_size is not None: info.file_size = file_size # lets zipfile decide if zip64 is needed
+        self.paths.add(path)
+        return info
+
+    @contextmanager
+    def open_lines(self, path, newline=None):
+        with self.lock, self.archive.open(self.get_info(path, zipfile.ZIP_DEFLATED), 'w') as f, io.TextIOWrapper(f, encoding='utf-8', newline=newline) as text:
+            yield LineStream(text)
+
+    def write_lines(self, path, lines, newline=None):
+        with self.open_lines(path, newline) as f:
+            for line in lines:
+                f.write_line(line)
+
+    def write_text(self, path, text, newline=None):
+        with self.open_lines(path, newline) as f:
+            f.write_line(text)
+
+    def write_list_file(self, path, items):
+        with self.open_lines(path, '\n') as f:
+            listfiles.write_list_items(f, items)
+
+    def add_assets(self, project_archive, *names: dict):
+        """Copy assets from the archive, given dicts of md5 file names and their relative paths. Returns the number copied.
+        Formats that are compressed already are stored so they're only decompressed, not recompressed. zipfile has no public way to copy compressed bytes as they are."""
+
+        added = 0
+        for name_map in names:
+            for md5ext, path in name_map.items():
+                if path in self.paths: continue # if many assets have the same path, the first is used
+
+                source_info = project_archive.getinfo(md5ext)
+                compress_type = zipfile.ZIP_STORED if md5ext.rpartition('.')[2].lower() in STORED_FORMATS else zipfile.ZIP_DEFLATED
+                with self.lock, project_archive.open(source_info) as source, self.archive.open(self.get_info(path, compress_type, source_info.file_size), 'w') as destination:
+                    shutil.copyfileobj(source, destination, assets.COPY_BUFFER_SIZE)
+                added += 1
+
+        return added
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import re
+
+TEXT_CHUNK_SIZE = 1<<16
+NEW_LINE_ESCAPE = re.compile(r'(?<!\\)(?:\\\\)*\\[nr]') # \n or \r in JSON, not preceded by an escaped backslash
+
+
+class SpilledList():
+    """List items kept in a file instead of memory, used in place of a list of items. 
+    Each line of the file is a batch of items as in a JSON array without the brackets."""
+
+    def __init__(self, path):
+        self.path = path
+        self.length = 0
+        self.digest = None
+        self.has_new_line = False # an item contains a new line
+        self.last_item_text = None # see `listfiles.item_text`
+        self._file = open(path, 'w', encoding='utf-8', newline='\n', buffering=1<<16)
+        self._hash = hashlib.sha256()
+
+    def extend(self, items: list):
+        if len(items) == 0: return
+
+        line = json.dumps(items)[1:-1]
+        self._file.write(line)
+        self._file.write('\n')
+        self._hash.update(line.encode())
+        self._hash.update(b'\n')
+
+        self.length += len(items)
+        if ('\\n' in line or '\\r' in line) and NEW_LINE_ESCAPE.search(line): self.has_new_line = True
+        self.last_item_text = items[-1] if isinstance(items[-1], str) else json.dumps(items[-1])
+
+    def close(self):
+        """Finish writing items."""
+        self._file.close()
+        self.digest = self._hash.hexdigest()
+
+    def __len__(self):
+        return self.length
+
+    def iter_batches(self):
+        """Iterate over each batch of items as JSON, without brackets."""
+        with open(self.path, 'r', encoding='utf-8', newline='\n') as f:
+            for line in f:
+                yield line[:-1]
+
+    def __iter__(self):
+        for batch in self.iter_batches():
+            yield from json.loads(f'[{batch}]')
+
+    def iter_json_array(self):
+        """Iterate over the pieces of the items as a JSON array, equivalent to `json.dumps(items)`."""
+
+        yield '['
+        is_first = True
+        for batch in self.iter_batches():
+            if not is_first: yield ', '
+            yield batch
+            is_first = False
+        yield ']'
+
+
+class SpilledText():
+    """Text kept in a file instead of memory."""
+
+    def __init__(self, path, text):
+        self.path = path
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        self.digest = hashlib.sha256(text.encode()).hexdigest()
+
+    def iter_chunks(self):
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            while chunk := f.read(TEXT_CHUNK_SIZE):
+                yield chunk
+
+
+def get_digest(value):
+    """Used as the `default` of `json.dumps`, so spilled values are represented by the digest of their contents."""
+
+    if isinstance(value, (SpilledList, SpilledText)): return value.digest
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
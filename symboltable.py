@@ -0,0 +1,99 @@
+import json
+
+from utilities import NamePool, validate_name
+
+# variables and lists are resolved with the same usage in the pool as they always have been,
+# so a variable and a list with the same name keep the same goboscript name instead of one getting a suffix
+POOL_USAGE = 'var'
+
+
+class SymbolTable():
+    """Goboscript names of the variables, lists, procedures and arguments of a project, resolved once before any code is generated
+    so codegen only has to look them up. Broadcast names are collected too, these are kept as they are since goboscript uses strings for them.
+
+    Variables and lists are resolved through a `NamePool` so they don't collide with each other.
+    Procedures and arguments are local to a sprite (or procedure) so they are only validated, kept apart from the pool."""
+
+    def __init__(self):
+        self.name_pool = NamePool()
+        self.local_names = {} # (scratch name, usage, target name): goboscript name, for procedures and arguments
+        self.broadcasts = set()
+
+    def add_declarations(self, project_data):
+        """Resolve the variables and lists of every target, and collect the broadcasts. Targets are expected to have their final names."""
+
+        for target in project_data['targets']:
+            for declaration in target['lists'].values():
+                self.name_pool.get_valid_name(declaration[0], POOL_USAGE, target['name'])
+
+            for declaration in target['variables'].values():
+                self.name_pool.get_valid_name(declaration[0], POOL_USAGE, target['name'])
+
+            self.broadcasts.update(target.get('broadcasts', {}).values())
+
+    def add_blocks(self, target_name, blocks: dict):
+        """Resolve the procedure and argument names used in the blocks of a target, as found in project.json."""
+
+        for block in blocks.values():
+            if not isinstance(block, dict): continue # variable and list reporters in list form
+
+            opcode = block['opcode']
+            if opcode == 'procedures_prototype':
+                self._add_local(block['mutation']['proccode'], 'custom', target_name)
+                for argument_name in json.loads(block['mutation']['argumentnames']):
+                    self._add_local(argument_name, 'arg', target_name)
+
+            elif opcode == 'procedures_call':
+                self._add_local(block['mutation']['proccode'], 'custom', target_name)
+
+            elif opcode == 'argument_reporter_string_number' or opcode == 'argument_reporter_boolean':
+                self._add_local(block['fields']['VALUE'][0], 'arg', target_name)
+
+            elif opcode == 'event_whenbroadcastreceived':
+                self.broadcasts.add(block['fields']['BROADCAST_OPTION'][0])
+
+    def add_project(self, project_data):
+        """Resolve everything in a project, see `add_declarations` and `add_blocks`."""
+
+        self.add_declarations(project_data)
+        for target in project_data['targets']:
+            self.add_blocks(target['name'], target['blocks'])
+
+    def get_collisions(self) -> list:
+        """Return the names that collided once made valid for goboscript, as dicts of target, usage, scratch name and goboscript name.
+        Variables and lists are listed if they were given a suffix to keep them apart. Procedures and arguments aren't renamed, 
+        so those of a target sharing a goboscript name with another of the same usage are listed as they will clash in the code."""
+
+        collisions = []
+        for (scratch_name, usage, target_name), valid_name in self.name_pool.pool.items():
+            if valid_name != validate_name(scratch_name):
+                collisions.append({'target': target_name, 'usage': 'var/list', 'scratch_name': scratch_name, 'goboscript_name': valid_name}) # both use POOL_USAGE
+
+        groups = {} # (target name, usage, goboscript name): scratch names
+        for (scratch_name, usage, target_name), valid_name in self.local_names.items():
+            groups.setdefault((target_name, usage, valid_name), []).append(scratch_name)
+        for (target_name, usage, valid_name), scratch_names in groups.items():
+            if len(scratch_names) < 2: continue
+            for scratch_name in scratch_names:
+                collisions.append({'target': target_name, 'usage': usage, 'scratch_name': scratch_name, 'goboscript_name': valid_name})
+
+        return collisions
+
+    def _add_local(self, scratch_name, usage, target_name):
+        key = (scratch_name, usage, target_name)
+        if key not in self.local_names: self.local_names[key] = validate_name(scratch_name)
+
+    def get(self, scratch_name, usage, target_name):
+        """Return the goboscript name of a variable ('var'), list ('list'), procedure ('custom') or argument ('arg') as used in a target.
+        Names of a sprite are searched before those of the stage. Names not found, such as those missing from project.json, are only validated."""
+
+        if usage == 'var' or usage == 'list':
+            pool = self.name_pool.pool
+            if target_name != 'stage':
+                found = pool.get((scratch_name, POOL_USAGE, target_name))
+                if found is not None: return found
+            found = pool.get((scratch_name, POOL_USAGE, 'stage'))
+        else:
+            found = self.local_names.get((scratch_name, usage, target_name))
+
+        return validate_name(scratch_name) if found is None else found
@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import random
+import struct
+import zipfile
+from pathlib import Path
+
+# reporters placed in inputs, as (opcode, input names)
+REPORTERS = [('operator_add', ('NUM1', 'NUM2')), ('operator_multiply', ('NUM1', 'NUM2')), ('operator_join', ('STRING1', 'STRING2')), ('motion_xposition', ())]
+
+# stack blocks, as (opcode, {input name: shadow}, {field name: value}), a field value of None is a variable
+STACK_BLOCKS = [
+    ('data_setvariableto', {'VALUE': [10, '0']}, {'VARIABLE': None}),
+    ('data_changevariableby', {'VALUE': [4, '1']}, {'VARIABLE': None}),
+    ('motion_movesteps', {'STEPS': [4, '10']}, {}),
+    ('motion_gotoxy', {'X': [4, '0'], 'Y': [4, '0']}, {}),
+    ('looks_say', {'MESSAGE': [10, 'Hello!']}, {}),
+    ('looks_changesizeby', {'CHANGE': [4, '10']}, {}),
+    ('control_wait', {'DURATION': [5, '1']}, {}),
+]
+
+# C blocks, as (opcode, condition input or None)
+C_BLOCKS = [('control_repeat', None), ('control_if', 'CONDITION'), ('control_forever', None)]
+
+
+class ProjectGenerator():
+    """Builds the project.json of a synthetic project. Output only depends on the settings and seed.
+    Each script is a hat followed by `stack_length` blocks. Every 4th block of a stack is a C block holding a stack
+    a quarter as long, up to `nesting_depth` levels deep. Inputs are filled with reporters about half the time."""
+
+    def __init__(self, seed=0, nesting_depth=2, comment_density=0.0):
+        self.random = random.Random(seed)
+        self.nesting_depth = nesting_depth
+        self.comment_density = comment_density
+        self.blocks = None
+        self.comments = None
+        self.variables = None
+
+    def new_id(self):
+        return f'b{len(self.blocks)}'
+
+    def add_block(self, opcode, parent, inputs=None, fields=None, top_level=False):
+        block_id = self.new_id()
+        block = {'opcode': opcode, 'next': None, 'parent': parent, 'inputs': inputs or {}, 'fields': fields or {}, 'shadow': False, 'topLevel': top_level}
+        if top_level: block.update(x=0, y=len(self.blocks) * 10)
+        self.blocks[block_id] = block
+
+        if self.comment_density > 0 and self.random.random() < self.comment_density:
+            self.comments[f'c{len(self.comments)}'] = {'blockId': block_id, 'x': 0, 'y': 0, 'width': 200, 'height': 100, 'minimized': False, 'text': f'Comment on {opcode}'}
+
+        return block_id
+
+    def add_reporter(self, parent, depth=0):
+        opcode, input_names = self.random.choice(REPORTERS)
+        block_id = self.add_block(opcode, parent)
+        self.blocks[block_id]['inputs'] = {name: self.add_input(block_id, [4, str(self.random.randint(0, 100))], depth + 1) for name in input_names}
+        return block_id
+
+    def add_input(self, parent, shadow, depth=0):
+        if depth < 2 and self.random.random() < 0.5:
+            return [3, self.add_reporter(parent, depth), shadow]
+        return [1, shadow]
+
+    def add_stack(self, parent, length, depth):
+        """Add a stack of blocks below `parent`. Returns the id of the first block."""
+
+        first_id = None
+        previous_id = parent
+        for i in range(length):
+            if i % 4 == 3 and depth < self.nesting_depth:
+                block_id = self.add_c_block(previous_id, max(1, length // 4), depth)
+            else:
+                block_id = self.add_stack_block(previous_id)
+
+            if first_id is None: first_id = block_id
+            else: self.blocks[previous_id]['next'] = block_id
+            previous_id = block_id
+
+            if self.blocks[block_id]['opcode'] == 'control_forever': break # nothing can follow
+
+        return first_id
+
+    def add_stack_block(self, parent):
+        opcode, shadows, field_values = self.random.choice(STACK_BLOCKS)
+        block_id = self.add_block(opcode, parent)
+        block = self.blocks[block_id]
+        block['inputs'] = {name: self.add_input(block_id, shadow) for name, shadow in shadows.items()}
+        for name, value in field_values.items():
+            if value is None: # variable field
+                variable_id, variable = self.random.choice(list(self.variables.items()))
+                block['fields'][name] = [variable[0], variable_id]
+            else:
+                block['fields'][name] = [value, None]
+        return block_id
+
+    def add_c_block(self, parent, length, depth):
+        opcode, condition = self.random.choice(C_BLOCKS)
+        block_id = self.add_block(opcode, parent)
+        inputs = self.blocks[block_id]['inputs']
+        if opcode == 'control_repeat': inputs['TIMES'] = [1, [6, '10']]
+        if condition is not None:
+            inputs[condition] = [2, self.add_block('operator_gt', block_id, {'OPERAND1': [1, [10, str(self.random.randint(0, 9))]], 'OPERAND2': [1, [10, '5']]})]
+        inputs['SUBSTACK'] = [2, self.add_stack(block_id, length, depth + 1)]
+        return block_id
+
+    def generate_target(self, name, is_stage, scripts, stack_length, variables, lists, list_length, costumes, sounds):
+        """Return a target and a dict of its asset file names and contents."""
+
+        self.blocks = {}
+        self.comments = {}
+        self.variables = {f'{name}var{i}': [f'{name} variable {i}', self.random.randint(0, 100)] for i in range(variables)}
+        if len(self.variables) == 0: self.variables[f'{name}var'] = [f'{name} variable', 0]
+
+        for _ in range(scripts):
+            hat_id = self.add_block('event_whenflagclicked', None, top_level=True)
+            self.blocks[hat_id]['next'] = self.add_stack(hat_id, stack_length, 0)
+
+        target_lists = {}
+        for i in range(lists):
+            items = [self.random.choice((str(self.random.randint(0, 10000)), f'item {j}', self.random.random())) for j in range(list_length)]
+            target_lists[f'{name}list{i}'] = [f'{name} list {i}', items]
+
+        asset_files = {}
+        target_costumes = []
+        for i in range(max(1, costumes)): # every target needs a costume
+            data = f'<svg xmlns="http://www.w3.org/2000/svg" width="{i + 1}" height="1"><!-- {name} {i} --></svg>'.encode()
+            md5 = hashlib.md5(data).hexdigest()
+            asset_files[f'{md5}.svg'] = data
+            target_costumes.append({'name': f'costume{i + 1}', 'bitmapResolution': 1, 'dataFormat': 'svg', 'assetId': md5, 'md5ext': f'{md5}.svg', 'rotationCenterX': 0, 'rotationCenterY': 0})
+
+        target_sounds = []
+        for i in range(sounds):
+            data = make_wav(sample_count=100 + i, seed=f'{name} {i}')
+            md5 = hashlib.md5(data).hexdigest()
+            asset_files[f'{md5}.wav'] = data
+            target_sounds.append({'name': f'sound{i + 1}', 'assetId': md5, 'dataFormat': 'wav', 'format': '', 'rate': 22050, 'sampleCount': 100 + i, 'md5ext': f'{md5}.wav'})
+
+        target = {
+            'isStage': is_stage, 'name': name, 'variables': self.variables, 'lists': target_lists, 'broadcasts': {},
+            'blocks': self.blocks, 'comments': self.comments, 'currentCostume': 0, 'costumes': target_costumes, 'sounds': target_sounds,
+            'volume': 100, 'layerOrder': 0,
+        }
+        if not is_stage: target.update(visible=True, x=0, y=0, size=100, direction=90, draggable=False, rotationStyle='all around')
+
+        return target, asset_files
+
+
+def make_wav(sample_count, seed):
+    """A short 8 bit mono WAV file of noise."""
+
+    rng = random.Random(seed)
+    samples = bytes(rng.randrange(256) for _ in range(sample_count))
+    header = b'RIFF' + struct.pack('<I', 36 + len(samples)) + b'WAVE'
+    header += b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 1, 22050, 22050, 1, 8)
+    header += b'data' + struct.pack('<I', len(samples))
+    return header + samples
+
+
+def generate_project(path, sprites=1, scripts=10, stack_length=20, nesting_depth=2, comment_density=0.0,
+                     variables=4, lists=0, list_length=0, costumes=1, sounds=0, seed=0):
+    """Write a synthetic sb3 file. `sprites` targets are made besides the stage, each with the given number of scripts, variables, lists and assets.
+    `comment_density` is the fraction of blocks with a comment attached. Returns the number of blocks."""
+
+    generator = ProjectGenerator(seed, nesting_depth, comment_density)
+    targets = []
+    asset_files = {}
+    for i in range(sprites + 1):
+        is_stage = i == 0
+        target, files = generator.generate_target('Stage' if is_stage else f'Sprite{i}', is_stage, scripts, stack_length, variables, lists, list_length, costumes, sounds)
+        targets.append(target)
+        asset_files.update(files)
+
+    project_data = {'targets': targets, 'monitors': [], 'extensions': [], 'meta': {'semver': '3.0.0', 'vm': '0.2.0', 'agent': 'synthetic'}}
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('project.json', json.dumps(project_data))
+        for file_name, data in asset_files.items():
+            archive.writestr(file_name, data)
+
+    return sum(len(target['blocks']) for target in targets)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='sb3_to_goboscript_synthetic',
+        description="Generate a synthetic Scratch project for testing and benchmarking. The same settings and seed always give the same project."
+    )
+
+    parser.add_argument("output", type=Path, help="sb3 file to write")
+    parser.add_argument("--sprites", type=int, default=1, help="number of sprites besides the stage")
+    parser.add_argument("--scripts", type=int, default=10, help="scripts per target")
+    parser.add_argument("--stack-length", type=int, default=20, help="blocks in each script, not counting nested blocks")
+    parser.add_argument("--nesting-depth", type=int, default=2, help="how deep C blocks are nested")
+    parser.add_argument("--comment-density", type=float, default=0.0, help="fraction of blocks with a comment")
+    parser.add_argument("--variables", type=int, default=4, help="variables per target")
+    parser.add_argument("--lists", type=int, default=0, help="lists per target")
+    parser.add_argument("--list-length", type=int, default=0, help="items in each list")
+    parser.add_argument("--costumes", type=int, default=1, help="costumes per target")
+    parser.add_argument("--sounds", type=int, default=0, help="sounds per target")
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    block_count = generate_project(args.output, args.sprites, args.scripts, args.stack_length, args.nesting_depth, args.comment_density,
+                                   args.variables, args.lists, args.list_length, args.costumes, args.sounds, args.seed)
+    print(f'Generated {args.output} with {block_count} blocks')
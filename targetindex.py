@@ -0,0 +1,21 @@
+from blockrecord import Block, convert_blocks
+
+
+class TargetIndex():
+    """Lookups for the blocks of a target, built once and shared by all of its scripts.
+    Note that the target's blocks are converted into records in place (see `blockrecord.convert_blocks`) to free the JSON blocks, 
+    so `target['blocks']` holds records afterwards. Copy it first if the JSON is still needed, as `watch.Watcher` does."""
+
+    def __init__(self, target):
+        self.target = target
+        self.blocks: dict[str, Block] = convert_blocks(target['blocks']) # variable and list reporters in list form are removed
+
+        self.top_level = [block_id for block_id, block in self.blocks.items() if block.top_level] # ids of blocks that start a script, in project order
+        self.comments = {} # block id: decoded text of the comment attached to it
+
+        for comment in target['comments'].values():
+            if comment.get('blockId', None) is not None:
+                try:
+                    self.comments[comment['blockId']] = bytes(comment['text'], "utf-8").decode("unicode_escape")
+                except:
+                    pass
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+
+import batch
+import convert_project
+import manifest
+import synthetic
+
+
+def read_files(directory):
+    files = {}
+    for folder, _, names in os.walk(directory):
+        for name in names:
+            if name == manifest.MANIFEST_FILE_NAME: continue
+            with open(os.path.join(folder, name), 'rb') as f:
+                files[os.path.relpath(os.path.join(folder, name), directory)] = f.read()
+    return files
+
+
+class TestBatch(unittest.TestCase):
+    def test_same_output_folder_converted_in_order(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project_paths = []
+            for i, folder in enumerate(('a', 'b', 'c')):
+                os.mkdir(os.path.join(directory, folder))
+                project_paths.append(os.path.join(directory, folder, 'p1.sb3'))
+                synthetic.generate_project(project_paths[-1], sprites=2, scripts=20, seed=i)
+
+            output_dir = os.path.join(directory, 'output')
+            results = batch.convert_batch(project_paths, output_dir, jobs=3)
+            self.assertEqual([r['status'] for r in results], ['ok'] * 3)
+
+            # the last project given is the one left in the folder
+            expected_dir = os.path.join(directory, 'expected')
+            os.mkdir(expected_dir)
+            convert_project.convert_project(project_paths[-1], expected_dir, verbose=False)
+            self.assertEqual(read_files(os.path.join(output_dir, 'p1')), read_files(os.path.join(expected_dir, 'p1')))
+
+    def test_no_jobs(self):
+        with self.assertRaises(Exception):
+            batch.convert_batch([], jobs=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import blocks
+import checks
+import synthetic
+
+
+def make_procedure(blocks_data, name, warp):
+    """Add a custom block definition with a `warp` as given to a dict of blocks in project.json form."""
+
+    definition_id, prototype_id = f'{name}_definition', f'{name}_prototype'
+    blocks_data[definition_id] = {'opcode': 'procedures_definition', 'next': None, 'parent': None, 'inputs': {'custom_block': [1, prototype_id]}, 
+        'fields': {}, 'shadow': False, 'topLevel': True, 'x': 0, 'y': 0}
+    blocks_data[prototype_id] = {'opcode': 'procedures_prototype', 'next': None, 'parent': definition_id, 'inputs': {}, 'fields': {}, 'shadow': True, 'topLevel': False,
+        'mutation': {'tagName': 'mutation', 'children': [], 'proccode': name, 'argumentids': '[]', 'argumentnames': '[]', 'argumentdefaults': '[]', 'warp': warp}}
+
+
+def make_warp_project(path):
+    """Write an sb3 file with custom blocks using both the string and bool forms of `warp`."""
+
+    blocks_data = {}
+    for name, warp in (('string_true', 'true'), ('string_false', 'false'), ('bool_true', True), ('bool_false', False)):
+        make_procedure(blocks_data, name, warp)
+
+    stage = {'isStage': True, 'name': 'Stage', 'variables': {}, 'lists': {}, 'broadcasts': {}, 'blocks': blocks_data, 'comments': {}, 
+        'currentCostume': 0, 'costumes': [], 'sounds': [], 'volume': 100, 'layerOrder': 0}
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('project.json', json.dumps({'targets': [stage], 'monitors': [], 'extensions': [], 'meta': {'semver': '3.0.0'}}))
+
+
+class TestReproducible(unittest.TestCase):
+    def test_relative_project_path(self):
+        previous_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            synthetic.generate_project(os.path.join(directory, 'p1.sb3'), scripts=2, stack_length=5)
+            os.chdir(directory)
+            try:
+                is_reproducible, _, _ = checks.check_reproducible('p1.sb3')
+            finally:
+                os.chdir(previous_dir)
+
+        self.assertTrue(is_reproducible)
+
+
+class TestWarp(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.project_path = os.path.join(self.directory.name, 'warp.sb3')
+        make_warp_project(self.project_path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_parse_warp(self):
+        self.assertTrue(checks.parse_warp('true'))
+        self.assertFalse(checks.parse_warp('false'))
+        self.assertTrue(checks.parse_warp(True))
+        self.assertFalse(checks.parse_warp(False))
+        self.assertFalse(checks.parse_warp(None))
+
+    def test_warp_kept(self):
+        is_same, differences = checks.check_warp(self.project_path)
+        self.assertTrue(is_same, differences)
+
+        with open(self.project_path, 'rb') as f:
+            warps = checks.get_output_warps(checks.convert_project.convert_project_in_memory(f.read()))
+        self.assertEqual(warps['stage.gs'], {'string_true': [True], 'string_false': [False], 'bool_true': [True], 'bool_false': [False]})
+
+    def test_wrong_warp_found(self):
+        with mock.patch.object(blocks, 'is_warp', lambda mutation: True):
+            is_same, differences = checks.check_warp(self.project_path)
+        self.assertFalse(is_same)
+        self.assertEqual({d[1] for d in differences}, {'string_false', 'bool_false'})
+
+
+if __name__ == '__main__':
+    unittest.main()
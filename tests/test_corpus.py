@@ -0,0 +1,25 @@
+import os
+import tempfile
+import unittest
+
+import corpus
+import synthetic
+
+
+class TestCorpus(unittest.TestCase):
+    def test_relative_project_path(self):
+        previous_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            synthetic.generate_project(os.path.join(directory, 'p1.sb3'), scripts=2, stack_length=5)
+            os.chdir(directory)
+            try:
+                row = corpus.benchmark_project(os.path.join('.', 'p1.sb3'))
+            finally:
+                os.chdir(previous_dir)
+
+        self.assertEqual(row['status'], 'ok', row['error'])
+        self.assertEqual(row['targets'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+
+import convert_project
+import synthetic
+
+
+def rename_variable(project_path, target_name, old_name, new_name):
+    with zipfile.ZipFile(project_path) as archive:
+        files = {name: archive.read(name) for name in archive.namelist()}
+
+    project_data = json.loads(files['project.json'])
+    for target in project_data['targets']:
+        if target['name'] != target_name: continue
+        for variable in target['variables'].values():
+            if variable[0] == old_name: variable[0] = new_name
+        for block in target['blocks'].values():
+            if isinstance(block, dict) and 'VARIABLE' in block['fields'] and block['fields']['VARIABLE'][0] == old_name:
+                block['fields']['VARIABLE'][0] = new_name
+    files['project.json'] = json.dumps(project_data).encode()
+
+    with zipfile.ZipFile(project_path, 'w') as archive:
+        for name, data in files.items(): archive.writestr(name, data)
+
+
+class TestIncremental(unittest.TestCase):
+    def test_local_rename_only_changes_its_target(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project_path = os.path.join(directory, 'p1.sb3')
+            synthetic.generate_project(project_path, sprites=2, scripts=2, stack_length=5)
+            output_dir = os.path.join(directory, 'p1')
+
+            def convert():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    convert_project.convert_project(project_path, directory)
+                return {f: os.stat(os.path.join(output_dir, f)).st_mtime_ns for f in ('stage.gs', 'Sprite1.gs', 'Sprite2.gs')}
+
+            first = convert()
+            rename_variable(project_path, 'Sprite1', 'Sprite1 variable 0', 'renamed')
+            second = convert()
+
+            self.assertEqual(first['stage.gs'], second['stage.gs'])
+            self.assertEqual(first['Sprite2.gs'], second['Sprite2.gs'])
+            self.assertNotEqual(first['Sprite1.gs'], second['Sprite1.gs'])
+            with open(os.path.join(output_dir, 'Sprite1.gs'), encoding='utf-8') as f:
+                self.assertIn('var renamed', f.read())
+
+
+    def test_edited_list_file_is_rewritten(self):
+        for low_memory in (False, True):
+            with self.subTest(low_memory=low_memory), tempfile.TemporaryDirectory() as directory:
+                project_path = os.path.join(directory, 'p1.sb3')
+                synthetic.generate_project(project_path, scripts=2, stack_length=5, lists=1, list_length=50)
+                output_dir = os.path.join(directory, 'p1')
+
+                def convert():
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        convert_project.convert_project(project_path, directory, list_file_threshold=10, low_memory=low_memory)
+
+                convert()
+                list_paths = sorted(os.path.join(folder, name) for folder, _, names in os.walk(os.path.join(output_dir, 'lists')) for name in names)
+                self.assertEqual(len(list_paths), 2)
+                with open(list_paths[0], 'rb') as f: original = f.read()
+                with open(list_paths[0], 'wb') as f: f.write(original[:len(original) // 2])
+
+                convert()
+                with open(list_paths[0], 'rb') as f: self.assertEqual(f.read(), original)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import io
+import json
+import unittest
+
+from jsonstream import JsonStream
+
+CHUNK_SIZES = (1, 2, 3)
+
+DOCUMENTS = [
+    '{}',
+    '[]',
+    '  [ 1 , -2.5e+3 , 0 , 12345678901234567890 , true , false , null ]  ',
+    '{"a": {"b": [1, [2, [3, {}]], {"c": []}]}, "d": "e"}',
+    r'["\"quoted\"", "back\\slash\\", "\\\"", "new\nline\ttab", "\/"]',
+    r'["é中", "😀", "é中😀", "\""]',
+    r'["\u00e9\u4E2D", "\ud83d\ude00", "a\u0022b", "\u005c"]',
+    '{"brackets": "[{]}", "commas": ",:,", "key with spaces": "x y"}',
+    '[[1, "a"], {"k": [true, null]}, "s", 3.0, [], {}]',
+]
+
+
+def build(stream: JsonStream):
+    """Read a value through the iterators, as a document is read by projectstream.py."""
+
+    char = stream.peek()
+    if char == '{': return {key: build(stream) for key in stream.iter_object()}
+    if char == '[': return [build(stream) for _ in stream.iter_array()]
+    return stream.read_value()
+
+
+def open_stream(text, chunk_size):
+    return JsonStream(io.StringIO(text), chunk_size)
+
+
+class TestJsonStream(unittest.TestCase):
+    def test_read_matches_json(self):
+        for chunk_size in CHUNK_SIZES:
+            for document in DOCUMENTS:
+                with self.subTest(chunk_size=chunk_size, document=document):
+                    self.assertEqual(build(open_stream(document, chunk_size)), json.loads(document))
+                    self.assertEqual(open_stream(document, chunk_size).read_value(), json.loads(document))
+
+    def test_array_batches(self):
+        documents = DOCUMENTS + ['["a", "b,c", 1, 22, 333, [4], "d", {"e": 5}, "f"]', '[1]', '["\\\\", "\\""]']
+        for chunk_size in CHUNK_SIZES:
+            for document in documents:
+                if not document.strip().startswith('['): continue
+                with self.subTest(chunk_size=chunk_size, document=document):
+                    stream = open_stream(document, chunk_size)
+                    items = [item for batch in stream.iter_array_batches() for item in batch]
+                    self.assertEqual(items, json.loads(document))
+                    self.assertEqual(stream.peek(), '')
+
+    def test_skip_value(self):
+        skipped = {'skip': DOCUMENTS, 'string': 'a \\" [ { b', 'number': -12.5}
+        document = json.dumps({'before': 1, **skipped, 'after': ['x', {'y': '\\u00e9'}]})
+        for chunk_size in CHUNK_SIZES:
+            with self.subTest(chunk_size=chunk_size):
+                stream = open_stream(document, chunk_size)
+                read = {}
+                for key in stream.iter_object():
+                    if key in skipped: stream.skip_value()
+                    else: read[key] = build(stream)
+                self.assertEqual(read, {'before': 1, 'after': ['x', {'y': '\\u00e9'}]})
+
+    def test_skip_nested(self):
+        for chunk_size in CHUNK_SIZES:
+            for document in DOCUMENTS:
+                with self.subTest(chunk_size=chunk_size, document=document):
+                    stream = open_stream(f'[{document}, "next"]', chunk_size)
+                    items = []
+                    for i in stream.iter_array():
+                        if i == 0: stream.skip_value()
+                        else: items.append(stream.read_value())
+                    self.assertEqual(items, ['next'])
+
+    def test_malformed(self):
+        documents = ['[1 2]', '[1,', '{"a" 1}', '{"a": 1,}', '"unterminated', '[tru]', '{"a": [1, "b}', '[1, }']
+        for chunk_size in CHUNK_SIZES:
+            for document in documents:
+                with self.subTest(chunk_size=chunk_size, document=document):
+                    self.assertRaises(ValueError, json.loads, document)
+                    with self.assertRaises(Exception):
+                        build(open_stream(document, chunk_size))
+
+    def test_skip_malformed(self):
+        for chunk_size in CHUNK_SIZES:
+            for document in ['[1, "a', '{"a": [1, 2]', '"unterminated']:
+                with self.subTest(chunk_size=chunk_size, document=document):
+                    with self.assertRaises(Exception):
+                        open_stream(document, chunk_size).skip_value()
+
+
+if __name__ == '__main__':
+    unittest.main()
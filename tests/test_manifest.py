@@ -0,0 +1,27 @@
+import os
+import tempfile
+import unittest
+
+from manifest import Manifest
+
+
+class TestManifest(unittest.TestCase):
+    def test_stale_asset_removed_after_settings_change(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manifest = Manifest(directory, {'deterministic': False})
+            manifest.update_assets({'old.svg': 'costumes/a.svg'})
+            manifest.save()
+
+            asset_path = os.path.join(directory, 'costumes', 'a.svg')
+            os.makedirs(os.path.dirname(asset_path))
+            with open(asset_path, 'w') as f:
+                f.write('old')
+
+            manifest = Manifest(directory, {'deterministic': True})
+            self.assertEqual(manifest.targets, {})
+            manifest.update_assets({'new.svg': 'costumes/a.svg'})
+            self.assertFalse(os.path.exists(asset_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import optimise
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg">\n  <!-- comment -->\n  <rect width="10" height="10"/>\n</svg>\n'
+
+
+class TestAssetOptimiser(unittest.TestCase):
+    def test_cache_kept_per_optimiser(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_dir = os.path.join(directory, 'cache')
+            path = os.path.join(directory, 'a.svg')
+            md5ext = 'a0000000000000000000000000000000.svg'
+
+            with open(path, 'wb') as f: f.write(SVG)
+            with mock.patch.object(optimise, 'find_tool', lambda name: None):
+                optimiser = optimise.AssetOptimiser(cache_dir, jobs=1)
+                optimiser.optimise({path: md5ext})
+                self.assertEqual(optimiser.report['methods'], {'minify_svg': 1})
+                self.assertTrue(os.path.isfile(os.path.join(cache_dir, 'minify_svg', md5ext)))
+
+                with open(path, 'wb') as f: f.write(SVG)
+                self.assertTrue(optimise.AssetOptimiser(cache_dir).use_cached(path, md5ext))
+
+            # once a tool is installed, the result of the fallback isn't used
+            with open(path, 'wb') as f: f.write(SVG)
+            with mock.patch.object(optimise, 'find_tool', lambda name: name if name == 'svgo' else None):
+                self.assertFalse(optimise.AssetOptimiser(cache_dir).use_cached(path, md5ext))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import functools
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import projectstream
+import spill
+import synthetic
+from jsonstream import JsonStream
+
+ITEMS = ['a', 'b,c', 'new\nline', 'back\\nslash', '"quoted"', 'é😀', 1, -2.5, True, '', '[1]'] * 3
+
+
+def add_values(project_path):
+    """Give the stage a list and a long variable value with characters that need escaping."""
+
+    with zipfile.ZipFile(project_path) as archive:
+        files = {name: archive.read(name) for name in archive.namelist()}
+
+    project_data = json.loads(files['project.json'])
+    stage = project_data['targets'][0]
+    stage['lists']['test list'] = ['items', ITEMS]
+    stage['lists']['empty list'] = ['empty', []]
+    stage['variables']['test variable'] = ['long', 'x \\" [ {' * 10]
+    files['project.json'] = json.dumps(project_data, ensure_ascii=False).encode()
+
+    with zipfile.ZipFile(project_path, 'w') as archive:
+        for name, data in files.items(): archive.writestr(name, data)
+
+    return project_data
+
+
+class TestProjectStream(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.project_path = os.path.join(self.directory.name, 'p1.sb3')
+        synthetic.generate_project(self.project_path, sprites=2, scripts=2, stack_length=5)
+        self.project_data = add_values(self.project_path)
+
+        # tiny chunks so tokens are split between them
+        patcher = mock.patch.object(projectstream, 'JsonStream', functools.partial(JsonStream, chunk_size=3))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_iter_targets(self):
+        spill_dir = os.path.join(self.directory.name, 'spill')
+        with mock.patch.object(projectstream, 'SPILL_TEXT_THRESHOLD', 20), zipfile.ZipFile(self.project_path) as archive:
+            targets = list(projectstream.iter_targets(archive, spill_dir))
+
+        self.assertEqual(len(targets), len(self.project_data['targets']))
+        for target, expected in zip(targets, self.project_data['targets']):
+            self.assertEqual(target['blocks'], expected['blocks'])
+            for list_id, (name, items) in target['lists'].items():
+                self.assertEqual(name, expected['lists'][list_id][0])
+                self.assertEqual(list(items), expected['lists'][list_id][1])
+                self.assertEqual(''.join(items.iter_json_array()), json.dumps(expected['lists'][list_id][1]))
+
+            for variable_id, (name, value) in target['variables'].items():
+                expected_value = expected['variables'][variable_id][1]
+                if isinstance(value, spill.SpilledText): self.assertEqual(''.join(value.iter_chunks()), f'"{expected_value}"')
+                else: self.assertEqual(value, expected_value)
+
+        stage_lists = targets[0]['lists']
+        self.assertTrue(stage_lists['test list'][1].has_new_line)
+        self.assertFalse(stage_lists['empty list'][1].has_new_line)
+        self.assertEqual(stage_lists['test list'][1].last_item_text, '[1]')
+
+    def test_read_metadata(self):
+        with zipfile.ZipFile(self.project_path) as archive:
+            project_data = projectstream.read_metadata(archive)
+
+        for target, expected in zip(project_data['targets'], self.project_data['targets'], strict=True):
+            self.assertEqual(target['blocks'], {})
+            self.assertEqual(target['name'], expected['name'])
+            self.assertEqual(target['costumes'], expected['costumes'])
+            self.assertEqual(target['lists'], {list_id: [name, []] for list_id, (name, _) in expected['lists'].items()})
+            self.assertEqual(target['variables'], {variable_id: [name, None] for variable_id, (name, _) in expected['variables'].items()})
+
+
+class TestSpilledList(unittest.TestCase):
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            items = spill.SpilledList(os.path.join(directory, 'list.jsonl'))
+            items.extend(ITEMS[:4])
+            items.extend([])
+            items.extend(ITEMS[4:])
+            items.close()
+
+            self.assertEqual(list(items), ITEMS)
+            self.assertEqual(len(items), len(ITEMS))
+            self.assertEqual(json.loads(''.join(items.iter_json_array())), ITEMS)
+            self.assertTrue(items.has_new_line)
+
+    def test_escaped_backslash_is_not_new_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            items = spill.SpilledList(os.path.join(directory, 'list.jsonl'))
+            items.extend(['back\\nslash', 'r\\\\r'])
+            items.close()
+            self.assertFalse(items.has_new_line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+import zipfile
+
+import convert_project
+import sink
+import synthetic
+
+
+class TestZipSink(unittest.TestCase):
+    def test_assets_copied(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project_path = os.path.join(directory, 'p1.sb3')
+            synthetic.generate_project(project_path, scripts=2, stack_length=5, costumes=2, sounds=1)
+            convert_project.convert_project_to_zip(project_path, deterministic=True, verbose=False)
+
+            with zipfile.ZipFile(project_path) as source, zipfile.ZipFile(os.path.join(directory, 'p1.zip')) as output:
+                self.assertIsNone(output.testzip())
+                source_infos = {info.CRC: info for info in source.infolist() if info.filename != 'project.json'}
+                asset_infos = [info for info in output.infolist() if info.filename.startswith(('costumes/', 'sounds/'))]
+                self.assertEqual(len(asset_infos), 6)
+                for info in asset_infos:
+                    stored_format = info.filename.rpartition('.')[2] in sink.STORED_FORMATS
+                    self.assertEqual(info.compress_type, zipfile.ZIP_STORED if stored_format else zipfile.ZIP_DEFLATED)
+                    self.assertEqual(output.read(info), source.read(source_infos[info.CRC]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from symboltable import SymbolTable
+
+
+def make_target(name, variables=(), lists=()):
+    return {'isStage': name == 'stage', 'name': name, 'blocks': {}, 'broadcasts': {},
+        'variables': {f'v{i}': [n, 0] for i, n in enumerate(variables)}, 'lists': {f'l{i}': [n, []] for i, n in enumerate(lists)}}
+
+
+class TestSymbolTable(unittest.TestCase):
+    def test_variable_and_list_with_same_name(self):
+        # a variable and a list sharing a name kept it unsuffixed before the symbol table, and still do
+        symbols = SymbolTable()
+        symbols.add_project({'targets': [make_target('stage', ['score'], ['score']), make_target('Sprite1', ['items'], ['items'])]})
+
+        self.assertEqual(symbols.get('score', 'var', 'stage'), 'score')
+        self.assertEqual(symbols.get('score', 'list', 'stage'), 'score')
+        self.assertEqual(symbols.get('items', 'var', 'Sprite1'), 'items')
+        self.assertEqual(symbols.get('items', 'list', 'Sprite1'), 'items')
+        self.assertEqual(symbols.get_collisions(), [])
+
+    def test_colliding_names_suffixed(self):
+        symbols = SymbolTable()
+        symbols.add_project({'targets': [make_target('stage', ['a b', 'a_b'])]})
+
+        names = {symbols.get('a b', 'var', 'stage'), symbols.get('a_b', 'var', 'stage')}
+        self.assertIn('a_b', names)
+        self.assertEqual(len(names), 2)
+        self.assertEqual(len(symbols.get_collisions()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import json
+import unittest
+
+import worker
+
+
+def job_line(options):
+    return json.dumps({'id': 1, 'input': 'project.sb3', 'options': options})
+
+
+class TestParseJob(unittest.TestCase):
+    def test_valid_options(self):
+        options = {'incremental': False, 'list_file_threshold': 100, 'asset_store': 'store', 'optimise_cache': None}
+        self.assertEqual(worker.parse_job(job_line(options))['options'], options)
+
+    def test_invalid_option_values(self):
+        invalid = [{'list_file_threshold': 'x'}, {'list_file_threshold': True}, {'list_file_threshold': 1.5},
+                   {'asset_store': 5}, {'memoize': 1}, {'deterministic': None}, {'optimise_cache': []}]
+        for options in invalid:
+            with self.subTest(options=options), self.assertRaisesRegex(Exception, 'must be'):
+                worker.parse_job(job_line(options))
+
+    def test_unknown_option(self):
+        with self.assertRaisesRegex(Exception, 'Unknown option'):
+            worker.parse_job(job_line({'jobs': 4}))
+
+
+if __name__ == '__main__':
+    unittest.main()
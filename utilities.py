@@ -1,22 +1,35 @@
 import re
+import gc
 import math
+import hashlib
+from contextlib import contextmanager
+from functools import lru_cache
 
-ALLOWED_NAME_PATTERN = re.compile('[_a-zA-Z0-9]')
 DISALLOWED_NAMES = {'costumes','sounds','global','list','nowarp','onflag','onkey','onbackdrop','onloudness','ontimer','on','onclone','if','else','elif','until','forever','repeat','delete','at','add','to','insert','true','false','as','struct','enum','return','error','warn','breakpoint','local','not','and','or','in','length','round','abs','floor','ceil','sqrt','sin','cos','tan','asin','acos','atan','ln','log','antiln','antilog','move','turn_left','turn_right','goto_random_position','goto_mouse_pointer','goto','glide','glide_to_random_position','glide_to_mouse_pointer','point_in_direction','point_towards_mouse_pointer','point_towards_random_direction','point_towards','change_x','set_x','change_y','set_y','if_on_edge_bounce','set_rotation_style_left_right','set_rotation_style_do_not_rotate','set_rotation_style_all_around','say','think','switch_costume','next_costume','switch_backdrop','next_backdrop','set_size','change_size','change_color_effect','change_fisheye_effect','change_whirl_effect','change_pixelate_effect','change_mosaic_effect','change_brightness_effect','change_ghost_effect','set_color_effect','set_fisheye_effect','set_whirl_effect','set_pixelate_effect','set_mosaic_effect','set_brightness_effect','set_ghost_effect','clear_graphic_effects','show','hide','goto_front','goto_back','go_forward','go_backward','play_sound_until_done','start_sound','stop_all_sounds','change_pitch_effect','change_pan_effect','set_pitch_effect','set_pan_effect','change_volume','set_volume','clear_sound_effects','broadcast','broadcast_and_wait','wait','wait_until','stop_all','stop_this_script','stop_other_scripts','delete_this_clone','clone','ask','set_drag_mode_draggable','set_drag_mode_not_draggable','reset_timer','erase_all','stamp','pen_down','pen_up','set_pen_color','change_pen_size','set_pen_size','set_pen_hue','set_pen_saturation','set_pen_brightness','set_pen_transparency','change_pen_hue','change_pen_saturation','change_pen_brightness','change_pen_transparency','rest','set_tempo','change_tempo','distance_to_moues_pointer','distance_to','x_position','y_position','direction','size','costume_number','costume_name','backdrop_number','backdrop_name','volume','touching_mouse_pointer','touching_edge','touching','key_pressed','mouse_down','mouse_x','mouse_y','loudness','timer','current_year','current_month','current_date','current_day_of_week','current_hour','current_minute','current_second','days_since_2000','username','touching_color','color_is_touching_color','answer','random','func'}
 
 
-def validate_name(name: str):
-    """Make a variable, list, or custom block name valid for goboscript. Removes special characters."""
+class _NameCharacters(dict):
+    """Translation table for `validate_name`. Characters not allowed are added as they are found."""
 
-    new_name = ''
-    for char in name:
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
         if char.isascii():
-            if re.match(ALLOWED_NAME_PATTERN, char):
-                new_name += char
-            else: new_name += '_'
-        else: 
-            char.encode()
-            new_name += f"0x{ord(char):06X}" # padded hexadecimal representing special character
+            replacement = '_'
+        else:
+            char.encode() # raises for characters that can't be encoded such as lone surrogates
+            replacement = f"0x{codepoint:06X}" # padded hexadecimal representing special character
+        
+        self[codepoint] = replacement
+        return replacement
+
+NAME_CHARACTERS = _NameCharacters({ord(char): char for char in '_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'})
+
+
+@lru_cache(maxsize=1<<16)
+def validate_name(name: str):
+    """Make a variable, list, or custom block name valid for goboscript. Removes special characters. Results are cached as names are repeated a lot."""
+
+    new_name = name.translate(NAME_CHARACTERS)
     
     if (not new_name) or new_name[0].isnumeric() or new_name in DISALLOWED_NAMES:
         new_name = '_' + new_name
@@ -24,9 +37,23 @@ def validate_name(name: str):
     return new_name
 
 
+@contextmanager
+def paused_gc():
+    """Pause the garbage collector while creating many objects without reference cycles, 
+    as it would otherwise repeatedly scan everything already loaded (such as the whole project)."""
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled: gc.enable()
+
+
 def hash_stringified(value):
+    """Short stable hash of a value as text. The built-in `hash()` is randomised per process so it isn't used."""
     CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-    value = hash(value)
+    value = int.from_bytes(hashlib.sha256(repr(value).encode()).digest()[:8])
     result = ''
     for _ in range(5):
         result = CHARS[value % 62] + result
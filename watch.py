@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import time
+import zipfile
+
+import assets
+import blocks
+import config
+import convert_project
+from manifest import Manifest, get_target_hashes, get_names_hashes, hash_data
+from sink import DirectorySink
+from symboltable import SymbolTable
+from targetindex import TargetIndex
+
+
+def get_script_hashes(target) -> dict:
+    """Hash each script of a target by its blocks and their attached comments, as found in project.json.
+    Returns a dict of top level block ids and hashes, in project order. The position of a script is left out so moving it isn't a change."""
+
+    target_blocks = target['blocks']
+    comments = {c['blockId']: c['text'] for c in target['comments'].values() if c.get('blockId') is not None}
+
+    script_hashes = {}
+    for top_level_id, top_level_block in target_blocks.items():
+        if not isinstance(top_level_block, dict) or not top_level_block.get('topLevel'): continue
+
+        script = [] # of [block id, block, comment], dumped at once as that is much faster than per block
+        visited = set()
+        stack = [top_level_id]
+        while stack:
+            block_id = stack.pop()
+            block = target_blocks.get(block_id)
+            if block_id in visited or not isinstance(block, dict): continue
+            visited.add(block_id)
+
+            if block_id == top_level_id: block = {k: v for k, v in block.items() if k != 'x' and k != 'y'}
+            script.append([block_id, block, comments.get(block_id)])
+
+            for block_input in block.get('inputs', {}).values():
+                stack.extend(slot for slot in block_input[1:] if isinstance(slot, str))
+            if block.get('next') is not None: stack.append(block['next'])
+
+        # keys are left in the order they were saved, a different order only means a script is converted again
+        script_hashes[top_level_id] = hashlib.sha256(json.dumps(script, separators=(',', ':')).encode()).hexdigest()
+
+    return script_hashes
+
+
+class Watcher():
+    """Converts a project into a folder, and again whenever `update` is called, regenerating only what changed.
+    The code of each script is kept between updates, so in a target that changed only the scripts that changed are converted again.
+    The first update converts every script for this reason, even of targets whose files are up to date. Targets are skipped using the manifest, and assets already in the folder aren't copied again, as in `convert_project.convert_project`."""
+
+    def __init__(self, project_path, output_directory=None, deterministic=False, list_file_threshold=None, asset_store=None):
+        self.project_path = project_path
+        self.output_dir = convert_project.get_output_dir(project_path, output_directory)
+        self.deterministic = deterministic
+        self.list_file_threshold = list_file_threshold
+        self.asset_store = None if asset_store is None else assets.AssetStore(asset_store)
+
+        self.project_stat = None # (modification time, size) of the project when last read
+        self.project_hash = None # of project.json when last converted
+        self.names_hashes = {} # goboscript file name: hash of the names its target can use
+        self.target_count = 0
+        self.script_code = {} # goboscript file name: {script hash: code}
+        self.target_blocks = {} # goboscript file name: (copy of its blocks as in project.json, their hash_data, script hashes)
+
+    def has_changed(self):
+        """True if the project file was modified since this was last called."""
+
+        try:
+            stat = os.stat(self.project_path)
+        except OSError:
+            return False # being replaced
+
+        project_stat = (stat.st_mtime_ns, stat.st_size)
+        if project_stat == self.project_stat: return False
+        self.project_stat = project_stat
+        return True
+
+    def update(self) -> dict:
+        """Convert what changed since the last update. Returns a dict of what was done:
+        the number of targets, the file names written, the number of scripts and how many were converted, the number of assets copied, and seconds taken."""
+
+        start = time.perf_counter()
+        report = {'targets': 0, 'written': [], 'scripts': 0, 'converted': 0, 'assets': 0, 'seconds': None}
+
+        with zipfile.ZipFile(self.project_path, 'r') as project_archive:
+            project_json = project_archive.read('project.json')
+            project_hash = hashlib.sha256(project_json).hexdigest()
+            if project_hash == self.project_hash: # saved again without changes
+                report['targets'] = self.target_count
+                report['seconds'] = time.perf_counter() - start
+                return report
+
+            project_data = json.loads(project_json)
+            del project_json
+            convert_project.validate_target_names(project_data)
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            sink = DirectorySink(self.output_dir, self.asset_store)
+            manifest = Manifest(self.output_dir, {'deterministic': self.deterministic, 'list_file_threshold': self.list_file_threshold})
+
+            remapped_costume_names = assets.get_remapped_costume_names(project_data)
+            remapped_sound_names = assets.get_remapped_sound_names(project_data)
+            manifest.update_assets(remapped_costume_names, remapped_sound_names)
+            report['assets'] = sink.add_assets(project_archive, remapped_costume_names, remapped_sound_names)
+
+        symbols = SymbolTable()
+        symbols.add_project(project_data)
+        shared_project_data = {'symbols': symbols, 'verbose': False}
+        declarations = convert_project.resolve_declarations(project_data, symbols, self.list_file_threshold)
+        newline = '\n' if self.deterministic else None
+
+        # a later target with the same file name replaces the earlier
+        targets = {}
+        for target, target_declarations in zip(project_data['targets'], declarations):
+            targets[target['name'] +".gs"] = (target, target_declarations)
+        report['targets'] = self.target_count = len(targets)
+
+        names_hashes = get_names_hashes(symbols, [target['name'] for target, _ in targets.values()])
+        names_hashes = {file_name: names_hashes[target['name']] for file_name, (target, _) in targets.items()}
+        for file_name, names_hash in names_hashes.items():
+            if names_hash != self.names_hashes.get(file_name): self.script_code.pop(file_name, None) # scripts may use any of the names
+        self.names_hashes = names_hashes
+
+        target_hashes = {}
+        target_blocks = {}
+        for file_name, (target, target_declarations) in targets.items():
+            # comparing the blocks with the last update is much faster than hashing them again
+            previous = self.target_blocks.get(file_name)
+            if previous is not None and previous[0] == target['blocks']:
+                target_blocks[file_name] = previous
+            else:
+                target_blocks[file_name] = (dict(target['blocks']), hash_data(target['blocks']), get_script_hashes(target)) # before the blocks are converted
+
+            target_hashes[file_name] = get_target_hashes(target, target_declarations, remapped_costume_names, remapped_sound_names, names_hashes[file_name], target_blocks[file_name][1])
+            if convert_project.is_target_unchanged(manifest, file_name, target_hashes[file_name]):
+                # up to date from an earlier conversion, the code of its scripts is kept for when it changes
+                if file_name not in self.script_code: self.convert_scripts(file_name, target, target_blocks[file_name][2], shared_project_data, report)
+                continue
+
+            self.write_target(sink, file_name, target, target_declarations, target_blocks[file_name][2], remapped_costume_names, remapped_sound_names, shared_project_data, newline, report)
+            manifest.record(file_name, target_hashes[file_name], target_declarations['list_files'].values())
+
+        manifest.targets = {file_name: manifest.targets[file_name] for file_name in target_hashes} # forget removed targets
+        manifest.save()
+        self.script_code = {file_name: code for file_name, code in self.script_code.items() if file_name in targets}
+        self.target_blocks = target_blocks
+
+        config_text = config.get_config_text(project_data)
+        if config_text is not None: sink.write_text('goboscript.toml', config_text, newline)
+
+        self.project_hash = project_hash
+        report['seconds'] = time.perf_counter() - start
+        return report
+
+    def convert_scripts(self, file_name, target, script_hashes, shared_project_data, report):
+        """Return the code of each script of a target in order, converting only those whose code isn't kept from an earlier update.
+        `script_hashes` are from `get_script_hashes`."""
+
+        previous_code = self.script_code.get(file_name, {})
+        script_code = {}
+        target_index = None # built only if a script needs converting
+
+        for block_id, script_hash in script_hashes.items():
+            code = previous_code.get(script_hash)
+            if code is None:
+                if target_index is None: target_index = TargetIndex(target)
+                code = blocks.convert_script(target, block_id, shared_project_data, target_index)
+                report['converted'] += 1
+            script_code[script_hash] = code
+
+        self.script_code[file_name] = script_code
+        report['scripts'] += len(script_hashes)
+        return [script_code[script_hash] for script_hash in script_hashes.values()]
+
+    def write_target(self, sink, file_name, target, target_declarations, script_hashes, remapped_costume_names, remapped_sound_names, shared_project_data, newline, report):
+        convert_project.write_list_data(sink, target_declarations)
+        with sink.open_lines(file_name, newline) as goboscript_code:
+            convert_project.write_target_header(goboscript_code, target, target_declarations, remapped_costume_names, remapped_sound_names)
+            for code in self.convert_scripts(file_name, target, script_hashes, shared_project_data, report):
+                goboscript_code.write_line(code)
+                goboscript_code.write_line('') # spacing for next
+
+        report['written'].append(file_name)
+
+
+def print_update(report, latency=None):
+    line = f"Wrote {len(report['written'])} of {report['targets']} targets, converted {report['converted']} of {report['scripts']} scripts, copied {report['assets']} assets in {report['seconds'] * 1000:.0f} ms"
+    if latency is not None: line += f", {latency * 1000:.0f} ms after saving"
+    print(line)
+
+
+def watch(project_path, output_directory=None, interval=0.5, deterministic=False, list_file_threshold=None, asset_store=None):
+    """Convert a project, then check its file every `interval` seconds and update the output whenever it changes, until interrupted.
+    The time each update took is printed, along with how long after the file was saved it finished."""
+
+    if not os.path.isfile(project_path): raise Exception(f'Input not a file path: "{project_path}"')
+    watcher = Watcher(project_path, output_directory, deterministic, list_file_threshold, asset_store)
+    print(f'Watching {project_path}, converting into {watcher.output_dir}')
+
+    try:
+        while True:
+            if watcher.has_changed():
+                try:
+                    report = watcher.update()
+                except Exception as e:
+                    # most likely still being saved, but could be a bug converting the project. Either way keep watching
+                    print(f'Could not update ({type(e).__name__}: {e}), trying again when the project is next saved')
+                else:
+                    print_update(report, time.time() - watcher.project_stat[0] / 1e9)
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
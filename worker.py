@@ -0,0 +1,217 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import convert_project
+import manifest
+
+# options a job may give, as keyword arguments of `convert_project.convert_project`, and the types of their values
+JOB_OPTIONS = {
+    'incremental': (bool,),
+    'deterministic': (bool,),
+    'list_file_threshold': (int, type(None)),
+    'low_memory': (bool,),
+    'asset_store': (str, type(None)),
+    'memoize': (bool,),
+    'optimise_assets': (bool,),
+    'optimise_cache': (str, type(None)),
+}
+
+
+def _init_process():
+    """Runs in each worker process before its first job."""
+
+    sys.stdout = open(os.devnull, 'w') # results are written to stdout in stdin mode
+    manifest.get_converter_version() # cached for the life of the process
+
+
+def _run_job(project_path, output_directory, options):
+    """Convert a project in a worker process. Returns (start time since the epoch, seconds, error), error is None if successful."""
+
+    start_time = time.time()
+    start = time.perf_counter()
+    try:
+        convert_project.convert_project(project_path, output_directory, verbose=False, **options)
+        error = None
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+
+    return start_time, time.perf_counter() - start, error
+
+
+def parse_job(line):
+    """Read a job from a line of JSON. Raises an Exception if it isn't valid."""
+
+    job = json.loads(line)
+    if not isinstance(job, dict): raise Exception('Job is not a JSON object')
+    if not isinstance(job.get('input'), str): raise Exception('Job has no input path')
+    if not isinstance(job.get('output', ''), (str, type(None))): raise Exception('Job output is not a path')
+
+    if not isinstance(job.get('options', {}), dict): raise Exception('Job options are not a JSON object')
+    for key, value in job.get('options', {}).items():
+        if key not in JOB_OPTIONS: raise Exception(f'Unknown option: {key}')
+        types = JOB_OPTIONS[key]
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types): # a bool is an int to isinstance
+            raise Exception(f"Option {key} must be {' or '.join('null' if t is type(None) else t.__name__ for t in types)}, not {json.dumps(value)}")
+
+    return job
+
+
+class Worker():
+    """Converts projects in a pool of processes that is kept running, so each job skips interpreter startup and imports
+    and reuses caches (such as of valid names) left by earlier jobs in the same process.
+    Processes are forked where possible, started up front before any server threads so the pool can be shared by them.
+    If a process dies (such as by running out of memory), its jobs fail and the pool is replaced on the next submission.
+    Threads are running by then and forking a process with threads isn't safe, so the replacement is started with forkserver (or spawn where unavailable)."""
+
+    def __init__(self, jobs=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        start_methods = multiprocessing.get_all_start_methods()
+        self.mp_context = multiprocessing.get_context('fork' if 'fork' in start_methods else None)
+        self.replacement_mp_context = multiprocessing.get_context('forkserver' if 'forkserver' in start_methods else 'spawn')
+
+        self.lock = threading.Lock()
+        self.pool = self._new_pool(self.mp_context)
+
+    def _new_pool(self, mp_context):
+        pool = ProcessPoolExecutor(self.jobs, mp_context, initializer=_init_process)
+        pool.submit(time.time).result() # start the processes now
+        return pool
+
+    def _replace_pool(self, broken_pool):
+        with self.lock:
+            if self.pool is broken_pool:
+                self.pool = self._new_pool(self.replacement_mp_context)
+                broken_pool.shutdown(wait=False)
+
+    def submit(self, job: dict, callback):
+        """Start converting a job (see `parse_job`), calling `callback` with its result once done. Returns a future."""
+
+        received = time.time()
+        result = {'id': job.get('id'), 'input': job['input'], 'status': 'pending', 'error': None, 'queued': None, 'seconds': None, 'total': None}
+
+        def on_done(future):
+            try:
+                start_time, result['seconds'], result['error'] = future.result()
+                result['queued'] = max(0, start_time - received)
+                result['status'] = 'ok' if result['error'] is None else 'failed'
+            except BrokenProcessPool:
+                result.update(status='failed', error='Worker process exited')
+            result['total'] = time.time() - received
+            callback(result)
+
+        args = (job['input'], job.get('output'), job.get('options', {}))
+        pool = self.pool
+        try:
+            future = pool.submit(_run_job, *args)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            future = self.pool.submit(_run_job, *args)
+
+        future.add_done_callback(on_done)
+        return future
+
+    def run_lines(self, lines, send):
+        """Convert a job from each line of JSON, calling `send` with each result as it finishes.
+        Returns once every job has finished. Empty lines are skipped and invalid jobs are failed straight away."""
+
+        futures = []
+        for line in lines:
+            if isinstance(line, bytes): line = line.decode('utf-8')
+            if not line.strip(): continue
+
+            try:
+                job = parse_job(line)
+            except Exception as e:
+                send({'id': None, 'input': None, 'status': 'failed', 'error': f'Invalid job: {e}', 'queued': None, 'seconds': None, 'total': None})
+                continue
+
+            futures.append(self.submit(job, send))
+
+        wait(futures)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def line_sender(file):
+    """Return a function writing results to a text or binary file as lines of JSON, safe to call from many threads."""
+
+    lock = threading.Lock()
+    is_binary = not hasattr(file, 'encoding')
+
+    def send(result):
+        line = json.dumps(result) + '\n'
+        with lock:
+            try:
+                file.write(line.encode('utf-8') if is_binary else line)
+                file.flush()
+            except (OSError, ValueError):
+                pass # the client has gone, the job still finished
+
+    return send
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """Handles a connection, jobs are read and results written as lines of JSON like in stdin mode."""
+
+    def handle(self):
+        self.server.worker.run_lines(self.rfile, line_sender(self.wfile))
+
+
+def serve(worker: Worker, socket_path=None, port=None):
+    """Accept connections on a Unix socket or a local TCP port until interrupted. Each connection may send any number of jobs."""
+
+    if socket_path is not None:
+        if not hasattr(socket, 'AF_UNIX'): raise Exception('Unix sockets are not supported on this platform, use a port')
+        if os.path.exists(socket_path): os.remove(socket_path) # left by a previous worker
+        server = socketserver.ThreadingUnixStreamServer(str(socket_path), JobHandler)
+    else:
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', port), JobHandler)
+
+    server.daemon_threads = True
+    server.worker = worker
+    with server:
+        print(f'Listening on {socket_path if socket_path is not None else f"127.0.0.1:{server.server_address[1]}"}', file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    if socket_path is not None: os.remove(socket_path)
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='sb3_to_goboscript_worker',
+        description="Convert Scratch projects sent as lines of JSON, keeping the converter loaded between them. "
+            'A job is like {"id": 1, "input": "project.sb3", "output": "folder", "options": {"deterministic": true}}, '
+            "options are keyword arguments of convert_project. A line of JSON is written back for each job as it finishes, with its status and timings. "
+            "Jobs are read from stdin until it closes, or from connections to a socket."
+    )
+
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--socket", type=Path, default=None, metavar="PATH", help="listen on a Unix socket instead of reading stdin")
+    parser.add_argument("--port", type=int, default=None, help="listen on a local TCP port instead of reading stdin")
+
+    args = parser.parse_args()
+    if args.socket is not None and args.port is not None: parser.error('give a socket or a port, not both')
+
+    worker = Worker(args.jobs)
+    try:
+        if args.socket is None and args.port is None:
+            worker.run_lines(sys.stdin, line_sender(sys.stdout))
+        else:
+            serve(worker, args.socket, args.port)
+    finally:
+        worker.close()
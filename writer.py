@@ -0,0 +1,60 @@
+import os
+
+
+class LineStream():
+    """Write lines to an open text file."""
+
+    def __init__(self, file):
+        self.file = file
+        self.is_first_line = True
+
+    def write_line(self, line):
+        """Write a line. Lines are separated by a new line, equivalent to `'\\n'.join(lines)`."""
+        if not self.is_first_line: self.file.write('\n')
+        self.file.write(str(line))
+        self.is_first_line = False
+
+    def write_line_parts(self, parts):
+        """Write a line given as an iterable of strings, so a long line doesn't need to be in memory at once."""
+        if not self.is_first_line: self.file.write('\n')
+        for part in parts:
+            self.file.write(part)
+        self.is_first_line = False
+
+
+class LineWriter(LineStream):
+    """Write a text file line by line through a buffer.
+    The lines go to a temporary file which replaces the destination only once writing has finished, so a crash never leaves a half-written file.
+    `newline` is as in `open`, the default writes the platform's line separator."""
+
+    def __init__(self, path, buffer_size=1<<16, newline=None):
+        super().__init__(None)
+        self.path = path
+        self.newline = newline
+        self.temp_path = f'{path}.{os.getpid()}.tmp'
+        self.buffer_size = buffer_size
+
+    def __enter__(self):
+        self.file = open(self.temp_path, 'w', encoding='utf-8', buffering=self.buffer_size, newline=self.newline)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+
+        if exc_type is None:
+            os.replace(self.temp_path, self.path)
+        else:
+            os.remove(self.temp_path) # keep the previous file, if any
+
+
+class LineBuffer():
+    """Collect lines in memory, used in place of a `LineWriter`."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write_line(self, line):
+        self.lines.append(str(line))
+
+    def write_line_parts(self, parts):
+        self.lines.append(''.join(parts))